@@ -0,0 +1,4 @@
+"""Performance benchmarks for the Tetracore backend.
+
+Run from the ``backend`` directory, e.g. ``python -m benchmarks.engine_throughput``.
+"""
@@ -0,0 +1,82 @@
+"""Microbenchmarks of the engine hot path: tick, metrics read and frame serialization.
+
+    python -m benchmarks.engine_micro --sizes 100 1000 10000 100000 --out micro.json
+    python -m benchmarks.engine_micro --compare micro.json
+
+Every engine is built from the same seed, so numbers from different commits
+measure the same work.  The object engine stops at ``--object-max`` pairs.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tetracore.engine import ENGINES, TetracoreEngine, create_engine
+from tetracore.frames import FRAME_ENCODERS, encode_snapshot_frame
+from tetracore.models import BulkCreateRequest, PairGenerator
+from tetracore.pairs import bulk_create_arrays
+from benchmarks import results
+
+PHASES = ("step", "metrics", *FRAME_ENCODERS, "snapshot")
+
+
+def populate(mode: str, n: int, seed: int) -> TetracoreEngine:
+    engine = create_engine(mode, seed=seed)
+    generator = PairGenerator(kind="random_box", count=n, seed=seed, spacing=5.0)
+    engine.create_pairs(*bulk_create_arrays(BulkCreateRequest(generator=generator)))
+    engine.step(0.1)
+    engine.calculate_system_metrics()
+    return engine
+
+
+def median_seconds(run, min_time: float, min_repeat: int = 3) -> float:
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_repeat or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def measure(engine: TetracoreEngine, dt: float, min_time: float) -> dict:
+    row = {
+        "step": median_seconds(lambda: engine.step(dt), min_time),
+        "metrics": median_seconds(engine.calculate_system_metrics, min_time),
+    }
+    for fmt, encode in (*FRAME_ENCODERS.items(), ("snapshot", encode_snapshot_frame)):
+        row[fmt] = median_seconds(lambda: encode(engine), min_time)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--object-max", type=int, default=10000, help="largest size run on the object engine")
+    parser.add_argument("--dt", type=float, default=0.1)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent on each measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'engine':>10} {'pairs':>7} " + " ".join(f"{phase + ' ms':>12}" for phase in PHASES))
+    for mode in args.engines:
+        for n in args.sizes:
+            if mode == "object" and n > args.object_max:
+                continue
+            engine = populate(mode, n, args.seed)
+            timings = measure(engine, args.dt, args.min_time)
+            rows.append({"engine": mode, "pairs": n, **{f"{phase}_ms": timings[phase] * 1e3 for phase in PHASES}})
+            print(f"{mode:>10} {n:>7} " + " ".join(f"{timings[phase] * 1e3:>12.3f}" for phase in PHASES))
+
+    if args.out:
+        results.write(args.out, "engine_micro", rows, config=vars(args))
+    if args.compare:
+        results.compare(rows, args.compare, ("engine", "pairs"))
+
+
+if __name__ == "__main__":
+    main()
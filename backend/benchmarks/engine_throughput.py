@@ -0,0 +1,56 @@
+"""Tick throughput of the object engine versus the vectorized engine.
+
+    python -m benchmarks.engine_throughput --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+from tetracore.engine import TetracoreEngine, VectorizedTetracoreEngine
+from tetracore.models import Vector3D
+
+
+def populate(n: int, seed: int):
+    """Build ``n`` identical pairs in both engines"""
+    obj = TetracoreEngine(seed=seed)
+    vec = VectorizedTetracoreEngine(capacity=n, seed=seed)
+    side = max(1, round(n ** (1 / 3)))
+    for i in range(n):
+        center = Vector3D(x=(i % side) * 5.0, y=(i // side % side) * 5.0, z=(i // side // side) * 5.0)
+        pair = obj.create_tetrahedron_pair(center, separation=2.0)
+        obj.add_pair(pair)
+        vec.add_pair(pair)
+    return obj, vec
+
+
+def time_ticks(engine: TetracoreEngine, dt: float, min_time: float) -> float:
+    """Seconds per tick (update + metrics), averaged over at least ``min_time``"""
+    ticks = 0
+    start = time.perf_counter()
+    while True:
+        engine.step(dt)
+        engine.calculate_system_metrics()
+        ticks += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dt", type=float, default=0.1)
+    parser.add_argument("--min-time", type=float, default=2.0, help="seconds to run each measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'pairs':>8} {'object ms/tick':>15} {'vector ms/tick':>15} {'speedup':>8} {'vector pairs/s':>15}")
+    for n in args.sizes:
+        obj, vec = populate(n, args.seed)
+        obj_tick = time_ticks(obj, args.dt, args.min_time)
+        vec_tick = time_ticks(vec, args.dt, args.min_time)
+        print(f"{n:>8} {obj_tick * 1e3:>15.3f} {vec_tick * 1e3:>15.3f} "
+              f"{obj_tick / vec_tick:>7.1f}x {n / vec_tick:>15.3e}")
+
+
+if __name__ == "__main__":
+    main()
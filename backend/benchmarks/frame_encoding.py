@@ -0,0 +1,57 @@
+"""Per-tick WebSocket frame size and encode time for each wire format.
+
+    python -m benchmarks.frame_encoding --sizes 1000 10000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from tetracore.engine import VectorizedTetracoreEngine
+from tetracore.frames import FRAME_ENCODERS, LOD_PROTOCOL, encode_lod_frame
+from tetracore.models import LodView, Vector3D
+
+
+def populate(n: int, seed: int) -> VectorizedTetracoreEngine:
+    engine = VectorizedTetracoreEngine(capacity=n, seed=seed)
+    for i in range(n):
+        center = Vector3D(x=random.uniform(-50, 50), y=random.uniform(-50, 50), z=random.uniform(-50, 50))
+        engine.add_pair(engine.create_tetrahedron_pair(center))
+    engine.step(0.1)
+    engine.calculate_system_metrics()
+    return engine
+
+
+def measure(encode, engine, repeat: int):
+    """Median encode seconds and encoded size in bytes"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = encode(engine)
+        timings.append(time.perf_counter() - start)
+    size = len(frame) if isinstance(frame, bytes) else len(frame.encode())
+    return float(np.median(timings)), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"{'pairs':>8} {'format':>8} {'bytes/tick':>12} {'encode ms':>10}")
+    for n in args.sizes:
+        engine = populate(n, args.seed)
+        encoders = dict(FRAME_ENCODERS)
+        # Default camera and budgets; the tiers cap the frame whatever the scene size
+        encoders[LOD_PROTOCOL] = lambda engine: encode_lod_frame(engine, LodView())
+        for name, encode in encoders.items():
+            seconds, size = measure(encode, engine, args.repeat)
+            print(f"{n:>8} {name:>8} {size:>12,} {seconds * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Load test: many WebSocket subscribers, REST pollers and pair writes at once.
+
+Starts ``benchmarks.local_server`` on an in-memory MongoDB stand-in (or a real
+MongoDB with ``--mongo-url``), seeds it, runs the simulation and measures
+from the client side:
+
+- tick jitter: how far each frame's arrival interval strays from the
+  simulated time between the two frames
+- delivery latency: arrival time minus simulated time, relative to the
+  fastest delivery seen, as percentiles
+- frames, bytes and REST requests per second, and pair create/delete latency
+
+plus the server's own tick phase timings from ``/api/metrics``.
+
+    python -m benchmarks.load_test --clients 200 --pollers 20 --pairs 1000 --duration 20 --out load.json
+    python -m benchmarks.load_test --url http://localhost:8001 --clients 50   # an already running server
+
+The client runs on a single event loop, so at very high client counts its
+own CPU use shows up as latency; check ``client_cpu`` in the report.
+"""
+import argparse
+import asyncio
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import websockets
+
+from tetracore.config import ENGINE_MODE, TICK_RATE
+from tetracore.engine import ENGINES
+from tetracore.frames import BINARY_HEADER, BINARY_MAGIC, BINARY_SUBPROTOCOL, FRAME_ENCODERS
+from benchmarks import results
+
+TIME_STEP = re.compile(rb'"time_step":\s*([-0-9.eE+]+)')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        TICK_RATE=str(args.tick_rate),
+        BROADCAST_RATE=str(args.broadcast_rate or args.tick_rate),
+        ENGINE_MODE=args.engine,
+        RESTORE_ON_STARTUP="false",
+        CHECKPOINT_PATH="",
+        DB_NAME=args.db_name,
+    )
+    command = [sys.executable, "-m", "benchmarks.local_server", "--port", str(port)]
+    if args.mongo_url:
+        env["MONGO_URL"] = args.mongo_url
+    else:
+        command.append("--mongomock")
+    return subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def wait_ready(http: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            (await http.get("/api/simulation/state")).raise_for_status()
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def frame_time_step(frame) -> float:
+    if isinstance(frame, bytes) and frame[:4] == BINARY_MAGIC:
+        return BINARY_HEADER.unpack_from(frame)[4]
+    match = TIME_STEP.search(frame if isinstance(frame, bytes) else frame.encode())
+    return float(match.group(1)) if match else float("nan")
+
+
+async def subscriber(url: str, fmt: str, frames: list, stop: asyncio.Event):
+    """Receive frames until ``stop``; appends ``(arrival, time_step, bytes)``"""
+    if fmt == "binary":
+        connect = websockets.connect(f"{url}/api/ws", subprotocols=[BINARY_SUBPROTOCOL], max_size=None, max_queue=None)
+    else:
+        connect = websockets.connect(f"{url}/api/ws?format={fmt}", max_size=None, max_queue=None)
+    async with connect as ws:
+        while not stop.is_set():
+            try:
+                frame = await asyncio.wait_for(ws.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            frames.append((time.monotonic(), frame_time_step(frame), len(frame)))
+
+
+async def poller(http: httpx.AsyncClient, interval: float, latencies: list, stop: asyncio.Event):
+    """Poll the state with ETag revalidation, like a dashboard without a socket"""
+    etag = None
+    while not stop.is_set():
+        start = time.monotonic()
+        response = await http.get("/api/simulation/state", headers={"If-None-Match": etag} if etag else {})
+        latencies.append(time.monotonic() - start)
+        etag = response.headers.get("etag", etag)
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+
+async def pair_writer(http: httpx.AsyncClient, rate: float, latencies: dict, stop: asyncio.Event):
+    """Create and then delete one pair ``rate`` times per second, through MongoDB"""
+    while not stop.is_set():
+        start = time.monotonic()
+        response = await http.post("/api/pairs/create", params={"center_x": 1000.0})
+        created = time.monotonic()
+        latencies["create"].append(created - start)
+        await http.delete(f"/api/pairs/{response.json()['pair_id']}")
+        latencies["delete"].append(time.monotonic() - created)
+        await asyncio.sleep(max(0.0, 1.0 / rate - (time.monotonic() - start)))
+
+
+def parse_prometheus(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def server_tick_phases(before: dict, after: dict) -> dict:
+    """Mean server-side tick phase duration in ms over the measured window"""
+    phases = {}
+    for phase in ("update", "metrics", "serialize", "broadcast", "total"):
+        key = f'{{phase="{phase}"}}'
+        total = after.get(f"tetracore_tick_seconds_sum{key}", 0.0) - before.get(f"tetracore_tick_seconds_sum{key}", 0.0)
+        count = after.get(f"tetracore_tick_seconds_count{key}", 0.0) - before.get(f"tetracore_tick_seconds_count{key}", 0.0)
+        phases[f"server_{phase}_ms"] = total / count * 1e3 if count else float("nan")
+    return phases
+
+
+def frame_stats(per_client: list, start: float, end: float, interval: float) -> dict:
+    """Jitter, latency and throughput from each subscriber's ``(arrival, time_step, bytes)`` list"""
+    jitter, offsets, received, nbytes = [], [], 0, 0
+    for frames in per_client:
+        frames = np.array([f for f in frames if start <= f[0] <= end]).reshape(-1, 3)
+        if not len(frames):
+            continue
+        arrival, time_step = frames[:, 0], frames[:, 1]
+        jitter.append(np.abs(np.diff(arrival) - np.diff(time_step)))
+        offsets.append(arrival - time_step)
+        received += len(frames)
+        nbytes += int(frames[:, 2].sum())
+    seconds = end - start
+    jitter = np.concatenate(jitter) if jitter else np.array([])
+    offsets = np.concatenate(offsets) if offsets else np.array([])
+    latency = offsets - offsets.min() if len(offsets) else offsets
+    expected = len(per_client) * seconds / interval
+    return {
+        **{f"jitter_{k}_ms": v * 1e3 for k, v in results.percentiles(jitter).items()},
+        **{f"latency_{k}_ms": v * 1e3 for k, v in results.percentiles(latency).items()},
+        "frames_per_second": received / seconds,
+        "delivered_ratio": received / expected if expected else float("nan"),
+        "mbytes_per_second": nbytes / seconds / 1e6,
+    }
+
+
+async def run(args, url: str) -> dict:
+    ws_url = url.replace("http", "ws", 1)
+    limits = httpx.Limits(max_connections=args.pollers + 8)
+    async with httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits) as http:
+        await wait_ready(http)
+        await http.post("/api/simulation/stop")
+        (await http.post("/api/simulation/reset", params={"seed": args.seed})).raise_for_status()
+        generator = {"kind": "random_box", "count": args.pairs, "seed": args.seed, "spacing": 5.0}
+        (await http.post("/api/pairs/bulk", json={"generator": generator})).raise_for_status()
+        broadcast_rate = (await http.get("/api/simulation/rates")).json()["broadcast_rate"]
+
+        stop = asyncio.Event()
+        per_client = [[] for _ in range(args.clients)]
+        poll_latencies, write_latencies = [], {"create": [], "delete": []}
+        tasks = [asyncio.create_task(subscriber(ws_url, args.format, frames, stop)) for frames in per_client]
+        tasks += [asyncio.create_task(poller(http, args.poll_interval, poll_latencies, stop)) for _ in range(args.pollers)]
+        if args.pair_ops:
+            tasks.append(asyncio.create_task(pair_writer(http, args.pair_ops, write_latencies, stop)))
+
+        (await http.post("/api/simulation/start")).raise_for_status()
+        await asyncio.sleep(args.warmup)
+        before = parse_prometheus((await http.get("/api/metrics")).text)
+        polls_before, cpu_before = len(poll_latencies), time.process_time()
+        writes_before = {op: len(v) for op, v in write_latencies.items()}
+        start = time.monotonic()
+        await asyncio.sleep(args.duration)
+        end = time.monotonic()
+        cpu = time.process_time() - cpu_before
+        after = parse_prometheus((await http.get("/api/metrics")).text)
+
+        stop.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        await http.post("/api/simulation/stop")
+
+    errors = [repr(o) for o in outcomes if isinstance(o, Exception)]
+    seconds = end - start
+    polls = poll_latencies[polls_before:]
+    row = {
+        "format": args.format,
+        "clients": args.clients,
+        "pollers": args.pollers,
+        "pairs": args.pairs,
+        **frame_stats(per_client, start, end, 1.0 / broadcast_rate),
+        "polls_per_second": len(polls) / seconds,
+        **{f"poll_{k}_ms": v * 1e3 for k, v in results.percentiles(polls).items()},
+        **{f"{op}_{k}_ms": v * 1e3 for op, values in write_latencies.items()
+           for k, v in results.percentiles(values[writes_before[op]:]).items()},
+        **server_tick_phases(before, after),
+        "evictions": sum(v - before.get(k, 0.0) for k, v in after.items() if k.startswith("tetracore_ws_evictions_total")),
+        "client_cpu": cpu / seconds,
+        "errors": len(errors),
+    }
+    for error in errors[:5]:
+        print(f"client error: {error}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--mongo-url", help="use this MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default="tetracore_load_test")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=ENGINE_MODE)
+    parser.add_argument("--tick-rate", type=float, default=TICK_RATE)
+    parser.add_argument("--broadcast-rate", type=float, help="defaults to the tick rate")
+    parser.add_argument("--clients", type=int, default=100, help="WebSocket subscribers")
+    parser.add_argument("--format", choices=list(FRAME_ENCODERS), default="binary")
+    parser.add_argument("--pollers", type=int, default=10, help="REST clients polling the state")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--pair-ops", type=float, default=5.0, help="pair create+delete cycles per second; 0 disables")
+    parser.add_argument("--pairs", type=int, default=1000)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        process = start_server(args, port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        row = asyncio.run(run(args, url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    width = max(len(name) for name in row)
+    for name, value in row.items():
+        print(f"{name:<{width}} {value:.3f}" if isinstance(value, float) else f"{name:<{width}} {value}")
+    if args.out:
+        results.write(args.out, "load_test", [row], config={k: v for k, v in vars(args).items() if k != "mongo_url"})
+    if args.compare:
+        results.compare([row], args.compare, ("format", "clients", "pollers", "pairs"))
+
+
+if __name__ == "__main__":
+    main()
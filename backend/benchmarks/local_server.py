@@ -0,0 +1,35 @@
+"""Serve the backend locally for benchmarks, optionally on an in-memory MongoDB stand-in.
+
+    python -m benchmarks.local_server --port 8011 --mongomock
+
+Server settings still come from the usual environment variables
+(``TICK_RATE``, ``ENGINE_MODE``, ...); ``benchmarks.load_test`` starts this
+module in a subprocess with a clean, reproducible set of them.
+"""
+import argparse
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of a MongoDB server")
+    args = parser.parse_args()
+
+    # Imported here so the caller's environment is in place before server reads it
+    import server
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[server.DB_NAME]
+        server.persister.collection = server.db.tetrahedron_pairs
+        server.persister.state_collection = server.db.simulation_state
+        if server.history.collection is not None:
+            server.history.collection = server.db.metrics_history
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
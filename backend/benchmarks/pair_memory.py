@@ -0,0 +1,111 @@
+"""Memory per pair and creation rate of each way pairs enter an engine.
+
+    python -m benchmarks.pair_memory --sizes 10000 100000 --out memory.json
+
+Memory is what ``tracemalloc`` sees allocated by the populated engine
+(NumPy buffers included), divided by the pair count.  Paths:
+
+- ``object``: the object engine's ``create_pairs``
+- ``single``: one pair at a time on the vectorized engine, built, materialized
+  for the response and added as ``POST /api/pairs/create`` does
+- ``bulk``: the vectorized engine's batched ``create_pairs``
+- ``load``: the vectorized engine's ``load_documents`` from stored dicts
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from tetracore.engine import TetracoreEngine, VectorizedTetracoreEngine
+from tetracore.models import Vector3D
+from benchmarks import results
+
+
+def centers(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-500, 500, (n, 3)), np.full(n, 2.0)
+
+
+def create_object(n: int, seed: int):
+    engine = TetracoreEngine(seed=seed)
+    engine.create_pairs(*centers(n, seed))
+    return engine
+
+
+def create_single(n: int, seed: int):
+    engine = VectorizedTetracoreEngine(seed=seed)
+    for (x, y, z), separation in zip(*(a.tolist() for a in centers(n, seed))):
+        record = engine.build_pair(Vector3D(x=x, y=y, z=z), separation)
+        record.materialize()
+        engine.add_pair(record)
+    return engine
+
+
+def create_bulk(n: int, seed: int):
+    engine = VectorizedTetracoreEngine(seed=seed)
+    engine.create_pairs(*centers(n, seed))
+    return engine
+
+
+PATHS = {"object": create_object, "single": create_single, "bulk": create_bulk}
+
+
+def measure(create, n: int, seed: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    engine = create(n, seed)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del engine
+    # tracemalloc slows allocation-heavy code down, so time creation separately
+    gc.collect()
+    start = time.perf_counter()
+    create(n, seed)
+    seconds = time.perf_counter() - start
+    return {"bytes_per_pair": current / n, "peak_bytes_per_pair": peak / n, "pairs_per_second": n / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--paths", nargs="+", choices=[*PATHS, "load"], default=[*PATHS, "load"])
+    parser.add_argument("--object-max", type=int, default=10000, help="largest size run on the object and single paths")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'path':>8} {'pairs':>8} {'bytes/pair':>11} {'peak/pair':>10} {'pairs/s':>10}")
+    for n in args.sizes:
+        documents = None
+        for path in args.paths:
+            if path in ("object", "single") and n > args.object_max:
+                continue
+            if path == "load":
+                if documents is None:
+                    source = create_bulk(n, args.seed)
+                    documents = source.pair_documents(source.pair_id_list())
+
+                def create(n, seed, documents=documents):
+                    engine = VectorizedTetracoreEngine(seed=seed)
+                    engine.load_documents(documents)
+                    return engine
+            else:
+                create = PATHS[path]
+            row = measure(create, n, args.seed)
+            rows.append({"path": path, "pairs": n, **row})
+            print(f"{path:>8} {n:>8} {row['bytes_per_pair']:>11,.0f} {row['peak_bytes_per_pair']:>10,.0f} "
+                  f"{row['pairs_per_second']:>10,.0f}")
+
+    if args.out:
+        results.write(args.out, "pair_memory", rows, config=vars(args))
+    if args.compare:
+        results.compare(rows, args.compare, ("path", "pairs"))
+
+
+if __name__ == "__main__":
+    main()
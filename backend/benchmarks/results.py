@@ -0,0 +1,65 @@
+"""Result files shared by the benchmarks, so runs can be compared across commits.
+
+Each benchmark that takes ``--out`` writes::
+
+    {"benchmark": name, "environment": {...}, "rows": [{...}, ...]}
+
+and ``--compare`` prints every numeric column of the current run next to the
+same row of an earlier file, matched on the row's key columns.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+
+def environment() -> dict:
+    """What a result depends on besides the code: commit, interpreter, libraries, machine"""
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def percentiles(values, qs=(50, 95, 99)) -> dict:
+    """``{"p50": ..., "p95": ..., "p99": ...}``, or NaNs when there are no values"""
+    if not len(values):
+        return {f"p{q}": float("nan") for q in qs}
+    return {f"p{q}": float(v) for q, v in zip(qs, np.percentile(values, qs))}
+
+
+def write(path: str, benchmark: str, rows: list, **extra):
+    with open(path, "w") as f:
+        json.dump({"benchmark": benchmark, "environment": environment(), **extra, "rows": rows}, f, indent=2)
+
+
+def compare(rows: list, path: str, keys: tuple):
+    """Print each numeric column of ``rows`` beside the matching row in ``path``"""
+    with open(path) as f:
+        baseline = json.load(f)
+    print(f"\nversus {baseline['environment'].get('commit') or path}:")
+    previous = {tuple(row.get(k) for k in keys): row for row in baseline["rows"]}
+    for row in rows:
+        old = previous.get(tuple(row.get(k) for k in keys))
+        if old is None:
+            continue
+        label = " ".join(f"{k}={row[k]}" for k in keys)
+        for name, value in row.items():
+            if name in keys or not isinstance(value, (int, float)) or not isinstance(old.get(name), (int, float)):
+                continue
+            ratio = value / old[name] if old[name] else float("nan")
+            print(f"  {label:<36} {name:<22} {old[name]:>12.4g} -> {value:>12.4g}  ({ratio:.2f}x)")
@@ -0,0 +1,49 @@
+"""Seeding throughput: one POST /api/pairs/create per pair versus POST /api/pairs/bulk.
+
+Runs against a live server (and whatever MongoDB it is configured with):
+
+    python -m benchmarks.seeding --url http://localhost:8001 --count 2000
+"""
+import argparse
+import time
+
+import requests
+
+
+def seed_single(session: requests.Session, url: str, count: int) -> list:
+    ids = []
+    for i in range(count):
+        response = session.post(f"{url}/api/pairs/create", params={"center_x": i * 5.0, "separation": 2.0})
+        response.raise_for_status()
+        ids.append(response.json()["pair_id"])
+    return ids
+
+
+def seed_bulk(session: requests.Session, url: str, count: int) -> list:
+    spec = {"generator": {"kind": "lattice", "count": count, "spacing": 5.0, "seed": 0}}
+    response = session.post(f"{url}/api/pairs/bulk", json=spec)
+    response.raise_for_status()
+    return response.json()["pair_ids"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--count", type=int, default=2000, help="pairs seeded by the single-pair path")
+    parser.add_argument("--bulk-count", type=int, nargs="+", default=[2000, 10000, 100000])
+    args = parser.parse_args()
+
+    session = requests.Session()
+    runs = [("single", seed_single, args.count)] + [("bulk", seed_bulk, n) for n in args.bulk_count]
+    print(f"{'path':>8} {'pairs':>8} {'seconds':>9} {'pairs/s':>10}")
+    for name, seed, count in runs:
+        session.post(f"{args.url}/api/simulation/reset").raise_for_status()
+        start = time.perf_counter()
+        ids = seed(session, args.url, count)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>8} {len(ids):>8} {elapsed:>9.2f} {len(ids) / elapsed:>10.0f}")
+        session.post(f"{args.url}/api/pairs/bulk/delete", json={"ids": ids}).raise_for_status()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Startup time of each warm-restart path.
+
+Seeds a scratch database with N pairs, writes a checkpoint, then times
+``restore_state`` for: the object engine (Pydantic validation per document),
+the vectorized engine streaming documents, and the vectorized engine from
+the checkpoint.
+
+    python -m benchmarks.warm_restart --sizes 10000 100000
+    python -m benchmarks.warm_restart --mongomock   # no MongoDB needed
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from tetracore.config import BULK_WRITE_CHUNK, MONGO_URL
+from tetracore.engine import TetracoreEngine, VectorizedTetracoreEngine
+from tetracore.checkpoint import write_checkpoint
+from tetracore.persistence import restore_state
+
+
+def database(args):
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()[args.db_name]
+    return AsyncIOMotorClient(args.mongo_url)[args.db_name]
+
+
+async def seed(db, n: int, checkpoint_path: str):
+    engine = VectorizedTetracoreEngine(capacity=n)
+    rng = np.random.default_rng(0)
+    ids = engine.create_pairs(rng.uniform(-100, 100, (n, 3)), np.full(n, 2.0), rng)
+    await db.tetrahedron_pairs.delete_many({})
+    for start in range(0, n, BULK_WRITE_CHUNK):
+        await db.tetrahedron_pairs.insert_many(engine.pair_documents(ids[start:start + BULK_WRITE_CHUNK]))
+    header = engine.simulation_state.model_dump(exclude={"pairs"})
+    await db.simulation_state.replace_one({"_id": "current"}, header, upsert=True)
+    write_checkpoint(checkpoint_path, engine.checkpoint_arrays())
+
+
+async def run(args):
+    db = database(args)
+    checkpoint_path = os.path.join(tempfile.mkdtemp(), "bench_checkpoint.npz")
+    paths = [
+        ("object/database", TetracoreEngine, ""),
+        ("vector/database", VectorizedTetracoreEngine, ""),
+        ("vector/checkpoint", VectorizedTetracoreEngine, checkpoint_path),
+    ]
+    print(f"{'pairs':>8} {'path':>18} {'seconds':>9} {'pairs/s':>10}")
+    for n in args.sizes:
+        await seed(db, n, checkpoint_path)
+        for name, engine_cls, path in paths:
+            if name.startswith("object") and n > args.object_limit:
+                continue
+            restored = await restore_state(engine_cls(), db.tetrahedron_pairs, db.simulation_state, path)
+            assert restored["pairs"] == n
+            print(f"{n:>8} {name:>18} {restored['seconds']:>9.2f} {n / restored['seconds']:>10.0f}")
+    await db.tetrahedron_pairs.delete_many({})
+    await db.simulation_state.delete_many({})
+    os.remove(checkpoint_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--mongo-url", default=MONGO_URL)
+    parser.add_argument("--db-name", default="tetracore_bench")
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of a MongoDB server")
+    parser.add_argument("--object-limit", type=int, default=100000, help="skip the object engine above this size")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Headless batch runs: step a seeded simulation as fast as the CPU allows.
+
+    python headless.py --seed 1 --pairs 1000 --steps 10000 --sample-every 1000
+    python headless.py --seed 1 --pairs 1000 --steps 10000 --out golden.json
+    python headless.py --seed 1 --pairs 1000 --steps 10000 --golden golden.json
+
+With ``--golden`` the run is compared against a recorded one and the exit
+status is 1 if any sampled metric or final per-pair sum drifts beyond
+``--rtol``.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from tetracore.config import ENGINE_MODE, TICK_RATE
+from tetracore.engine import ENGINES, TetracoreEngine, create_engine
+from tetracore.models import BulkCreateRequest, PairGenerator
+from tetracore.pairs import bulk_create_arrays
+
+
+def fingerprint(engine: TetracoreEngine) -> dict:
+    """Order-independent sums over the per-pair columns of the final state"""
+    arrays = engine.frame_arrays()
+    return {
+        f"{name}_{kind}": float(values.sum())
+        for name in ("phase", "energy_state", "stability_factor")
+        for kind, values in (("sum", arrays[name]), ("sumsq", arrays[name] ** 2))
+    }
+
+
+def run(args) -> dict:
+    engine = create_engine(args.engine, seed=args.seed)
+    generator = PairGenerator(kind=args.generator, count=args.pairs, seed=args.seed, spacing=args.spacing)
+    engine.create_pairs(*bulk_create_arrays(BulkCreateRequest(generator=generator)))
+
+    start = time.perf_counter()
+    samples = engine.run(args.steps, args.dt, args.sample_every)
+    seconds = time.perf_counter() - start
+    return {
+        "config": {name: getattr(args, name) for name in ("engine", "seed", "generator", "pairs", "spacing", "steps", "dt", "sample_every")},
+        "samples": samples,
+        "final": fingerprint(engine),
+        "seconds": seconds,
+        "steps_per_second": args.steps / seconds if seconds else math.inf,
+    }
+
+
+def compare(result: dict, golden: dict, rtol: float) -> list:
+    """Differences between two runs, as human-readable strings"""
+    if result["config"] != golden["config"]:
+        return [f"config differs: {result['config']} != {golden['config']}"]
+    problems = []
+    for got, want in zip(result["samples"], golden["samples"]):
+        for name, value in want.items():
+            if not np.isclose(got[name], value, rtol=rtol, atol=0.0):
+                problems.append(f"step {want['step']}: {name} {got[name]!r} != {value!r}")
+    for name, value in golden["final"].items():
+        if not np.isclose(result["final"][name], value, rtol=rtol, atol=0.0):
+            problems.append(f"final {name} {result['final'][name]!r} != {value!r}")
+    if len(result["samples"]) != len(golden["samples"]):
+        problems.append(f"{len(result['samples'])} samples != {len(golden['samples'])}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=ENGINE_MODE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generator", choices=["lattice", "random_box", "sphere_shell"], default="lattice")
+    parser.add_argument("--pairs", type=int, default=1000)
+    parser.add_argument("--spacing", type=float, default=5.0)
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--dt", type=float, default=1.0 / TICK_RATE)
+    parser.add_argument("--sample-every", type=int, default=0)
+    parser.add_argument("--out", help="write the run as JSON to this file")
+    parser.add_argument("--golden", help="compare against a run recorded with --out")
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    result = run(args)
+    final = result["samples"][-1]
+    print(f"{args.steps} steps of {args.pairs} pairs in {result['seconds']:.2f}s "
+          f"({result['steps_per_second']:,.0f} steps/s): stability {final['total_stability']:.6f}, "
+          f"energy {final['system_energy']:.6f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.golden:
+        with open(args.golden) as f:
+            problems = compare(result, json.load(f), args.rtol)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print("matches golden run")
+
+
+if __name__ == "__main__":
+    main()
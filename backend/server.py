@@ -1,22 +1,29 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Tuple
+from pydantic_core import to_json
+from typing import Dict, List, Literal, Optional, Tuple
 import json
 import math
-import random
-import uuid
 import asyncio
-import os
+import subprocess
+import sys
 from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime
-import numpy as np
 
-# Environment variables
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-DB_NAME = os.getenv("DB_NAME", "tetracore_db")
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
+from tetracore.config import BULK_WRITE_CHUNK, CORS_ORIGINS, DB_NAME, MAX_BULK_PAIRS, METRICS_PERSIST, MONGO_URL, \
+    PAIR_PAGE_MAX, PAIR_PAGE_SIZE, RESTORE_ON_STARTUP, SESSION_RUN_TIMEOUT, SIMULATION_SEED
+from tetracore.connections import ConnectionManager
+from tetracore.engine import create_engine
+from tetracore.frames import BINARY_SUBPROTOCOL, FRAME_ENCODERS, LOD_PROTOCOL, encode_pair_added, encode_pair_removed
+from tetracore.history import MetricsHistory
+from tetracore.instrumentation import Gauge, MONGO_OP_SECONDS, registry
+from tetracore.listing import PAIR_FIELDS, decode_cursor
+from tetracore.models import BulkCreateRequest, BulkDeleteRequest, LodView, PairQuery, StepRequest, SweepSpec, \
+    TickRates, Vector3D
+from tetracore.pairs import bulk_create_arrays, bulk_delete_ids, pairs_in_box, pairs_nearby
+from tetracore.persistence import Checkpointer, StatePersister, ensure_pair_indexes, query_stored_pairs, restore_state
+from tetracore.sessions import Session, SessionError, SessionRegistry
+from tetracore.sweeps import MongoSweepSink, SweepRun, check_sweep, prune_sweeps
+from tetracore.ticker import SimulationTicker, SnapshotCache
 
 app = FastAPI(title="Tetracore Server Simulation", version="1.0.0")
 
@@ -33,238 +40,127 @@ app.add_middleware(
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
 
-# Models
-class Vector3D(BaseModel):
-    x: float
-    y: float
-    z: float
-
-class TetrahedronVertex(BaseModel):
-    position: Vector3D
-    energy: float = 0.0
-    spin: float = 0.0
-    mass_projection: float = 1.0
-
-class Tetrahedron(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    vertices: List[TetrahedronVertex]
-    center: Vector3D
-    energy_state: float = 1.0
-    oscillation_frequency: float = 1.0
-    phase: float = 0.0
-    particle_type: str = "matter"  # "matter" or "antimatter"
-    
-class TetrahedronPair(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    matter_tetrahedron: Tetrahedron
-    antimatter_tetrahedron: Tetrahedron
-    stability_factor: float = 1.0
-    pairing_strength: float = 1.0
-    entanglement_connection: bool = True
-    created_at: datetime = Field(default_factory=datetime.now)
-
-class SimulationState(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    pairs: List[TetrahedronPair] = []
-    total_stability: float = 0.0
-    system_energy: float = 0.0
-    time_step: float = 0.0
-    running: bool = False
-
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+# Request validation
+def validate_bulk_create(request: BulkCreateRequest):
+    count = len(request.pairs) + (request.generator.count if request.generator else 0)
+    if not count:
+        raise HTTPException(status_code=400, detail="No pairs or generator given")
+    if count > MAX_BULK_PAIRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_PAIRS} pairs per request")
 
-manager = ConnectionManager()
+def validate_bulk_delete(request: BulkDeleteRequest):
+    if not request.ids and request.filter is None:
+        raise HTTPException(status_code=400, detail="No ids or filter given")
 
-# Tetracore Physics Engine
-class TetracoreEngine:
-    def __init__(self):
-        self.simulation_state = SimulationState()
-        
-    def create_regular_tetrahedron(self, center: Vector3D, size: float = 1.0) -> List[TetrahedronVertex]:
-        """Create vertices for a regular tetrahedron centered at given position"""
-        # Regular tetrahedron vertices in unit form
-        vertices_coords = [
-            (1, 1, 1),
-            (1, -1, -1),
-            (-1, 1, -1),
-            (-1, -1, 1)
-        ]
-        
-        vertices = []
-        for x, y, z in vertices_coords:
-            position = Vector3D(
-                x=center.x + x * size / math.sqrt(3),
-                y=center.y + y * size / math.sqrt(3),
-                z=center.z + z * size / math.sqrt(3)
-            )
-            vertex = TetrahedronVertex(
-                position=position,
-                energy=random.uniform(0.5, 1.5),
-                spin=random.uniform(-1, 1),
-                mass_projection=random.uniform(0.8, 1.2)
-            )
-            vertices.append(vertex)
-        
-        return vertices
-    
-    def create_counter_tetrahedron(self, original: Tetrahedron) -> Tetrahedron:
-        """Create a counter-tetrahedron (antimatter pair) for stabilization"""
-        # Mirror the tetrahedron across its center with inverted properties
-        counter_vertices = []
-        
-        for vertex in original.vertices:
-            # Mirror position relative to center
-            mirrored_pos = Vector3D(
-                x=2 * original.center.x - vertex.position.x,
-                y=2 * original.center.y - vertex.position.y,
-                z=2 * original.center.z - vertex.position.z
-            )
-            
-            # Invert quantum properties for antimatter
-            counter_vertex = TetrahedronVertex(
-                position=mirrored_pos,
-                energy=-vertex.energy,  # Inverted energy
-                spin=-vertex.spin,      # Inverted spin
-                mass_projection=vertex.mass_projection  # Mass remains same magnitude
-            )
-            counter_vertices.append(counter_vertex)
-        
-        counter_tetrahedron = Tetrahedron(
-            vertices=counter_vertices,
-            center=Vector3D(
-                x=2 * original.center.x - original.center.x,
-                y=2 * original.center.y - original.center.y, 
-                z=2 * original.center.z - original.center.z
-            ),
-            energy_state=-original.energy_state,
-            oscillation_frequency=original.oscillation_frequency,
-            phase=original.phase + math.pi,  # Phase shifted for antimatter
-            particle_type="antimatter"
-        )
-        
-        return counter_tetrahedron
-    
-    def calculate_pair_stability(self, pair: TetrahedronPair) -> float:
-        """Calculate stability factor for a tetrahedron pair"""
-        matter = pair.matter_tetrahedron
-        antimatter = pair.antimatter_tetrahedron
-        
-        # Distance between centers
-        dx = matter.center.x - antimatter.center.x
-        dy = matter.center.y - antimatter.center.y
-        dz = matter.center.z - antimatter.center.z
-        distance = math.sqrt(dx*dx + dy*dy + dz*dz)
-        
-        # Optimal distance for stability (arbitrary physics model)
-        optimal_distance = 2.0
-        distance_factor = 1.0 / (1.0 + abs(distance - optimal_distance))
-        
-        # Energy balance factor
-        energy_balance = 1.0 - abs(matter.energy_state + antimatter.energy_state) / 2.0
-        
-        # Phase synchronization factor  
-        phase_sync = (1.0 + math.cos(matter.phase - antimatter.phase)) / 2.0
-        
-        # Overall stability
-        stability = distance_factor * energy_balance * phase_sync * pair.pairing_strength
-        
-        return max(0.0, min(1.0, stability))
-    
-    def update_oscillations(self, dt: float):
-        """Update tetrahedron oscillations based on time step"""
-        for pair in self.simulation_state.pairs:
-            # Update matter tetrahedron
-            matter = pair.matter_tetrahedron
-            matter.phase += matter.oscillation_frequency * dt
-            matter.energy_state = 1.0 + 0.3 * math.sin(matter.phase)
-            
-            # Update antimatter tetrahedron (synchronized but inverted)
-            antimatter = pair.antimatter_tetrahedron
-            antimatter.phase += antimatter.oscillation_frequency * dt
-            antimatter.energy_state = -(1.0 + 0.3 * math.sin(antimatter.phase))
-            
-            # Update pair stability
-            pair.stability_factor = self.calculate_pair_stability(pair)
-    
-    def create_tetrahedron_pair(self, center: Vector3D, separation: float = 2.0) -> TetrahedronPair:
-        """Create a new matter-antimatter tetrahedron pair"""
-        # Create matter tetrahedron
-        matter_center = Vector3D(
-            x=center.x - separation/2,
-            y=center.y,
-            z=center.z
-        )
-        matter_vertices = self.create_regular_tetrahedron(matter_center)
-        matter_tetrahedron = Tetrahedron(
-            vertices=matter_vertices,
-            center=matter_center,
-            energy_state=1.0,
-            oscillation_frequency=random.uniform(0.5, 2.0),
-            phase=random.uniform(0, 2*math.pi),
-            particle_type="matter"
-        )
-        
-        # Create antimatter tetrahedron
-        antimatter_center = Vector3D(
-            x=center.x + separation/2,
-            y=center.y,
-            z=center.z
-        )
-        antimatter_vertices = self.create_regular_tetrahedron(antimatter_center)
-        antimatter_tetrahedron = Tetrahedron(
-            vertices=antimatter_vertices,
-            center=antimatter_center,
-            energy_state=-1.0,
-            oscillation_frequency=matter_tetrahedron.oscillation_frequency,
-            phase=matter_tetrahedron.phase + math.pi,
-            particle_type="antimatter"
-        )
-        
-        # Create pair
-        pair = TetrahedronPair(
-            matter_tetrahedron=matter_tetrahedron,
-            antimatter_tetrahedron=antimatter_tetrahedron,
-            pairing_strength=random.uniform(0.7, 1.0),
-            entanglement_connection=True
-        )
-        
-        pair.stability_factor = self.calculate_pair_stability(pair)
-        return pair
-    
-    def calculate_system_metrics(self):
-        """Calculate overall system stability and energy"""
-        if not self.simulation_state.pairs:
-            self.simulation_state.total_stability = 0.0
-            self.simulation_state.system_energy = 0.0
-            return
-            
-        total_stability = sum(pair.stability_factor for pair in self.simulation_state.pairs)
-        self.simulation_state.total_stability = total_stability / len(self.simulation_state.pairs)
-        
-        total_energy = sum(
-            abs(pair.matter_tetrahedron.energy_state) + abs(pair.antimatter_tetrahedron.energy_state)
-            for pair in self.simulation_state.pairs
-        )
-        self.simulation_state.system_energy = total_energy
+def validate_radius(radius: float):
+    if radius < 0:
+        raise HTTPException(status_code=400, detail="radius must not be negative")
+
+def validate_box(lo: Tuple[float, float, float], hi: Tuple[float, float, float]):
+    if any(l > h for l, h in zip(lo, hi)):
+        raise HTTPException(status_code=400, detail="box min must not exceed box max")
+
+def validate_pair_query(query: PairQuery, source: str = "engine"):
+    unknown = [field for field in query.fields or () if field not in PAIR_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if query.box_min is not None and query.box_max is not None:
+        validate_box((query.box_min.x, query.box_min.y, query.box_min.z), (query.box_max.x, query.box_max.y, query.box_max.z))
+    if query.cursor is not None:
+        try:
+            decode_cursor(query.cursor, source, query.sort)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def validate_tick_rates(request: TickRates, ticker: SimulationTicker):
+    tick_rate = request.tick_rate or ticker.tick_rate
+    broadcast_rate = request.broadcast_rate or min(ticker.broadcast_rate, tick_rate)
+    if broadcast_rate > tick_rate:
+        raise HTTPException(status_code=400, detail="broadcast_rate cannot exceed tick_rate")
+    if (request.min_broadcast_rate or 0) > broadcast_rate:
+        raise HTTPException(status_code=400, detail="min_broadcast_rate cannot exceed broadcast_rate")
+
+def validate_no_batch_step(lock: asyncio.Lock):
+    # Resets and bulk loads rebuild the engine arrays the batch step thread is
+    # writing; single adds/removes are deferred by the engine instead
+    if lock.locked():
+        raise HTTPException(status_code=409, detail="A batch step is in progress")
+
+def validate_sweep(spec: SweepSpec):
+    try:
+        check_sweep(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Global engine instance
-engine = TetracoreEngine()
+engine = create_engine(seed=SIMULATION_SEED)
+manager = ConnectionManager()
+snapshot_cache = SnapshotCache(engine)
+persister = StatePersister(engine, db.tetrahedron_pairs, db.simulation_state)
+checkpointer = Checkpointer(engine)
+history = MetricsHistory(collection=db.metrics_history if METRICS_PERSIST else None)
+pair_index_task: Optional[asyncio.Task] = None  # creates the pair collection indexes at startup
+ticker = SimulationTicker(engine, manager, snapshot_cache, persister, history)
+sessions = SessionRegistry()
+# Held while a headless batch step runs, so the ticker cannot step concurrently
+batch_lock = asyncio.Lock()
+sweeps: Dict[str, SweepRun] = {}
+
+# Scrape-time gauges over the main simulation and every session
+def connection_managers() -> List[ConnectionManager]:
+    return [manager, *(session.manager for session in sessions.sessions.values())]
+
+def _client_counts():
+    counts: Dict[str, int] = {}
+    for connections in connection_managers():
+        for channel in connections.channels.values():
+            counts[channel.protocol] = counts.get(channel.protocol, 0) + 1
+    return [((protocol,), count) for protocol, count in sorted(counts.items())]
+
+def _queued_messages():
+    depths = [len(channel.pending) for connections in connection_managers() for channel in connections.channels.values()]
+    return [(("max",), max(depths, default=0)), (("total",), sum(depths))]
+
+registry.register(Gauge("tetracore_ws_clients", "Connected WebSocket clients, by protocol", _client_counts, ("protocol",)))
+registry.register(Gauge("tetracore_ws_queued_messages", "Messages waiting in client queues", _queued_messages, ("stat",)))
+registry.register(Gauge(
+    "tetracore_broadcast_rate", "Current broadcast frames per second, by protocol",
+    lambda: [((protocol,), rate) for protocol, rate in ticker.stats()["broadcast_rates"].items()], ("protocol",),
+))
+registry.register(Gauge("tetracore_tick_load", "Estimated fraction of wall time used by the tick loop", lambda: [((), ticker.load())]))
+registry.register(Gauge("tetracore_pairs", "Pairs in the main simulation", lambda: [((), engine.pair_count)]))
+registry.register(Gauge("tetracore_sessions", "Live simulation sessions", lambda: [((), len(sessions.sessions))]))
+
+@app.on_event("startup")
+async def startup():
+    if RESTORE_ON_STARTUP:
+        try:
+            restored = await restore_state(engine, db.tetrahedron_pairs, db.simulation_state)
+            print(f"Restored {restored['pairs']} pairs from {restored['source']} in {restored['seconds']:.2f}s")
+        except Exception as e:
+            print(f"Database error: {e}")
+        snapshot_cache.invalidate()
+    global pair_index_task
+    pair_index_task = asyncio.create_task(ensure_pair_indexes(db.tetrahedron_pairs))
+    ticker.start()
+    persister.start()
+    checkpointer.start()
+    history.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ticker.stop()
+    await persister.stop()
+    await checkpointer.stop()
+    await history.stop()
+    sessions.shutdown()
+    for sweep in sweeps.values():
+        sweep.cancel()
+
+def resync_delta_clients():
+    """Send delta clients a fresh snapshot after changes too large for add/remove events"""
+    if "delta" in manager.protocols_in_use():
+        manager.broadcast(snapshot_cache.frame("snapshot"), "delta")
 
 # API Endpoints
 @app.get("/api/status")
@@ -272,34 +168,103 @@ async def get_status():
     return {"status": "Tetracore Server Running", "version": "1.0.0"}
 
 @app.get("/api/simulation/state")
-async def get_simulation_state():
-    engine.calculate_system_metrics()
-    return engine.simulation_state
+async def get_simulation_state(request: Request):
+    # Served from the per-tick cache; no-cache makes browsers revalidate with If-None-Match
+    headers = {"ETag": snapshot_cache.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot_cache.body(), media_type="application/json", headers=headers)
+
+@app.get("/api/simulation/persistence")
+async def get_persistence_stats():
+    return persister.stats()
+
+@app.get("/api/simulation/rates")
+async def get_tick_rates():
+    """Simulation and broadcast rate targets, measured costs and the adapted per-protocol rates"""
+    return ticker.stats()
+
+@app.put("/api/simulation/rates")
+async def set_tick_rates(request: TickRates):
+    validate_tick_rates(request, ticker)
+    ticker.configure(**request.model_dump(exclude_none=True))
+    return ticker.stats()
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Performance counters in Prometheus text format"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/simulation/metrics")
+async def get_metrics_history(start: Optional[float] = Query(None, alias="from"), end: Optional[float] = Query(None, alias="to"),
+                              resolution: Literal["auto", "raw", "1s", "1m"] = "auto"):
+    """System metrics between simulation times ``from`` and ``to``, as min/max/mean columns"""
+    return history.series(start, end, resolution)
+
+@app.get("/api/simulation/metrics/pairs/{pair_id}")
+async def get_pair_metrics_history(pair_id: str, start: Optional[float] = Query(None, alias="from"),
+                                   end: Optional[float] = Query(None, alias="to")):
+    if not history.pair_snapshots:
+        raise HTTPException(status_code=404, detail="Per-pair history is disabled (METRICS_PAIR_HISTORY=0)")
+    key = engine.pair_key(pair_id)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Pair not found")
+    return {"pair_id": pair_id, **history.pair_series(key, start, end)}
 
 @app.post("/api/simulation/start")
 async def start_simulation():
+    validate_no_batch_step(batch_lock)
     engine.simulation_state.running = True
+    snapshot_cache.invalidate()
+    ticker.resume()
     return {"message": "Simulation started", "running": True}
 
 @app.post("/api/simulation/stop")
 async def stop_simulation():
     engine.simulation_state.running = False
+    snapshot_cache.invalidate()
     return {"message": "Simulation stopped", "running": False}
 
 @app.post("/api/simulation/reset")
-async def reset_simulation():
-    engine.simulation_state = SimulationState()
+async def reset_simulation(seed: Optional[int] = None):
+    validate_no_batch_step(batch_lock)
+    engine.reset(seed)
+    history.clear()
+    snapshot_cache.invalidate()
+    resync_delta_clients()
+    # Otherwise the next restore would bring the removed pairs back
+    await checkpointer.clear()
+    await persister.clear()
     return {"message": "Simulation reset"}
 
+@app.post("/api/simulation/step")
+async def step_simulation(request: StepRequest):
+    if engine.simulation_state.running or batch_lock.locked():
+        raise HTTPException(status_code=409, detail="Stop the simulation before batch stepping")
+    async with batch_lock:
+        # Off the event loop so WebSocket clients stay served; pair
+        # adds/removes meanwhile are deferred between steps as usual
+        samples = await asyncio.to_thread(engine.run, request.steps, request.dt, request.sample_every)
+    snapshot_cache.invalidate()
+    persister.mark_dirty(request.steps)
+    snapshot_cache.refresh_metrics()
+    history.record(engine)
+    ticker.publish()
+    return {"message": "Simulation stepped", "steps": request.steps, "samples": samples}
+
 @app.post("/api/pairs/create")
 async def create_pair(center_x: float = 0, center_y: float = 0, center_z: float = 0, separation: float = 2.0):
     center = Vector3D(x=center_x, y=center_y, z=center_z)
-    pair = engine.create_tetrahedron_pair(center, separation)
-    engine.simulation_state.pairs.append(pair)
+    record = engine.build_pair(center, separation)
+    pair = record.materialize()
+    engine.add_pair(record)
+    snapshot_cache.invalidate()
+    manager.broadcast(encode_pair_added(engine, pair), "delta")
     
     # Save to database
     try:
-        await db.tetrahedron_pairs.insert_one(pair.model_dump())
+        with MONGO_OP_SECONDS.labels("insert_one").time():
+            await db.tetrahedron_pairs.insert_one(pair.model_dump())
     except Exception as e:
         print(f"Database error: {e}")
     
@@ -307,47 +272,358 @@ async def create_pair(center_x: float = 0, center_y: float = 0, center_z: float
 
 @app.delete("/api/pairs/{pair_id}")
 async def delete_pair(pair_id: str):
-    engine.simulation_state.pairs = [p for p in engine.simulation_state.pairs if p.id != pair_id]
+    key = engine.pair_key(pair_id)
+    if engine.remove_pair(pair_id):
+        snapshot_cache.invalidate()
+        manager.broadcast(encode_pair_removed(key, pair_id), "delta")
     
     # Remove from database
     try:
-        await db.tetrahedron_pairs.delete_one({"id": pair_id})
+        with MONGO_OP_SECONDS.labels("delete_one").time():
+            await db.tetrahedron_pairs.delete_one({"id": pair_id})
     except Exception as e:
         print(f"Database error: {e}")
     
     return {"message": "Tetrahedron pair deleted"}
 
+@app.post("/api/pairs/bulk")
+async def create_pairs_bulk(request: BulkCreateRequest):
+    validate_bulk_create(request)
+    validate_no_batch_step(batch_lock)
+    pair_ids = engine.create_pairs(*bulk_create_arrays(request))
+    snapshot_cache.invalidate()
+    resync_delta_clients()
+
+    # Save to database in unordered batches.  Documents are built before the
+    # first await; pairs a client deleted meanwhile are skipped, not stored
+    documents = engine.pair_documents(pair_ids)
+    for start in range(0, len(documents), BULK_WRITE_CHUNK):
+        chunk = [d for d in documents[start:start + BULK_WRITE_CHUNK] if engine.pair_key(d["id"]) is not None]
+        if not chunk:
+            continue
+        try:
+            with MONGO_OP_SECONDS.labels("insert_many").time():
+                await db.tetrahedron_pairs.insert_many(chunk, ordered=False)
+        except Exception as e:
+            print(f"Database error: {e}")
+
+    return {"message": "Tetrahedron pairs created", "count": len(pair_ids), "pair_ids": pair_ids}
+
+@app.post("/api/pairs/bulk/delete")
+async def delete_pairs_bulk(request: BulkDeleteRequest):
+    validate_bulk_delete(request)
+    pair_ids = bulk_delete_ids(engine, request)
+
+    deleted = sum(engine.remove_pair(pair_id) for pair_id in pair_ids)
+    if deleted:
+        snapshot_cache.invalidate()
+        resync_delta_clients()
+
+    # Remove from database in batches
+    for start in range(0, len(pair_ids), BULK_WRITE_CHUNK):
+        try:
+            with MONGO_OP_SECONDS.labels("delete_many").time():
+                await db.tetrahedron_pairs.delete_many({"id": {"$in": pair_ids[start:start + BULK_WRITE_CHUNK]}})
+        except Exception as e:
+            print(f"Database error: {e}")
+
+    return {"message": "Tetrahedron pairs deleted", "deleted": deleted}
+
+def pair_query(limit: int = Query(PAIR_PAGE_SIZE, gt=0, le=PAIR_PAGE_MAX), cursor: Optional[str] = None,
+               sort: Literal["index", "stability", "-stability"] = "index",
+               min_stability: Optional[float] = None, max_stability: Optional[float] = None,
+               particle_type: Optional[str] = None,
+               min_x: Optional[float] = None, min_y: Optional[float] = None, min_z: Optional[float] = None,
+               max_x: Optional[float] = None, max_y: Optional[float] = None, max_z: Optional[float] = None,
+               fields: Optional[str] = None) -> PairQuery:
+    """Query parameters of the pair listings; box bounds left out are unbounded"""
+    def bound(x, y, z, default):
+        if x is None and y is None and z is None:
+            return None
+        return Vector3D(**{axis: default if v is None else v for axis, v in zip("xyz", (x, y, z))})
+
+    return PairQuery(
+        limit=limit, cursor=cursor, sort=sort, min_stability=min_stability, max_stability=max_stability,
+        particle_type=particle_type, box_min=bound(min_x, min_y, min_z, -math.inf),
+        box_max=bound(max_x, max_y, max_z, math.inf),
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields is not None else None,
+    )
+
 @app.get("/api/pairs")
-async def get_all_pairs():
-    return {"pairs": engine.simulation_state.pairs}
+async def get_all_pairs(query: PairQuery = Depends(pair_query), source: Literal["engine", "database"] = "engine"):
+    """One page of pairs; pass ``next_cursor`` back as ``cursor`` for the next one"""
+    validate_pair_query(query, source)
+    if source == "database":
+        try:
+            page = await query_stored_pairs(db.tetrahedron_pairs, query, engine)
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise HTTPException(status_code=503, detail="Database unavailable")
+    else:
+        page = engine.query_pairs(query)
+    return json_response(to_json(page).decode())
+
+@app.get("/api/pairs/nearby")
+async def get_pairs_nearby(x: float = 0, y: float = 0, z: float = 0, radius: float = 10.0,
+                           limit: int = Query(1000, gt=0, le=PAIR_PAGE_MAX)):
+    """Pairs whose midpoint is within ``radius`` of (x, y, z), nearest first"""
+    validate_radius(radius)
+    return pairs_nearby(engine, (x, y, z), radius, limit)
+
+@app.get("/api/pairs/box")
+async def get_pairs_in_box(min_x: float, min_y: float, min_z: float, max_x: float, max_y: float, max_z: float,
+                           limit: int = Query(1000, gt=0, le=PAIR_PAGE_MAX)):
+    """Pairs whose midpoint lies inside the axis-aligned box"""
+    lo, hi = (min_x, min_y, min_z), (max_x, max_y, max_z)
+    validate_box(lo, hi)
+    return pairs_in_box(engine, lo, hi, limit)
 
 @app.get("/api/pairs/{pair_id}")
 async def get_pair(pair_id: str):
-    pair = next((p for p in engine.simulation_state.pairs if p.id == pair_id), None)
+    pair = engine.get_pair(pair_id)
     if not pair:
         raise HTTPException(status_code=404, detail="Pair not found")
     return pair
 
+# Parameter sweeps; results go to the sweep_results collection
+async def run_sweep_task(sweep: SweepRun):
+    try:
+        await sweep.run([MongoSweepSink(db.sweep_results, sweep.id)])
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        sweep.status = "failed"
+        print(f"Sweep error: {e}")
+
+@app.post("/api/sweeps")
+async def create_sweep(spec: SweepSpec):
+    validate_sweep(spec)
+    sweep = SweepRun(spec)
+    prune_sweeps(sweeps)
+    sweeps[sweep.id] = sweep
+    sweep.task = asyncio.create_task(run_sweep_task(sweep))
+    return sweep.progress()
+
+@app.get("/api/sweeps")
+async def list_sweeps():
+    return {"sweeps": [sweep.progress() for sweep in sweeps.values()]}
+
+def get_sweep_run(sweep_id: str) -> SweepRun:
+    sweep = sweeps.get(sweep_id)
+    if sweep is None:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    return sweep
+
+@app.get("/api/sweeps/{sweep_id}")
+async def get_sweep(sweep_id: str):
+    return get_sweep_run(sweep_id).progress()
+
+@app.get("/api/sweeps/{sweep_id}/results")
+async def get_sweep_results(sweep_id: str):
+    try:
+        results = await db.sweep_results.find({"sweep_id": sweep_id}, {"_id": 0}).sort("config_id").to_list(None)
+    except Exception as e:
+        print(f"Database error: {e}")
+        raise HTTPException(status_code=503, detail="Sweep results unavailable")
+    return {"results": results}
+
+@app.delete("/api/sweeps/{sweep_id}")
+async def cancel_sweep(sweep_id: str):
+    get_sweep_run(sweep_id).cancel()
+    return {"message": "Sweep cancelled"}
+
+# Session endpoints: same API as above, scoped to one session's engine
+def json_response(body: str) -> Response:
+    return Response(content=body, media_type="application/json")
+
+async def session_info(session: Session) -> dict:
+    return {"session_id": session.id, "worker": session.worker.index,
+            "created_at": session.created_at.isoformat(), "clients": len(session.manager.active_connections),
+            **await session.call("info")}
+
+@app.post("/api/sessions")
+async def create_session(session_id: Optional[str] = None, seed: Optional[int] = None):
+    session = await sessions.create(session_id, seed)
+    return await session_info(session)
+
+@app.get("/api/sessions")
+async def list_sessions():
+    return {"sessions": [await session_info(session) for session in list(sessions.sessions.values())]}
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    return await session_info(sessions.get(session_id))
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    await sessions.delete(session_id)
+    return {"message": "Session deleted"}
+
+@app.get("/api/sessions/{session_id}/simulation/state")
+async def get_session_state(session_id: str):
+    return json_response(await sessions.get(session_id).call("state"))
+
+@app.post("/api/sessions/{session_id}/simulation/start")
+async def start_session(session_id: str):
+    await sessions.get(session_id).call("set_running", running=True)
+    return {"message": "Simulation started", "running": True}
+
+@app.post("/api/sessions/{session_id}/simulation/stop")
+async def stop_session(session_id: str):
+    await sessions.get(session_id).call("set_running", running=False)
+    return {"message": "Simulation stopped", "running": False}
+
+@app.post("/api/sessions/{session_id}/simulation/reset")
+async def reset_session(session_id: str, seed: Optional[int] = None):
+    session = sessions.get(session_id)
+    session.resync(await session.call("reset", seed=seed))
+    return {"message": "Simulation reset"}
+
+@app.post("/api/sessions/{session_id}/simulation/step")
+async def step_session(session_id: str, request: StepRequest):
+    samples = await sessions.get(session_id).call("run", request=request.model_dump(), timeout=SESSION_RUN_TIMEOUT)
+    if samples is None:
+        raise HTTPException(status_code=409, detail="Stop the simulation before batch stepping")
+    return {"message": "Simulation stepped", "steps": request.steps, "samples": samples}
+
+@app.post("/api/sessions/{session_id}/pairs/create")
+async def create_session_pair(session_id: str, center_x: float = 0, center_y: float = 0, center_z: float = 0,
+                              separation: float = 2.0):
+    session = sessions.get(session_id)
+    pair_id, event = await session.call("create_pair", center=(center_x, center_y, center_z), separation=separation)
+    session.manager.broadcast(event, "delta")
+    return {"message": "Tetrahedron pair created", "pair_id": pair_id}
+
+@app.delete("/api/sessions/{session_id}/pairs/{pair_id}")
+async def delete_session_pair(session_id: str, pair_id: str):
+    session = sessions.get(session_id)
+    event = await session.call("delete_pair", pair_id=pair_id)
+    if event is not None:
+        session.manager.broadcast(event, "delta")
+    return {"message": "Tetrahedron pair deleted"}
+
+@app.post("/api/sessions/{session_id}/pairs/bulk")
+async def create_session_pairs_bulk(session_id: str, request: BulkCreateRequest):
+    session = sessions.get(session_id)
+    validate_bulk_create(request)
+    pair_ids, snapshot = await session.call("create_pairs", request=request.model_dump())
+    session.resync(snapshot)
+    return {"message": "Tetrahedron pairs created", "count": len(pair_ids), "pair_ids": pair_ids}
+
+@app.post("/api/sessions/{session_id}/pairs/bulk/delete")
+async def delete_session_pairs_bulk(session_id: str, request: BulkDeleteRequest):
+    session = sessions.get(session_id)
+    validate_bulk_delete(request)
+    deleted, snapshot = await session.call("delete_pairs", request=request.model_dump())
+    session.resync(snapshot)
+    return {"message": "Tetrahedron pairs deleted", "deleted": deleted}
+
+@app.get("/api/sessions/{session_id}/pairs")
+async def get_session_pairs(session_id: str, query: PairQuery = Depends(pair_query)):
+    session = sessions.get(session_id)
+    validate_pair_query(query)
+    return json_response(await session.call("query_pairs", query=query.model_dump()))
+
+@app.get("/api/sessions/{session_id}/pairs/nearby")
+async def get_session_pairs_nearby(session_id: str, x: float = 0, y: float = 0, z: float = 0, radius: float = 10.0,
+                                   limit: int = Query(1000, gt=0, le=PAIR_PAGE_MAX)):
+    session = sessions.get(session_id)
+    validate_radius(radius)
+    return await session.call("pairs_nearby", center=(x, y, z), radius=radius, limit=limit)
+
+@app.get("/api/sessions/{session_id}/pairs/box")
+async def get_session_pairs_in_box(session_id: str, min_x: float, min_y: float, min_z: float,
+                                   max_x: float, max_y: float, max_z: float,
+                                   limit: int = Query(1000, gt=0, le=PAIR_PAGE_MAX)):
+    session = sessions.get(session_id)
+    lo, hi = (min_x, min_y, min_z), (max_x, max_y, max_z)
+    validate_box(lo, hi)
+    return await session.call("pairs_in_box", lo=lo, hi=hi, limit=limit)
+
+@app.get("/api/sessions/{session_id}/pairs/{pair_id}")
+async def get_session_pair(session_id: str, pair_id: str):
+    pair = await sessions.get(session_id).call("get_pair", pair_id=pair_id)
+    if pair is None:
+        raise HTTPException(status_code=404, detail="Pair not found")
+    return json_response(pair)
+
 # WebSocket endpoint for real-time updates
+def negotiate_protocol(websocket: WebSocket, formats=FRAME_ENCODERS) -> Tuple[Optional[str], Optional[str]]:
+    """Frame format and accepted subprotocol for a connection; format is None if invalid"""
+    if BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return "binary", BINARY_SUBPROTOCOL
+    protocol = websocket.query_params.get("format", "full")
+    if protocol not in formats or protocol == "binary":
+        return None, None
+    return protocol, None
+
+async def wait_for_disconnect(websocket: WebSocket):
+    # Frames are pushed by the ticker; just wait for the client to leave
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+async def receive_views(websocket: WebSocket):
+    """Apply the LodView messages of a ``lod`` client until it disconnects"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        channel = manager.channels.get(websocket)
+        if channel is None:
+            return
+        try:
+            channel.view = LodView.model_validate_json(message.get("text") or message.get("bytes") or b"")
+        except ValueError as e:
+            manager.send(websocket, json.dumps({"type": "error", "detail": str(e)}))
+            continue
+        # Encoded by the ticker at the lod broadcast rate, also while the simulation is stopped
+        ticker.view_changed(channel)
+
 @app.websocket("/api/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    protocol, subprotocol = negotiate_protocol(websocket, [*FRAME_ENCODERS, LOD_PROTOCOL])
+    if protocol is None:
+        await websocket.close(code=1008)
+        return
+
+    await manager.connect(websocket, protocol, subprotocol)
     try:
-        while True:
-            if engine.simulation_state.running:
-                # Update simulation
-                engine.update_oscillations(0.1)
-                engine.calculate_system_metrics()
-                engine.simulation_state.time_step += 0.1
-                
-                # Broadcast update
-                await manager.broadcast(engine.simulation_state.model_dump_json())
-            
-            await asyncio.sleep(0.1)  # 10 FPS update rate
-            
-    except WebSocketDisconnect:
+        if protocol == "delta":
+            # Queued right after registration, so it is the first frame this client sees
+            manager.send(websocket, snapshot_cache.frame("snapshot"))
+        if protocol == LOD_PROTOCOL:
+            manager.send(websocket, snapshot_cache.lod_frame(manager.channels[websocket].view), conflate=True)
+            await receive_views(websocket)
+        else:
+            await wait_for_disconnect(websocket)
+    finally:
         manager.disconnect(websocket)
 
+@app.websocket("/api/sessions/{session_id}/ws")
+async def session_websocket_endpoint(websocket: WebSocket, session_id: str):
+    session = sessions.sessions.get(session_id)
+    protocol, subprotocol = negotiate_protocol(websocket)
+    if session is None or protocol is None:
+        await websocket.close(code=1008)
+        return
+
+    await session.manager.connect(websocket, protocol, subprotocol)
+    try:
+        await session.subscribe()
+        if protocol == "delta":
+            session.manager.send(websocket, await session.call("snapshot"))
+        await wait_for_disconnect(websocket)
+    except (SessionError, WebSocketDisconnect):
+        pass
+    finally:
+        session.manager.disconnect(websocket)
+        if session_id in sessions.sessions:
+            await session.subscribe()
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Serve from a fresh ``python -m uvicorn`` process: session and sweep
+    # workers are spawned and re-run the main script, which must not be this
+    # module with its app, database client and global engine
+    sys.exit(subprocess.call([sys.executable, "-m", "uvicorn", "server:app", "--host", "0.0.0.0", "--port", "8001"]))
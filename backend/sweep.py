@@ -0,0 +1,85 @@
+"""Run a parameter sweep across a process pool from the command line.
+
+    python sweep.py --grid separation=1,2,3 --grid pairing_strength=0.7,0.85,1.0 --out sweep.npz
+    python sweep.py --range oscillation_frequency=0.5:2.0 --samples 200 --mongo
+
+Results are streamed as configurations finish: to a columnar ``.npz`` file
+(one row per configuration and sample) with ``--out``, and/or to the
+``sweep_results`` collection with ``--mongo``.
+"""
+import argparse
+import asyncio
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from tetracore.config import DB_NAME, MONGO_URL, SWEEP_WORKERS, TICK_RATE
+from tetracore.engine import ENGINES
+from tetracore.models import SWEEP_PARAMETERS, SweepSpec
+from tetracore.sweeps import MongoSweepSink, NpzSweepSink, SweepRun, check_sweep
+
+
+def parse_values(text: str):
+    name, _, values = text.partition("=")
+    if name not in SWEEP_PARAMETERS:
+        raise argparse.ArgumentTypeError(f"unknown parameter {name!r}, expected one of {SWEEP_PARAMETERS}")
+    return name, values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=parse_values, action="append", default=[], metavar="NAME=V1,V2,...")
+    parser.add_argument("--range", type=parse_values, action="append", default=[], metavar="NAME=LOW:HIGH")
+    parser.add_argument("--samples", type=int, default=0)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="vectorized")
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--spacing", type=float, default=5.0)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--dt", type=float, default=1.0 / TICK_RATE)
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--out", help="columnar .npz result file")
+    parser.add_argument("--mongo", action="store_true", help="store results in MONGO_URL/DB_NAME sweep_results")
+    args = parser.parse_args()
+
+    spec = SweepSpec(
+        grid={name: [float(v) for v in values.split(",")] for name, values in args.grid},
+        ranges={name: tuple(float(v) for v in values.split(":")) for name, values in args.range},
+        samples=args.samples, engine=args.engine, pairs=args.pairs, spacing=args.spacing,
+        steps=args.steps, dt=args.dt, sample_every=args.sample_every, seed=args.seed,
+    )
+    try:
+        check_sweep(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    asyncio.run(run(spec, args))
+
+
+async def run(spec: SweepSpec, args):
+    sweep = SweepRun(spec)
+    sinks = []
+    if args.out:
+        sinks.append(NpzSweepSink(args.out))
+    if args.mongo:
+        db = AsyncIOMotorClient(MONGO_URL)[DB_NAME]
+        sinks.append(MongoSweepSink(db.sweep_results, sweep.id))
+
+    last = 0.0
+
+    def report(progress: dict):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= 1.0 or progress["done"] == progress["total"]:
+            last = now
+            print(f"[{progress['done']}/{progress['total']}] {progress['configs_per_second']:.1f} configs/s")
+
+    print(f"Sweep {sweep.id}: {len(sweep.configs)} configurations on {args.workers} workers")
+    await sweep.run(sinks, args.workers, report)
+    progress = sweep.progress()
+    print(f"{progress['done']} done, {progress['failed']} failed in {progress['elapsed']:.1f}s "
+          f"({progress['configs_per_second']:.1f} configs/s)")
+
+
+if __name__ == "__main__":
+    main()
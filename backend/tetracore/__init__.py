@@ -0,0 +1,7 @@
+"""Simulation core of the Tetracore server.
+
+Engines, frame encoders, persistence and the session worker side live here
+without import-time side effects, so worker processes and command-line
+tools can import them without building the API app, its database client or
+the global engine; ``server`` wires them into the FastAPI app.
+"""
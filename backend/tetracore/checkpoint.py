@@ -0,0 +1,18 @@
+"""Checkpoint files of the vectorized engine's arrays"""
+import os
+from typing import Dict
+
+import numpy as np
+
+CHECKPOINT_VERSION = 2
+
+def write_checkpoint(path: str, arrays: Dict[str, np.ndarray]):
+    """Atomically write a compressed checkpoint"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+
+def read_checkpoint(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
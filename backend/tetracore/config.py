@@ -0,0 +1,44 @@
+"""Settings read from the environment, shared by the server, workers and command-line tools"""
+import os
+
+# Environment variables
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "tetracore_db")
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
+TICK_RATE = float(os.getenv("TICK_RATE", "10"))  # simulation ticks per second
+MAX_TICK_STEPS = int(os.getenv("MAX_TICK_STEPS", "5"))  # catch-up steps allowed per wakeup
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", os.getenv("TICK_RATE", "10")))  # target frames per second per client
+MIN_BROADCAST_RATE = float(os.getenv("MIN_BROADCAST_RATE", "1"))  # floor when broadcasts are throttled under load
+TICK_CPU_BUDGET = float(os.getenv("TICK_CPU_BUDGET", "0.5"))  # fraction of wall time the tick loop may use
+ENGINE_MODE = os.getenv("ENGINE_MODE", "vectorized")  # "vectorized" or "object"
+CLIENT_QUEUE_SIZE = int(os.getenv("CLIENT_QUEUE_SIZE", "64"))  # queued events per WebSocket client
+SLOW_CLIENT_TIMEOUT = float(os.getenv("SLOW_CLIENT_TIMEOUT", "5"))  # seconds a client may lag before eviction
+MAX_BULK_PAIRS = int(os.getenv("MAX_BULK_PAIRS", "100000"))  # pairs per bulk create request
+PAIR_PAGE_SIZE = int(os.getenv("PAIR_PAGE_SIZE", "1000"))  # pairs per GET /api/pairs page by default
+PAIR_PAGE_MAX = int(os.getenv("PAIR_PAGE_MAX", "10000"))  # largest page a client may ask for
+BULK_WRITE_CHUNK = int(os.getenv("BULK_WRITE_CHUNK", "1000"))  # documents per MongoDB batch write
+PERSIST_INTERVAL = float(os.getenv("PERSIST_INTERVAL", "5"))  # seconds between write-behind flushes
+PERSIST_MAX_PENDING = int(os.getenv("PERSIST_MAX_PENDING", "50000"))  # pair updates since the last flush that force an early flush
+RESTORE_ON_STARTUP = os.getenv("RESTORE_ON_STARTUP", "true").lower() == "true"
+RESTORE_BATCH_SIZE = int(os.getenv("RESTORE_BATCH_SIZE", "5000"))  # documents per cursor batch when restoring
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "tetracore_checkpoint.npz")  # empty disables checkpoints
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "60"))  # seconds between checkpoints
+SPATIAL_CELL_SIZE = float(os.getenv("SPATIAL_CELL_SIZE", "5"))  # edge length of a spatial index cell
+INTERACTION_STRENGTH = float(os.getenv("INTERACTION_STRENGTH", "0"))  # inter-pair damping; 0 disables it
+INTERACTION_RADIUS = float(os.getenv("INTERACTION_RADIUS", "5"))  # pairs closer than this interact
+LOD_MAX_FULL = int(os.getenv("LOD_MAX_FULL", "200"))  # pairs with full vertex data per LOD frame
+LOD_MAX_CENTERS = int(os.getenv("LOD_MAX_CENTERS", "2000"))  # center-only records per LOD frame
+LOD_MAX_CLUSTERS = int(os.getenv("LOD_MAX_CLUSTERS", "512"))  # cluster summaries per LOD frame
+SIMULATION_SEED = int(os.environ["SIMULATION_SEED"]) if os.getenv("SIMULATION_SEED") else None  # seeds the global engine
+MAX_BATCH_STEPS = int(os.getenv("MAX_BATCH_STEPS", "1000000"))  # steps per headless step request
+METRICS_HISTORY_SIZE = int(os.getenv("METRICS_HISTORY_SIZE", "36000"))  # raw ticks kept in memory
+METRICS_ROLLUP_SIZE = int(os.getenv("METRICS_ROLLUP_SIZE", "86400"))  # buckets kept per rollup resolution
+METRICS_PAIR_HISTORY = int(os.getenv("METRICS_PAIR_HISTORY", "0"))  # per-second per-pair snapshots; 0 disables
+METRICS_MAX_POINTS = int(os.getenv("METRICS_MAX_POINTS", "1000"))  # points per series when resolution=auto
+METRICS_PERSIST = os.getenv("METRICS_PERSIST", "false").lower() == "true"  # 1 s rollups to a time-series collection
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 1)))  # worker processes per sweep
+MAX_SWEEP_CONFIGS = int(os.getenv("MAX_SWEEP_CONFIGS", "10000"))  # configurations per sweep
+SWEEP_HISTORY = int(os.getenv("SWEEP_HISTORY", "100"))  # ended sweeps whose progress stays queryable
+SESSION_WORKERS = int(os.getenv("SESSION_WORKERS", str(os.cpu_count() or 1)))  # worker processes for sessions
+SESSION_CALL_TIMEOUT = float(os.getenv("SESSION_CALL_TIMEOUT", "30"))  # seconds a session command may take
+SESSION_RUN_TIMEOUT = float(os.getenv("SESSION_RUN_TIMEOUT", "3600"))  # seconds a session batch step may take
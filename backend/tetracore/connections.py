@@ -0,0 +1,159 @@
+"""Per-client WebSocket queues and the fan-out over them"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from tetracore.config import CLIENT_QUEUE_SIZE, SLOW_CLIENT_TIMEOUT
+from tetracore.instrumentation import WS_DROPPED_FRAMES, WS_EVICTIONS, WS_QUEUE_DEPTH, WS_SEND_SECONDS, WS_SENT_BYTES
+from tetracore.models import LodView
+
+# Fixed values of the eviction counter's ``reason`` label
+EVICTION_REASONS = ("send_failed", "queue_full", "too_slow", "session_deleted", "worker_exited")
+
+class ClientChannel:
+    """Outbound queue and sender task for one WebSocket connection.
+
+    Tick frames are conflated: if the previous tick frame is still waiting
+    to be sent it is replaced by the new one, so a slow client only ever
+    receives the latest state.  Events (snapshots, add/remove) are never
+    dropped; if ``max_queue`` of them pile up the client is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, protocol: str, max_queue: int):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.max_queue = max_queue
+        self.pending: Deque[Tuple[object, bool]] = deque()
+        # Camera of a "lod" client, which gets frames encoded just for it, and
+        # whether it moved since the last frame it was sent
+        self.view = LodView()
+        self.view_changed = False
+        self.dropped_frames = 0
+        self.behind_since: Optional[float] = None
+        self._ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, message, conflate: bool = False) -> bool:
+        """Queue ``message``; returns False if the queue is full"""
+        if conflate and self.pending and self.pending[-1][1]:
+            self.pending[-1] = (message, True)
+            self.dropped_frames += 1
+            WS_DROPPED_FRAMES.inc()
+            if self.behind_since is None:
+                self.behind_since = asyncio.get_running_loop().time()
+        elif len(self.pending) >= self.max_queue:
+            return False
+        else:
+            self.pending.append((message, conflate))
+        self._ready.set()
+        return True
+
+    def lagging_for(self, now: float) -> float:
+        return 0.0 if self.behind_since is None else now - self.behind_since
+
+    async def run(self):
+        send_seconds = WS_SEND_SECONDS.labels(self.protocol)
+        sent_bytes = WS_SENT_BYTES.labels(self.protocol)
+        while True:
+            if not self.pending:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            message, _ = self.pending.popleft()
+            WS_QUEUE_DEPTH.observe(len(self.pending))
+            start = time.perf_counter()
+            if isinstance(message, bytes):
+                await self.websocket.send_bytes(message)
+            else:
+                await self.websocket.send_text(message)
+            send_seconds.observe(time.perf_counter() - start)
+            # Frames are ASCII JSON or bytes, so len() is the byte count
+            sent_bytes.inc(len(message))
+            if not self.pending:
+                self.behind_since = None
+
+class ConnectionManager:
+    """Fans frames out to every connection through its own ClientChannel.
+
+    ``broadcast`` only enqueues, so the tick never waits on a socket and one
+    stalled dashboard cannot delay the others.  Connections whose sender
+    fails, whose event queue overflows, or that have been conflating frames
+    for longer than ``slow_client_timeout`` seconds are evicted.
+    """
+
+    def __init__(self, max_queue: int = CLIENT_QUEUE_SIZE, slow_client_timeout: float = SLOW_CLIENT_TIMEOUT):
+        self.max_queue = max_queue
+        self.slow_client_timeout = slow_client_timeout
+        self.channels: Dict[WebSocket, ClientChannel] = {}
+        self.evicted = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.channels)
+
+    async def connect(self, websocket: WebSocket, protocol: str = "full", subprotocol: Optional[str] = None):
+        await websocket.accept(subprotocol=subprotocol)
+        channel = ClientChannel(websocket, protocol, self.max_queue)
+        channel.task = asyncio.create_task(self._run_channel(channel))
+        self.channels[websocket] = channel
+
+    def disconnect(self, websocket: WebSocket):
+        channel = self.channels.pop(websocket, None)
+        if channel is not None and channel.task is not None:
+            channel.task.cancel()
+
+    def protocols_in_use(self) -> List[str]:
+        return sorted({channel.protocol for channel in self.channels.values()})
+
+    def send(self, websocket: WebSocket, message, conflate: bool = False):
+        """Queue a message for a single connection"""
+        channel = self.channels.get(websocket)
+        if channel is not None and not channel.offer(message, conflate):
+            self.evict(websocket, "queue_full")
+
+    def broadcast(self, message, protocol: Optional[str] = None, conflate: bool = False) -> int:
+        return self.broadcast_each(lambda channel: message, protocol, conflate)
+
+    def broadcast_each(self, encode, protocol: Optional[str] = None, conflate: bool = False) -> int:
+        """``broadcast`` with the message built per connection by ``encode(channel)``; returns bytes queued"""
+        now = asyncio.get_running_loop().time()
+        queued = 0
+        for websocket, channel in list(self.channels.items()):
+            if protocol is not None and channel.protocol != protocol:
+                continue
+            message = encode(channel)
+            if not channel.offer(message, conflate):
+                self.evict(websocket, "queue_full")
+                continue
+            queued += len(message)
+            if channel.lagging_for(now) > self.slow_client_timeout:
+                self.evict(websocket, "too_slow")
+        return queued
+
+    def evict(self, websocket: WebSocket, reason: str, detail: str = ""):
+        """Drop a client; ``reason`` is one of ``EVICTION_REASONS``, ``detail`` is only logged"""
+        if websocket not in self.channels:
+            return
+        self.disconnect(websocket)
+        self.evicted += 1
+        WS_EVICTIONS.labels(reason).inc()
+        print(f"Evicting WebSocket client: {reason}" + (f" ({detail})" if detail else ""))
+        asyncio.create_task(self._close(websocket, reason))
+
+    async def _run_channel(self, channel: ClientChannel):
+        try:
+            await channel.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.evict(channel.websocket, "send_failed", str(e))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, reason: str):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013, reason=reason), timeout=1.0)
+        except Exception:
+            pass
@@ -0,0 +1,1121 @@
+"""The simulation engines: per-pair objects and a structure-of-arrays variant"""
+import itertools
+import math
+import random
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from tetracore.checkpoint import CHECKPOINT_VERSION
+from tetracore.config import ENGINE_MODE, INTERACTION_RADIUS, INTERACTION_STRENGTH
+from tetracore.listing import decode_cursor, encode_cursor, project_pair
+from tetracore.models import PairFilter, PairQuery, SimulationState, Tetrahedron, TetrahedronPair, TetrahedronVertex, \
+    Vector3D
+from tetracore.records import TETRAHEDRON_OFFSETS, TETRAHEDRON_VERTICES, PairRecord, Point, TetrahedronRecord, \
+    uuid4_array, uuid4_strings
+from tetracore.spatial import SpatialGrid
+
+# Running system metrics
+class MetricAggregates:
+    """Sum, minimum and maximum of per-pair stability plus the energy sum.
+
+    Rebuilt by the update pass of every tick and adjusted as pairs are added
+    or removed in between, so the system metrics are read in O(1).  Removing
+    the pair that holds the current minimum or maximum marks the extrema
+    ``stale``; the engine recounts on the next read.
+    """
+
+    __slots__ = ("count", "stability", "energy", "low", "high", "stale")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.set(0, 0.0, 0.0, math.inf, -math.inf)
+
+    def set(self, count: int, stability: float, energy: float, low: float, high: float):
+        self.count = count
+        self.stability = stability
+        self.energy = energy
+        self.low = low
+        self.high = high
+        self.stale = False
+
+    def add_many(self, count: int, stability: float, energy: float, low: float, high: float):
+        self.count += count
+        self.stability += stability
+        self.energy += energy
+        self.low = min(self.low, low)
+        self.high = max(self.high, high)
+
+    def add(self, stability: float, energy: float):
+        self.add_many(1, stability, energy, stability, stability)
+
+    def remove_many(self, count: int, stability: float, energy: float, low: float, high: float):
+        self.count -= count
+        if not self.count:
+            self.clear()
+            return
+        self.stability -= stability
+        self.energy -= energy
+        if low <= self.low or high >= self.high:
+            self.stale = True
+
+    def remove(self, stability: float, energy: float):
+        self.remove_many(1, stability, energy, stability, stability)
+
+# Tetracore Physics Engine
+class TetracoreEngine:
+    def __init__(self, seed: Optional[int] = None):
+        # Header fields only: pairs live in engine storage (``records`` here)
+        # and are materialized into ``pairs`` by ``snapshot``
+        self.simulation_state = SimulationState()
+        self.records: List[PairRecord] = []
+        # Every random draw goes through these, so a seeded engine replays exactly;
+        # ``random`` feeds the per-pair paths and ``rng`` the batched ones
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        # Compact integer handle per pair, used as the key in delta frames
+        self.pair_keys: Dict[str, int] = {}
+        self._next_key = 0
+        # pair id -> position in storage; removals swap the last pair into the hole
+        self.slots: Dict[str, int] = {}
+        # Adds/removes that arrive while a step is running are applied after it
+        self._mutation_lock = threading.Lock()
+        self._stepping = False
+        self._pending: List[Tuple[str, object]] = []
+        # Pair midpoints, for neighbourhood queries and the interaction term
+        self.grid = SpatialGrid()
+        self.interaction_strength = INTERACTION_STRENGTH
+        self.interaction_radius = INTERACTION_RADIUS
+        self._interaction: Tuple[int, Optional[np.ndarray]] = (-1, None)
+        self.aggregates = MetricAggregates()
+        # Sort orders for paginated listings, rebuilt when the state has changed;
+        # ``_revision`` counts the changes that neither a step nor the grid sees
+        self._revision = 0
+        self._listing: Tuple[object, object, Dict[str, tuple]] = (None, None, {})
+        
+    def create_regular_tetrahedron(self, center: Vector3D, size: float = 1.0) -> List[TetrahedronVertex]:
+        """Create vertices for a regular tetrahedron centered at given position"""
+        # Regular tetrahedron vertices in unit form
+        vertices_coords = [
+            (1, 1, 1),
+            (1, -1, -1),
+            (-1, 1, -1),
+            (-1, -1, 1)
+        ]
+        
+        vertices = []
+        for x, y, z in vertices_coords:
+            position = Vector3D(
+                x=center.x + x * size / math.sqrt(3),
+                y=center.y + y * size / math.sqrt(3),
+                z=center.z + z * size / math.sqrt(3)
+            )
+            vertex = TetrahedronVertex(
+                position=position,
+                energy=self.random.uniform(0.5, 1.5),
+                spin=self.random.uniform(-1, 1),
+                mass_projection=self.random.uniform(0.8, 1.2)
+            )
+            vertices.append(vertex)
+        
+        return vertices
+    
+    def create_counter_tetrahedron(self, original: Tetrahedron) -> Tetrahedron:
+        """Create a counter-tetrahedron (antimatter pair) for stabilization"""
+        # Mirror the tetrahedron across its center with inverted properties
+        counter_vertices = []
+        
+        for vertex in original.vertices:
+            # Mirror position relative to center
+            mirrored_pos = Vector3D(
+                x=2 * original.center.x - vertex.position.x,
+                y=2 * original.center.y - vertex.position.y,
+                z=2 * original.center.z - vertex.position.z
+            )
+            
+            # Invert quantum properties for antimatter
+            counter_vertex = TetrahedronVertex(
+                position=mirrored_pos,
+                energy=-vertex.energy,  # Inverted energy
+                spin=-vertex.spin,      # Inverted spin
+                mass_projection=vertex.mass_projection  # Mass remains same magnitude
+            )
+            counter_vertices.append(counter_vertex)
+        
+        counter_tetrahedron = Tetrahedron(
+            vertices=counter_vertices,
+            center=Vector3D(
+                x=2 * original.center.x - original.center.x,
+                y=2 * original.center.y - original.center.y, 
+                z=2 * original.center.z - original.center.z
+            ),
+            energy_state=-original.energy_state,
+            oscillation_frequency=original.oscillation_frequency,
+            phase=original.phase + math.pi,  # Phase shifted for antimatter
+            particle_type="antimatter"
+        )
+        
+        return counter_tetrahedron
+    
+    def calculate_pair_stability(self, pair: Union[TetrahedronPair, PairRecord]) -> float:
+        """Calculate stability factor for a tetrahedron pair"""
+        matter = pair.matter_tetrahedron
+        antimatter = pair.antimatter_tetrahedron
+        
+        # Distance between centers
+        dx = matter.center.x - antimatter.center.x
+        dy = matter.center.y - antimatter.center.y
+        dz = matter.center.z - antimatter.center.z
+        distance = math.sqrt(dx*dx + dy*dy + dz*dz)
+        
+        # Optimal distance for stability (arbitrary physics model)
+        optimal_distance = 2.0
+        distance_factor = 1.0 / (1.0 + abs(distance - optimal_distance))
+        
+        # Energy balance factor
+        energy_balance = 1.0 - abs(matter.energy_state + antimatter.energy_state) / 2.0
+        
+        # Phase synchronization factor  
+        phase_sync = (1.0 + math.cos(matter.phase - antimatter.phase)) / 2.0
+        
+        # Overall stability
+        stability = distance_factor * energy_balance * phase_sync * pair.pairing_strength
+        
+        return max(0.0, min(1.0, stability))
+    
+    def update_oscillations(self, dt: float):
+        """Update tetrahedron oscillations based on time step"""
+        pairs = self.records
+        factor = self.interaction_factor()
+        factor = factor.tolist() if factor is not None else itertools.repeat(1.0)
+        stabilities = []
+        total_energy = 0.0
+        for pair, f in zip(pairs, factor):
+            # Update matter tetrahedron
+            matter = pair.matter_tetrahedron
+            matter.phase += matter.oscillation_frequency * dt
+            matter.energy_state = 1.0 + 0.3 * math.sin(matter.phase)
+            
+            # Update antimatter tetrahedron (synchronized but inverted)
+            antimatter = pair.antimatter_tetrahedron
+            antimatter.phase += antimatter.oscillation_frequency * dt
+            antimatter.energy_state = -(1.0 + 0.3 * math.sin(antimatter.phase))
+            total_energy += abs(matter.energy_state) + abs(antimatter.energy_state)
+            
+            # Update pair stability, damped by crowding when the interaction term is on
+            pair.stability_factor = self.calculate_pair_stability(pair) * f
+            stabilities.append(pair.stability_factor)
+
+        if stabilities:
+            self.aggregates.set(len(stabilities), sum(stabilities), total_energy, min(stabilities), max(stabilities))
+
+    def interaction_factor(self) -> Optional[np.ndarray]:
+        """Per-slot stability damping from neighbouring pairs, or None when disabled.
+
+        Each neighbour closer than ``interaction_radius`` adds ``1 - d / r`` to
+        a pair's crowding ``c`` and its stability is scaled by
+        ``1 / (1 + strength * c)``.  Pair centers do not move while stepping,
+        so the factor is only recomputed after the index changes.
+        """
+        if self.interaction_strength <= 0:
+            return None
+        version, factor = self._interaction
+        if version != self.grid.version:
+            ids, by_row = self.grid.crowding(self.interaction_radius)
+            crowding = np.zeros(self.pair_count)
+            crowding[[self.slots[pair_id] for pair_id in ids]] = by_row
+            factor = 1.0 / (1.0 + self.interaction_strength * crowding)
+            self._interaction = (self.grid.version, factor)
+        return factor
+
+    def point_interaction_factor(self, point: Tuple[float, float, float]) -> float:
+        """``interaction_factor`` of a pair about to be added at ``point``, from the indexed pairs"""
+        if self.interaction_strength <= 0:
+            return 1.0
+        neighbours = self.grid.query_radius(point, self.interaction_radius)
+        crowding = sum(1.0 - distance / self.interaction_radius for _, distance in neighbours)
+        return 1.0 / (1.0 + self.interaction_strength * crowding)
+    
+    def create_tetrahedron_pair(self, center: Vector3D, separation: float = 2.0) -> TetrahedronPair:
+        """Create a new matter-antimatter tetrahedron pair"""
+        return self.build_pair(center, separation).materialize()
+
+    def _random_vertex_data(self) -> array:
+        """``TetrahedronRecord.vertex_data`` drawn vertex by vertex, as create_regular_tetrahedron does"""
+        uniform = self.random.uniform
+        draws = [(uniform(0.5, 1.5), uniform(-1, 1), uniform(0.8, 1.2)) for _ in TETRAHEDRON_OFFSETS]
+        return array("d", [d[k] for k in range(3) for d in draws])
+
+    def build_pair(self, center: Vector3D, separation: float = 2.0) -> PairRecord:
+        """``create_tetrahedron_pair`` without building the models; same random draws"""
+        pair_id, matter_id, antimatter_id = self.new_ids(3)
+        matter_vertices = self._random_vertex_data()
+        frequency = self.random.uniform(0.5, 2.0)
+        phase = self.random.uniform(0, 2*math.pi)
+        matter = TetrahedronRecord(
+            matter_id, Point(center.x - separation/2, center.y, center.z), TETRAHEDRON_OFFSETS,
+            matter_vertices, 1.0, frequency, phase, "matter",
+        )
+        antimatter = TetrahedronRecord(
+            antimatter_id, Point(center.x + separation/2, center.y, center.z), TETRAHEDRON_OFFSETS,
+            self._random_vertex_data(), -1.0, frequency, phase + math.pi, "antimatter",
+        )
+        pair = PairRecord(pair_id, matter, antimatter, pairing_strength=self.random.uniform(0.7, 1.0))
+        pair.stability_factor = self.calculate_pair_stability(pair) * self.point_interaction_factor(self.pair_midpoint(pair))
+        return pair
+    
+    def new_ids(self, n: int) -> List[str]:
+        """Fresh ids, drawn from the engine RNG when seeded so replays match"""
+        return uuid4_strings(n, self.rng if self.seed is not None else None)
+
+    def new_id_array(self, n: int) -> np.ndarray:
+        """``new_ids`` as an ``S36`` array"""
+        return uuid4_array(n, self.rng if self.seed is not None else None)
+
+    @staticmethod
+    def pair_energy(pair: PairRecord) -> float:
+        return abs(pair.matter_tetrahedron.energy_state) + abs(pair.antimatter_tetrahedron.energy_state)
+
+    def recount(self):
+        """Rebuild ``aggregates`` from scratch, e.g. after a bulk change"""
+        pairs = self.records
+        if not pairs:
+            self.aggregates.clear()
+            return
+        stabilities = [pair.stability_factor for pair in pairs]
+        total_energy = sum(self.pair_energy(pair) for pair in pairs)
+        self.aggregates.set(len(pairs), sum(stabilities), total_energy, min(stabilities), max(stabilities))
+
+    def calculate_system_metrics(self):
+        """Calculate overall system stability and energy from the running aggregates"""
+        aggregates = self.aggregates
+        if aggregates.stale:
+            self.recount()
+        state = self.simulation_state
+        if not aggregates.count:
+            state.total_stability = state.min_stability = state.max_stability = 0.0
+            state.system_energy = 0.0
+            return
+        state.total_stability = aggregates.stability / aggregates.count
+        state.min_stability = aggregates.low
+        state.max_stability = aggregates.high
+        state.system_energy = aggregates.energy
+
+    def run(self, steps: int, dt: float, sample_every: int = 0) -> List[dict]:
+        """Advance ``steps`` fixed steps as fast as possible.
+
+        Returns the system metrics every ``sample_every`` steps (0: never)
+        and always after the last step.
+        """
+        samples = []
+        for i in range(1, steps + 1):
+            self.step(dt)
+            if i == steps or (sample_every and i % sample_every == 0):
+                samples.append(self.sample(i))
+        return samples
+
+    def sample(self, step: int) -> dict:
+        """System metrics after ``step`` steps of a batch, as returned by ``run``"""
+        self.calculate_system_metrics()
+        state = self.simulation_state
+        return {
+            "step": step,
+            "time_step": state.time_step,
+            "total_stability": state.total_stability,
+            "system_energy": state.system_energy,
+        }
+
+    def step(self, dt: float):
+        """Advance the simulation by one fixed time step"""
+        with self._mutation_lock:
+            self._stepping = True
+        try:
+            self.update_oscillations(dt)
+            self.simulation_state.time_step += dt
+        finally:
+            with self._mutation_lock:
+                self._stepping = False
+                self._apply_pending()
+
+    def _apply_pending(self):
+        for op, arg in self._pending:
+            if op == "add":
+                self._insert_pair(arg)
+            else:
+                self._delete_pair(arg)
+        self._pending.clear()
+
+    # Pair storage
+    @property
+    def pair_count(self) -> int:
+        return len(self.records)
+
+    def _register_key(self, pair_id: str) -> int:
+        key = self._next_key
+        self._next_key += 1
+        self.pair_keys[pair_id] = key
+        return key
+
+    def pair_key(self, pair_id: str) -> Optional[int]:
+        return self.pair_keys.get(pair_id)
+
+    def pair_index(self) -> List[int]:
+        """Compact keys in ``list_pairs`` order"""
+        return [self.pair_keys[p.id] for p in self.records]
+
+    def frame_arrays(self) -> Dict[str, np.ndarray]:
+        """Per-pair columns streamed to clients each tick, in ``list_pairs`` order.
+
+        ``index`` (n,), ``phase`` (n, 2), ``energy_state`` (n, 2),
+        ``stability_factor`` (n,) and ``center`` (n, 2, 3), with axis 1 being
+        matter then antimatter.
+        """
+        pairs = self.records
+        tetrahedra = [(p.matter_tetrahedron, p.antimatter_tetrahedron) for p in pairs]
+        return {
+            "index": np.array(self.pair_index(), dtype=np.int64),
+            "phase": np.array([[t.phase for t in pt] for pt in tetrahedra]).reshape(-1, 2),
+            "energy_state": np.array([[t.energy_state for t in pt] for pt in tetrahedra]).reshape(-1, 2),
+            "stability_factor": np.array([p.stability_factor for p in pairs]),
+            "center": np.array([[t.center for t in pt] for pt in tetrahedra]).reshape(-1, 2, 3),
+        }
+
+    def add_pair(self, pair: Union[TetrahedronPair, PairRecord]):
+        """Add a pair now, or right after the running step finishes"""
+        if isinstance(pair, TetrahedronPair):
+            pair = PairRecord.from_model(pair)
+        with self._mutation_lock:
+            self._add_locked(pair)
+
+    def _add_locked(self, pair: PairRecord):
+        """``add_pair`` for callers already holding ``_mutation_lock``"""
+        self._register_key(pair.id)
+        if self._stepping:
+            self._pending.append(("add", pair))
+        else:
+            self._insert_pair(pair)
+
+    def remove_pair(self, pair_id: str) -> bool:
+        """Remove a pair now, or right after the running step finishes"""
+        with self._mutation_lock:
+            if pair_id not in self.pair_keys:
+                return False
+            if self._stepping:
+                self._pending.append(("remove", pair_id))
+            else:
+                self._delete_pair(pair_id)
+            return True
+
+    @staticmethod
+    def pair_midpoint(pair: PairRecord) -> Tuple[float, float, float]:
+        m, a = pair.matter_tetrahedron.center, pair.antimatter_tetrahedron.center
+        return ((m.x + a.x) / 2, (m.y + a.y) / 2, (m.z + a.z) / 2)
+
+    def _insert_pair(self, pair: PairRecord):
+        self.slots[pair.id] = len(self.records)
+        self.records.append(pair)
+        self.grid.insert(pair.id, self.pair_midpoint(pair))
+        self.aggregates.add(pair.stability_factor, self.pair_energy(pair))
+
+    def _delete_pair(self, pair_id: str):
+        i = self.slots.pop(pair_id, None)
+        if i is None:
+            return
+        del self.pair_keys[pair_id]
+        self.grid.remove(pair_id)
+        pairs = self.records
+        self.aggregates.remove(pairs[i].stability_factor, self.pair_energy(pairs[i]))
+        last = pairs.pop()
+        if i < len(pairs):
+            pairs[i] = last
+            self.slots[last.id] = i
+
+    def get_pair(self, pair_id: str) -> Optional[TetrahedronPair]:
+        """A copy of the pair as an API model; changing it does not affect the engine"""
+        i = self.slots.get(pair_id)
+        return None if i is None else self.records[i].materialize()
+
+    def get_pairs(self, pair_ids: List[str]) -> List[TetrahedronPair]:
+        """``get_pair`` for many ids that are known to exist"""
+        return [self.records[self.slots[pair_id]].materialize() for pair_id in pair_ids]
+
+    def vertex_positions(self, slots: np.ndarray) -> np.ndarray:
+        """Vertex positions of the pairs in ``slots`` as an (n, 2, 4, 3) array"""
+        pairs = self.records
+        return np.array([
+            [t.vertex_positions() for t in (pairs[i].matter_tetrahedron, pairs[i].antimatter_tetrahedron)]
+            for i in slots.tolist()
+        ]).reshape(-1, 2, 4, 3)
+
+    def list_pairs(self) -> List[TetrahedronPair]:
+        return [pair.materialize() for pair in self.records]
+
+    def pair_id_list(self) -> List[str]:
+        """Pair ids in ``list_pairs`` order"""
+        return [p.id for p in self.records]
+
+    def create_pairs(self, centers: np.ndarray, separations: np.ndarray,
+                     rng: Optional[np.random.Generator] = None) -> List[str]:
+        """Create and add one pair per row of ``centers`` and return their ids.
+
+        The object engine draws from ``self.random`` like
+        ``create_tetrahedron_pair``; the vectorized engine draws from ``rng``,
+        or from ``self.rng`` if none is given.
+        """
+        ids = []
+        for (x, y, z), separation in zip(centers.tolist(), separations.tolist()):
+            pair = self.build_pair(Vector3D(x=x, y=y, z=z), separation)
+            self.add_pair(pair)
+            ids.append(pair.id)
+        factor = self.interaction_factor()
+        if factor is not None:
+            # build_pair only saw the pairs added before it; pairs whose add was
+            # deferred by a running step keep that estimate until the next step
+            with self._mutation_lock:
+                for pair_id in ids:
+                    i = self.slots.get(pair_id)
+                    if i is not None:
+                        pair = self.records[i]
+                        pair.stability_factor = self.calculate_pair_stability(pair) * factor[i]
+                self.recount()
+        return ids
+
+    def apply_parameters(self, oscillation_frequency: Optional[float] = None,
+                         pairing_strength: Optional[float] = None):
+        """Give every pair the same frequency and/or pairing strength, e.g. for a sweep"""
+        factor = self.interaction_factor()
+        factor = factor.tolist() if factor is not None else itertools.repeat(1.0)
+        for pair, f in zip(self.records, factor):
+            if oscillation_frequency is not None:
+                pair.matter_tetrahedron.oscillation_frequency = oscillation_frequency
+                pair.antimatter_tetrahedron.oscillation_frequency = oscillation_frequency
+            if pairing_strength is not None:
+                pair.pairing_strength = pairing_strength
+            pair.stability_factor = self.calculate_pair_stability(pair) * f
+        self._revision += 1
+        self.recount()
+
+    def pair_documents(self, pair_ids: List[str]) -> List[dict]:
+        """MongoDB documents for the given pairs, as ``model_dump`` would build them"""
+        return self.slot_documents([self.slots[pair_id] for pair_id in pair_ids])
+
+    def slot_documents(self, slots: List[int]) -> List[dict]:
+        """``pair_documents`` by storage slot"""
+        return [self.records[i].document() for i in slots]
+
+    def load_documents(self, documents: List[dict]) -> int:
+        """Add pairs from stored MongoDB documents; returns how many were added"""
+        added = 0
+        for document in documents:
+            if document["id"] not in self.pair_keys:
+                self.add_pair(PairRecord.from_document(document))
+                added += 1
+        return added
+
+    def apply_updates(self, pair_ids: List[str], phase: list, energy_state: list, stability: list):
+        """Overwrite the per-tick fields of existing pairs; rows are aligned with ``pair_ids``"""
+        for pair_id, p, e, s in zip(pair_ids, phase, energy_state, stability):
+            i = self.slots.get(pair_id)
+            if i is None:
+                continue
+            pair = self.records[i]
+            pair.matter_tetrahedron.phase, pair.antimatter_tetrahedron.phase = p
+            self.aggregates.remove(pair.stability_factor, self.pair_energy(pair))
+            pair.matter_tetrahedron.energy_state, pair.antimatter_tetrahedron.energy_state = e
+            pair.stability_factor = s
+            self.aggregates.add(s, self.pair_energy(pair))
+        self._revision += 1
+
+    def select_pairs(self, pair_filter: PairFilter) -> List[str]:
+        """Ids of the pairs matching ``pair_filter``"""
+        arrays = self.frame_arrays()
+        stability = arrays["stability_factor"]
+        midpoint = arrays["center"].mean(axis=1)
+        mask = np.ones(len(stability), dtype=bool)
+        if pair_filter.min_stability is not None:
+            mask &= stability >= pair_filter.min_stability
+        if pair_filter.max_stability is not None:
+            mask &= stability <= pair_filter.max_stability
+        if pair_filter.box_min is not None:
+            b = pair_filter.box_min
+            mask &= (midpoint >= (b.x, b.y, b.z)).all(axis=1)
+        if pair_filter.box_max is not None:
+            b = pair_filter.box_max
+            mask &= (midpoint <= (b.x, b.y, b.z)).all(axis=1)
+        ids = self.pair_id_list()
+        return [ids[i] for i in np.flatnonzero(mask)]
+
+    # Paginated listing
+    def listing_columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """``(key, stability)`` of every slot"""
+        return (np.array(self.pair_index(), dtype=np.int64),
+                np.array([p.stability_factor for p in self.records], dtype=float))
+
+    def particle_type_mask(self, particle_type: str) -> np.ndarray:
+        """Per slot: does the pair have a tetrahedron of ``particle_type``"""
+        return np.fromiter(
+            (p.matter_tetrahedron.particle_type == particle_type or p.antimatter_tetrahedron.particle_type == particle_type
+             for p in self.records),
+            dtype=bool, count=self.pair_count,
+        )
+
+    def box_mask(self, box_min: Optional[Vector3D], box_max: Optional[Vector3D]) -> np.ndarray:
+        """Per slot: is the pair midpoint inside the box, looked up in the spatial grid"""
+        lo = (box_min.x, box_min.y, box_min.z) if box_min is not None else (-math.inf,) * 3
+        hi = (box_max.x, box_max.y, box_max.z) if box_max is not None else (math.inf,) * 3
+        mask = np.zeros(self.pair_count, dtype=bool)
+        mask[[self.slots[pair_id] for pair_id in self.grid.query_box(lo, hi)]] = True
+        return mask
+
+    def listing_order(self, sort: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(slots, value, key)`` in listing order for ``sort``.
+
+        ``value`` and ``key`` are ascending along the order (negated for
+        ``-stability``) so cursors and stability ranges are binary searches.
+        Built at most once per state change and shared by every page.
+        """
+        version = (self.simulation_state.time_step, self.grid.version, self._revision, self.pair_count)
+        if self._listing[0] != version:
+            self._listing = (version, self.listing_columns(), {})
+        _, (key, stability), orders = self._listing
+        if sort not in orders:
+            if sort == "index":
+                order = np.argsort(key, kind="stable")
+                orders[sort] = (order, key[order], key[order])
+            else:
+                sign = -1 if sort == "-stability" else 1
+                order = np.lexsort((sign * key, sign * stability))
+                orders[sort] = (order, sign * stability[order], sign * key[order])
+        return orders[sort]
+
+    def query_pairs(self, query: PairQuery) -> dict:
+        """One page of pairs matching ``query`` and the cursor of the next page, or None after the last"""
+        order, value, key = self.listing_order(query.sort)
+        sign = -1 if query.sort == "-stability" else 1
+        start, stop = 0, len(order)
+        mask = None
+        low, high = query.min_stability, query.max_stability
+        if query.sort == "index":
+            if low is not None or high is not None:
+                stability = self._listing[1][1]
+                mask = ((stability >= low) if low is not None else True) & ((stability <= high) if high is not None else True)
+        else:
+            if sign < 0:
+                low, high = (None if high is None else -high), (None if low is None else -low)
+            if low is not None:
+                start = int(np.searchsorted(value, low, "left"))
+            if high is not None:
+                stop = int(np.searchsorted(value, high, "right"))
+        if query.cursor is not None:
+            after_value, after_key = decode_cursor(query.cursor, "engine", query.sort)
+            i = np.searchsorted(value, sign * after_value, "left")
+            j = np.searchsorted(value, sign * after_value, "right")
+            start = max(start, int(i + np.searchsorted(key[i:j], sign * after_key, "right")))
+        if query.box_min is not None or query.box_max is not None:
+            box = self.box_mask(query.box_min, query.box_max)
+            mask = box if mask is None else mask & box
+        if query.particle_type is not None:
+            types = self.particle_type_mask(query.particle_type)
+            mask = types if mask is None else mask & types
+        stop = max(start, stop)
+        if mask is None:
+            positions = np.arange(start, stop)
+        else:
+            positions = start + np.flatnonzero(mask[order[start:stop]])
+        page = positions[:query.limit]
+
+        keys = (sign * key[page]).tolist()
+        documents = self.slot_documents(order[page].tolist())
+        rows = [project_pair(d, k, query.fields, query.particle_type) for d, k in zip(documents, keys)]
+        next_cursor = None
+        if len(positions) > query.limit:
+            last = page[-1]
+            next_cursor = encode_cursor("engine", query.sort, (sign * value[last]).item(), keys[-1])
+        return {"pairs": rows, "next_cursor": next_cursor}
+
+    def snapshot(self) -> SimulationState:
+        """Full simulation state as API models"""
+        return self.simulation_state.model_copy(update={"pairs": self.list_pairs()})
+
+    def snapshot_document(self) -> dict:
+        """``snapshot().model_dump()`` built straight from pair storage, for serializing"""
+        state = self.simulation_state.model_dump(exclude={"pairs"})
+        return {"id": state.pop("id"), "pairs": self.pair_documents(self.pair_id_list()), **state}
+
+    def reset(self, seed: Optional[int] = None):
+        """Clear all pairs and re-seed, with ``seed`` or else the engine's own seed"""
+        with self._mutation_lock:
+            if seed is not None:
+                self.seed = seed
+            self.random = random.Random(self.seed)
+            self.rng = np.random.default_rng(self.seed)
+            self.simulation_state = SimulationState()
+            self.records = []
+            self.pair_keys.clear()
+            self.slots.clear()
+            self._pending.clear()
+            self.grid.clear()
+            self.aggregates.clear()
+
+# Vectorized Tetracore Engine
+class VectorizedTetracoreEngine(TetracoreEngine):
+    """Structure-of-arrays engine that steps every pair with batched ufuncs.
+
+    Pair data lives in contiguous NumPy arrays indexed by slot; axis 1 of the
+    per-tetrahedron arrays is ``0`` for matter and ``1`` for antimatter.
+    Vertex positions are ``center`` plus a row of ``shapes`` picked by
+    ``vertex_shape``; row 0 is the regular tetrahedron every created pair
+    uses.  Pydantic models are built on demand by
+    ``get_pair``/``list_pairs``/``snapshot``.
+    """
+
+    PARTICLE_TYPES = ("matter", "antimatter")
+    _ARRAYS = (
+        "phase", "frequency", "energy_state", "center", "vertex_shape",
+        "vertex_energy", "vertex_spin", "vertex_mass", "pairing_strength",
+        "stability", "entanglement", "key", "tetrahedron_id",
+    )
+    # Fits a UUID string; widened when a loaded id is longer
+    ID_WIDTH = 36
+
+    def __init__(self, capacity: int = 1024, seed: Optional[int] = None):
+        super().__init__(seed)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.count = 0
+        self.pair_ids: List[str] = []
+        self.created_at: List[datetime] = []
+        self.shapes = TETRAHEDRON_VERTICES[None].copy()
+        self._shape_rows: Dict[bytes, int] = {self.shapes[0].tobytes(): 0}
+        self.phase = np.zeros((capacity, 2))
+        self.frequency = np.zeros((capacity, 2))
+        self.energy_state = np.zeros((capacity, 2))
+        self.center = np.zeros((capacity, 2, 3))
+        self.vertex_shape = np.zeros((capacity, 2), dtype=np.int32)
+        self.vertex_energy = np.zeros((capacity, 2, 4))
+        self.vertex_spin = np.zeros((capacity, 2, 4))
+        self.vertex_mass = np.ones((capacity, 2, 4))
+        self.pairing_strength = np.ones(capacity)
+        self.stability = np.zeros(capacity)
+        self.entanglement = np.ones(capacity, dtype=bool)
+        self.key = np.zeros(capacity, dtype=np.int64)
+        self.tetrahedron_id = np.zeros((capacity, 2), dtype=f"S{self.ID_WIDTH}")
+
+    @property
+    def capacity(self) -> int:
+        return len(self.stability)
+
+    def _reserve(self, extra: int):
+        needed = self.count + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity)
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # Simulation
+    def _stability(self, sl: slice) -> np.ndarray:
+        """Vectorized ``calculate_pair_stability`` for the pairs in ``sl``"""
+        offset = self.center[sl, 0] - self.center[sl, 1]
+        distance = np.sqrt(np.einsum("ij,ij->i", offset, offset))
+        distance_factor = 1.0 / (1.0 + np.abs(distance - 2.0))
+
+        energy = self.energy_state[sl]
+        energy_balance = 1.0 - np.abs(energy[:, 0] + energy[:, 1]) / 2.0
+
+        phase = self.phase[sl]
+        phase_sync = (1.0 + np.cos(phase[:, 0] - phase[:, 1])) / 2.0
+
+        stability = distance_factor * energy_balance * phase_sync * self.pairing_strength[sl]
+        return np.clip(stability, 0.0, 1.0)
+
+    def update_oscillations(self, dt: float):
+        n = self.count
+        if not n:
+            return
+        phase = self.phase[:n]
+        phase += self.frequency[:n] * dt
+        energy = self.energy_state[:n]
+        np.sin(phase, out=energy)
+        energy *= 0.3
+        energy += 1.0
+        # Both columns are still 1 + 0.3 sin > 0 here, so this is the sum of |energy|
+        total_energy = float(energy.sum())
+        energy[:, 1] *= -1.0
+        stability = self.stability[:n]
+        stability[:] = self._stability(slice(0, n))
+        factor = self.interaction_factor()
+        if factor is not None:
+            stability *= factor
+        self.aggregates.set(n, float(stability.sum()), total_energy, float(stability.min()), float(stability.max()))
+
+    def _aggregate(self, rows) -> Tuple[int, float, float, float, float]:
+        """``MetricAggregates.add_many`` arguments for a slice or index array of slots"""
+        stability = self.stability[rows]
+        return (len(stability), float(stability.sum()), float(np.abs(self.energy_state[rows]).sum()),
+                float(stability.min()), float(stability.max()))
+
+    def recount(self):
+        if not self.count:
+            self.aggregates.clear()
+            return
+        self.aggregates.set(*self._aggregate(slice(0, self.count)))
+
+    # Pair storage
+    @property
+    def pair_count(self) -> int:
+        return self.count
+
+    def pair_index(self) -> List[int]:
+        return self.key[:self.count].tolist()
+
+    def frame_arrays(self) -> Dict[str, np.ndarray]:
+        n = self.count
+        return {
+            "index": self.key[:n],
+            "phase": self.phase[:n],
+            "energy_state": self.energy_state[:n],
+            "stability_factor": self.stability[:n],
+            "center": self.center[:n],
+        }
+
+    def _insert_pair(self, pair: PairRecord):
+        self._reserve(1)
+        i = self.count
+        m, a = pair.matter_tetrahedron, pair.antimatter_tetrahedron
+        self.phase[i] = (m.phase, a.phase)
+        self.frequency[i] = (m.oscillation_frequency, a.oscillation_frequency)
+        self.energy_state[i] = (m.energy_state, a.energy_state)
+        self.center[i] = (m.center, a.center)
+        self.vertex_shape[i] = (self._shape_of(m.offsets), self._shape_of(a.offsets))
+        vertex_data = np.frombuffer(m.vertex_data + a.vertex_data).reshape(2, 3, 4)
+        self.vertex_energy[i] = vertex_data[:, 0]
+        self.vertex_spin[i] = vertex_data[:, 1]
+        self.vertex_mass[i] = vertex_data[:, 2]
+        self._store_tetrahedron_ids(slice(i, i + 1), [(m.id, a.id)])
+        self.pairing_strength[i] = pair.pairing_strength
+        self.stability[i] = pair.stability_factor
+        self.entanglement[i] = pair.entanglement_connection
+        self.key[i] = self.pair_keys[pair.id]
+        self.aggregates.add(pair.stability_factor, self.pair_energy(pair))
+        self.pair_ids.append(pair.id)
+        self.created_at.append(pair.created_at)
+        self.slots[pair.id] = i
+        self.count += 1
+        self.grid.insert(pair.id, self.pair_midpoint(pair))
+
+    def _delete_pair(self, pair_id: str):
+        i = self.slots.pop(pair_id, None)
+        if i is None:
+            return
+        del self.pair_keys[pair_id]
+        self.grid.remove(pair_id)
+        self.aggregates.remove(float(self.stability[i]), float(np.abs(self.energy_state[i]).sum()))
+        last = self.count - 1
+        if i != last:
+            for name in self._ARRAYS:
+                array = getattr(self, name)
+                array[i] = array[last]
+            for column in (self.pair_ids, self.created_at):
+                column[i] = column[last]
+            self.slots[self.pair_ids[i]] = i
+        del self.pair_ids[last], self.created_at[last]
+        self.count = last
+
+    def _shape_row(self, offsets: np.ndarray) -> int:
+        """Row of ``shapes`` holding the (4, 3) vertex ``offsets``, added if new"""
+        key = offsets.tobytes()
+        row = self._shape_rows.get(key)
+        if row is None:
+            row = self._shape_rows[key] = len(self.shapes)
+            self.shapes = np.concatenate([self.shapes, offsets[None]])
+        return row
+
+    def _shape_of(self, offsets: Tuple[Point, ...]) -> int:
+        return 0 if offsets is TETRAHEDRON_OFFSETS else self._shape_row(np.array(offsets, dtype=float))
+
+    def _vertex_shapes(self, center: np.ndarray, position: np.ndarray) -> np.ndarray:
+        """``vertex_shape`` rows for (m, 2, 4, 3) absolute vertex ``position``"""
+        shape = np.zeros(center.shape[:2], dtype=np.int32)
+        regular = (center[:, :, None, :] + TETRAHEDRON_VERTICES == position).all(axis=(2, 3))
+        for i, t in zip(*np.nonzero(~regular)):
+            shape[i, t] = self._shape_row(position[i, t] - center[i, t])
+        return shape
+
+    def _store_tetrahedron_ids(self, sl: slice, ids: List[Tuple[str, str]]):
+        """Write (matter, antimatter) id strings into ``tetrahedron_id[sl]``"""
+        encoded = [(m.encode(), a.encode()) for m, a in ids]
+        width = max(len(e) for row in encoded for e in row)
+        if width > self.tetrahedron_id.dtype.itemsize:
+            self.tetrahedron_id = self.tetrahedron_id.astype(f"S{width}")
+        self.tetrahedron_id[sl] = encoded
+
+    def get_pair(self, pair_id: str) -> Optional[TetrahedronPair]:
+        i = self.slots.get(pair_id)
+        return None if i is None else self.materialize_pair(i)
+
+    def get_pairs(self, pair_ids: List[str]) -> List[TetrahedronPair]:
+        return [TetrahedronPair.model_validate(d) for d in self._pair_dicts([self.slots[pair_id] for pair_id in pair_ids])]
+
+    def vertex_positions(self, slots: np.ndarray) -> np.ndarray:
+        return self.center[slots][:, :, None, :] + self.shapes[self.vertex_shape[slots]]
+
+    def listing_columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.key[:self.count].copy(), self.stability[:self.count].copy()
+
+    def particle_type_mask(self, particle_type: str) -> np.ndarray:
+        return np.full(self.count, particle_type in self.PARTICLE_TYPES)
+
+    def list_pairs(self) -> List[TetrahedronPair]:
+        return [TetrahedronPair.model_validate(d) for d in self._pair_dicts(range(self.count))]
+
+    def pair_id_list(self) -> List[str]:
+        return list(self.pair_ids)
+
+    def create_pairs(self, centers: np.ndarray, separations: np.ndarray,
+                     rng: Optional[np.random.Generator] = None) -> List[str]:
+        """Batched ``create_tetrahedron_pair``: fills the arrays directly without building models"""
+        with self._mutation_lock:
+            if self._stepping:
+                # Rare enough that the deferred per-pair path is fine; the lock is
+                # not reentrant, so queue directly instead of going through add_pair
+                ids = []
+                for (x, y, z), separation in zip(centers.tolist(), separations.tolist()):
+                    pair = self.build_pair(Vector3D(x=x, y=y, z=z), separation)
+                    self._add_locked(pair)
+                    ids.append(pair.id)
+                return ids
+
+            rng = rng if rng is not None else self.rng
+            m = len(centers)
+            self._reserve(m)
+            sl = slice(self.count, self.count + m)
+
+            offset = np.zeros((m, 2, 3))
+            offset[:, 0, 0] = -separations / 2
+            offset[:, 1, 0] = separations / 2
+            self.center[sl] = centers[:, None, :] + offset
+            self.vertex_shape[sl] = 0
+            self.vertex_energy[sl] = rng.uniform(0.5, 1.5, (m, 2, 4))
+            self.vertex_spin[sl] = rng.uniform(-1, 1, (m, 2, 4))
+            self.vertex_mass[sl] = rng.uniform(0.8, 1.2, (m, 2, 4))
+
+            frequency = rng.uniform(0.5, 2.0, m)
+            phase = rng.uniform(0, 2 * math.pi, m)
+            self.frequency[sl] = frequency[:, None]
+            self.phase[sl, 0] = phase
+            self.phase[sl, 1] = phase + math.pi
+            self.energy_state[sl] = (1.0, -1.0)
+            self.pairing_strength[sl] = rng.uniform(0.7, 1.0, m)
+            self.entanglement[sl] = True
+            self.stability[sl] = self._stability(sl)
+
+            ids = self.new_ids(m)
+            self.tetrahedron_id[sl] = self.new_id_array(2 * m).reshape(m, 2)
+            now = datetime.now()
+            for i, pair_id in enumerate(ids, start=self.count):
+                self.key[i] = self._register_key(pair_id)
+                self.slots[pair_id] = i
+            self.pair_ids.extend(ids)
+            self.created_at.extend([now] * m)
+            self.count += m
+            self.grid.insert_many(ids, centers)
+            factor = self.interaction_factor()
+            if factor is not None:
+                self.stability[sl] *= factor[sl]
+            self.aggregates.add_many(*self._aggregate(sl))
+            return ids
+
+    def apply_parameters(self, oscillation_frequency: Optional[float] = None,
+                         pairing_strength: Optional[float] = None):
+        n = self.count
+        if oscillation_frequency is not None:
+            self.frequency[:n] = oscillation_frequency
+        if pairing_strength is not None:
+            self.pairing_strength[:n] = pairing_strength
+        self.stability[:n] = self._stability(slice(0, n))
+        factor = self.interaction_factor()
+        if factor is not None:
+            self.stability[:n] *= factor
+        self._revision += 1
+        self.recount()
+
+    def slot_documents(self, slots: List[int]) -> List[dict]:
+        return self._pair_dicts(slots)
+
+    def load_documents(self, documents: List[dict]) -> int:
+        """Batched ``add_pair`` that reads the stored dicts straight into the arrays.
+
+        Skips Pydantic validation; missing optional fields take the model defaults.
+        """
+        documents = [d for d in documents if d["id"] not in self.pair_keys]
+        m = len(documents)
+        if not m:
+            return 0
+        now = datetime.now()
+        phase, frequency, energy_state, center = [], [], [], []
+        position, vertex_energy, vertex_spin, vertex_mass = [], [], [], []
+        tetrahedron_ids = []
+        for document in documents:
+            tetrahedra = (document["matter_tetrahedron"], document["antimatter_tetrahedron"])
+            vertices = [t["vertices"] for t in tetrahedra]
+            phase.append([t.get("phase", 0.0) for t in tetrahedra])
+            frequency.append([t.get("oscillation_frequency", 1.0) for t in tetrahedra])
+            energy_state.append([t.get("energy_state", 1.0) for t in tetrahedra])
+            center.append([[t["center"]["x"], t["center"]["y"], t["center"]["z"]] for t in tetrahedra])
+            position.append([[[v["position"]["x"], v["position"]["y"], v["position"]["z"]] for v in vs] for vs in vertices])
+            vertex_energy.append([[v.get("energy", 0.0) for v in vs] for vs in vertices])
+            vertex_spin.append([[v.get("spin", 0.0) for v in vs] for vs in vertices])
+            vertex_mass.append([[v.get("mass_projection", 1.0) for v in vs] for vs in vertices])
+            tetrahedron_ids.append((tetrahedra[0]["id"], tetrahedra[1]["id"]))
+
+        with self._mutation_lock:
+            self._reserve(m)
+            sl = slice(self.count, self.count + m)
+            self.phase[sl] = phase
+            self.frequency[sl] = frequency
+            self.energy_state[sl] = energy_state
+            self.center[sl] = center
+            self.vertex_shape[sl] = self._vertex_shapes(self.center[sl], np.array(position, dtype=float))
+            self._store_tetrahedron_ids(sl, tetrahedron_ids)
+            self.vertex_energy[sl] = vertex_energy
+            self.vertex_spin[sl] = vertex_spin
+            self.vertex_mass[sl] = vertex_mass
+            self.pairing_strength[sl] = [d.get("pairing_strength", 1.0) for d in documents]
+            self.stability[sl] = [d.get("stability_factor", 1.0) for d in documents]
+            self.entanglement[sl] = [d.get("entanglement_connection", True) for d in documents]
+            self.aggregates.add_many(*self._aggregate(sl))
+            for i, document in enumerate(documents, start=self.count):
+                self.key[i] = self._register_key(document["id"])
+                self.slots[document["id"]] = i
+                self.pair_ids.append(document["id"])
+                self.created_at.append(document.get("created_at") or now)
+            self.count += m
+            self.grid.insert_many([d["id"] for d in documents], self.center[sl].mean(axis=1))
+        return m
+
+    def apply_updates(self, pair_ids: List[str], phase: list, energy_state: list, stability: list):
+        rows = [(j, self.slots[pair_id]) for j, pair_id in enumerate(pair_ids) if pair_id in self.slots]
+        if not rows:
+            return
+        src, dst = np.array(rows).T
+        self.aggregates.remove_many(*self._aggregate(dst))
+        self.phase[dst] = np.asarray(phase)[src]
+        self.energy_state[dst] = np.asarray(energy_state)[src]
+        self.stability[dst] = np.asarray(stability)[src]
+        self.aggregates.add_many(*self._aggregate(dst))
+        self._revision += 1
+
+    def checkpoint_arrays(self) -> Dict[str, np.ndarray]:
+        """Copy of the full engine state as flat arrays for ``write_checkpoint``"""
+        n = self.count
+        arrays = {name: getattr(self, name)[:n].copy() for name in self._ARRAYS}
+        arrays["pair_ids"] = np.array([pair_id.encode() for pair_id in self.pair_ids], dtype="S")
+        arrays["shapes"] = self.shapes.copy()
+        arrays["created_at"] = np.array(self.created_at, dtype="datetime64[us]")
+        arrays["time_step"] = np.array(self.simulation_state.time_step)
+        arrays["next_key"] = np.array(self._next_key)
+        arrays["version"] = np.array(CHECKPOINT_VERSION)
+        return arrays
+
+    def restore_checkpoint(self, arrays: Dict[str, np.ndarray]):
+        """Replace the engine state with one produced by ``checkpoint_arrays``"""
+        if int(arrays["version"]) != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {int(arrays['version'])}")
+        self.reset()
+        n = len(arrays["pair_ids"])
+        with self._mutation_lock:
+            self._reserve(n)
+            self.tetrahedron_id = self.tetrahedron_id.astype(arrays["tetrahedron_id"].dtype)
+            for name in self._ARRAYS:
+                getattr(self, name)[:n] = arrays[name]
+            self.shapes = arrays["shapes"].copy()
+            self._shape_rows = {shape.tobytes(): row for row, shape in enumerate(self.shapes)}
+            self.pair_ids = [pair_id.decode() for pair_id in arrays["pair_ids"].tolist()]
+            self.created_at = arrays["created_at"].astype(datetime).tolist()
+            self.pair_keys = dict(zip(self.pair_ids, self.key[:n].tolist()))
+            self.slots = {pair_id: i for i, pair_id in enumerate(self.pair_ids)}
+            self._next_key = int(arrays["next_key"])
+            self.count = n
+            self.grid.insert_many(self.pair_ids, self.center[:n].mean(axis=1))
+            self.recount()
+            self.simulation_state.time_step = float(arrays["time_step"])
+
+    def reset(self, seed: Optional[int] = None):
+        super().reset(seed)
+        self._allocate(self.capacity)
+
+    def materialize_pair(self, i: int) -> TetrahedronPair:
+        """Build the Pydantic model for slot ``i``"""
+        # Validating one plain dict runs in pydantic-core and is much cheaper
+        # than constructing the ~20 nested models one by one
+        return TetrahedronPair.model_validate(self._pair_dict(i))
+
+    def _pair_dict(self, i: int) -> dict:
+        """Slot ``i`` in the shape of ``TetrahedronPair.model_dump()``"""
+        return self._pair_dicts([i])[0]
+
+    def _pair_dicts(self, slots: List[int]) -> List[dict]:
+        """``_pair_dict`` for many slots, converting each array to Python once"""
+        idx = np.asarray(slots, dtype=np.int64)
+        position = self.vertex_positions(idx).tolist()
+        tetrahedron_id = self.tetrahedron_id[idx].tolist()
+        vertex_energy = self.vertex_energy[idx].tolist()
+        vertex_spin = self.vertex_spin[idx].tolist()
+        vertex_mass = self.vertex_mass[idx].tolist()
+        center = self.center[idx].tolist()
+        energy_state = self.energy_state[idx].tolist()
+        frequency = self.frequency[idx].tolist()
+        phase = self.phase[idx].tolist()
+        stability = self.stability[idx].tolist()
+        pairing_strength = self.pairing_strength[idx].tolist()
+        entanglement = self.entanglement[idx].tolist()
+
+        documents = []
+        for j, i in enumerate(idx.tolist()):
+            tetrahedra = []
+            for t in range(2):
+                vertices = [
+                    {"position": {"x": p[0], "y": p[1], "z": p[2]}, "energy": e, "spin": s, "mass_projection": m}
+                    for p, e, s, m in zip(position[j][t], vertex_energy[j][t], vertex_spin[j][t], vertex_mass[j][t])
+                ]
+                cx, cy, cz = center[j][t]
+                tetrahedra.append({
+                    "id": tetrahedron_id[j][t].decode(),
+                    "vertices": vertices,
+                    "center": {"x": cx, "y": cy, "z": cz},
+                    "energy_state": energy_state[j][t],
+                    "oscillation_frequency": frequency[j][t],
+                    "phase": phase[j][t],
+                    "particle_type": self.PARTICLE_TYPES[t],
+                })
+            documents.append({
+                "id": self.pair_ids[i],
+                "matter_tetrahedron": tetrahedra[0],
+                "antimatter_tetrahedron": tetrahedra[1],
+                "stability_factor": stability[j],
+                "pairing_strength": pairing_strength[j],
+                "entanglement_connection": entanglement[j],
+                "created_at": self.created_at[i],
+            })
+        return documents
+
+ENGINES = {
+    "object": TetracoreEngine,
+    "vectorized": VectorizedTetracoreEngine,
+}
+
+def create_engine(mode: str = ENGINE_MODE, seed: Optional[int] = None) -> TetracoreEngine:
+    if mode not in ENGINES:
+        raise ValueError(f"Unknown ENGINE_MODE {mode!r}, expected one of {sorted(ENGINES)}")
+    return ENGINES[mode](seed=seed)
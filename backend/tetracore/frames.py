@@ -0,0 +1,204 @@
+"""WebSocket frame encoders"""
+import json
+import struct
+
+import numpy as np
+from pydantic_core import to_json
+
+from tetracore.engine import TetracoreEngine
+from tetracore.models import LodView, TetrahedronPair
+
+# WebSocket frame encoding
+#
+# "full" clients receive the whole SimulationState every tick.  "delta"
+# clients receive one "snapshot" frame on connect (pairs carry a compact
+# integer "index"), then per-tick "delta" frames holding only the fields the
+# tick mutates as columns aligned with "index", plus "add"/"remove" events.
+#
+# "binary" clients negotiate the BINARY_SUBPROTOCOL WebSocket subprotocol and
+# receive one binary message per tick: a BINARY_HEADER followed by packed
+# little-endian arrays, each pair-major and matter before antimatter:
+#
+#   index             uint32  [n]
+#   phase             float32 [n, 2]
+#   energy_state      float32 [n, 2]
+#   stability_factor  float32 [n]
+#   center            float32 [n, 2, 3]
+#
+# Every section starts on a 4-byte boundary so it can be viewed directly as a
+# Float32Array / Uint32Array in the browser.
+BINARY_SUBPROTOCOL = "tetracore.binary.v1"
+BINARY_SCHEMA_VERSION = 1
+BINARY_MAGIC = b"TTRC"
+# magic, schema version, flags (bit 0: running), pair count, time_step,
+# total_stability, system_energy
+BINARY_HEADER = struct.Struct("<4sHHIdff")
+BINARY_SECTIONS = (
+    ("index", "<u4"),
+    ("phase", "<f4"),
+    ("energy_state", "<f4"),
+    ("stability_factor", "<f4"),
+    ("center", "<f4"),
+)
+def _state_header(engine: TetracoreEngine) -> dict:
+    state = engine.simulation_state
+    return {
+        "time_step": state.time_step,
+        "total_stability": state.total_stability,
+        "system_energy": state.system_energy,
+        "running": state.running,
+    }
+
+def encode_full_frame(engine: TetracoreEngine) -> str:
+    # Same output as snapshot().model_dump_json() without validating every pair into a model
+    return to_json(engine.snapshot_document()).decode()
+
+def encode_snapshot_frame(engine: TetracoreEngine) -> str:
+    state = engine.snapshot_document()
+    for pair, key in zip(state["pairs"], engine.pair_index()):
+        pair["index"] = key
+    return to_json({"type": "snapshot", **state}).decode()
+
+def encode_delta_frame(engine: TetracoreEngine) -> str:
+    arrays = engine.frame_arrays()
+    return json.dumps({
+        "type": "delta",
+        **_state_header(engine),
+        "index": arrays["index"].tolist(),
+        "phase": arrays["phase"].tolist(),
+        "energy_state": arrays["energy_state"].tolist(),
+        "stability_factor": arrays["stability_factor"].tolist(),
+    })
+
+def encode_binary_frame(engine: TetracoreEngine) -> bytes:
+    state = engine.simulation_state
+    arrays = engine.frame_arrays()
+    header = BINARY_HEADER.pack(
+        BINARY_MAGIC, BINARY_SCHEMA_VERSION, int(state.running), len(arrays["index"]),
+        state.time_step, state.total_stability, state.system_energy,
+    )
+    return b"".join(
+        [header] + [np.ascontiguousarray(arrays[name], dtype=dtype).tobytes() for name, dtype in BINARY_SECTIONS]
+    )
+
+def decode_binary_frame(frame: bytes) -> dict:
+    """Inverse of ``encode_binary_frame``, for tests and Python clients"""
+    magic, version, flags, n, time_step, total_stability, system_energy = BINARY_HEADER.unpack_from(frame)
+    if magic != BINARY_MAGIC or version != BINARY_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported binary frame {magic!r} v{version}")
+    decoded = {
+        "time_step": time_step,
+        "total_stability": total_stability,
+        "system_energy": system_energy,
+        "running": bool(flags & 1),
+    }
+    offset = BINARY_HEADER.size
+    shapes = {"index": (n,), "phase": (n, 2), "energy_state": (n, 2), "stability_factor": (n,), "center": (n, 2, 3)}
+    for name, dtype in BINARY_SECTIONS:
+        count = int(np.prod(shapes[name]))
+        decoded[name] = np.frombuffer(frame, dtype=dtype, count=count, offset=offset).reshape(shapes[name])
+        offset += count * 4
+    return decoded
+
+def encode_pair_added(engine: TetracoreEngine, pair: TetrahedronPair) -> str:
+    data = pair.model_dump(mode="json")
+    data["index"] = engine.pair_key(pair.id)
+    return json.dumps({"type": "add", "pair": data})
+
+def encode_pair_removed(key: int, pair_id: str) -> str:
+    return json.dumps({"type": "remove", "index": key, "pair_id": pair_id})
+
+FRAME_ENCODERS = {
+    "full": encode_full_frame,
+    "delta": encode_delta_frame,
+    "binary": encode_binary_frame,
+}
+
+# "lod" clients send LodView messages and receive frames built for their own
+# camera, in three tiers ranked by distance from it:
+#
+#   full      nearest pairs inside ``near``: index, vertices [k, 2, 4, 3],
+#             phase, energy_state, stability_factor
+#   centers   next pairs inside ``far``: index, pair midpoint, stability_factor
+#   clusters  everything else visible, binned into grid cells: mean position,
+#             count, mean stability and summed |energy_state|
+#
+# Each tier is capped by the view's budget and the cluster cell size doubles
+# until the cap holds, so a frame's size does not grow with the scene.
+LOD_PROTOCOL = "lod"
+
+def _lod_clusters(midpoint: np.ndarray, stability: np.ndarray, energy: np.ndarray,
+                  cell_size: float, max_clusters: int) -> dict:
+    if not len(midpoint):
+        return {"center": [], "count": [], "stability_factor": [], "energy": []}
+    lo = midpoint.min(axis=0)
+    # No grid finer than this can fit the extent into max_clusters cells
+    cell_size = max(cell_size, float((midpoint.max(axis=0) - lo).max()) / max_clusters ** (1 / 3))
+    while True:
+        cells = np.floor((midpoint - lo) / cell_size).astype(np.int64)
+        span = cells.max(axis=0) + 1
+        keys = (cells[:, 0] * span[1] + cells[:, 1]) * span[2] + cells[:, 2]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        if len(unique) <= max_clusters:
+            break
+        cell_size *= 2
+    count = np.bincount(inverse)
+    center = np.stack([np.bincount(inverse, midpoint[:, a]) for a in range(3)], axis=1) / count[:, None]
+    return {
+        "center": center.tolist(),
+        "count": count.tolist(),
+        "stability_factor": (np.bincount(inverse, stability) / count).tolist(),
+        "energy": np.bincount(inverse, energy).tolist(),
+    }
+
+def encode_lod_frame(engine: TetracoreEngine, view: LodView) -> str:
+    arrays = engine.frame_arrays()
+    midpoint = arrays["center"].mean(axis=1)
+    visible = np.ones(len(midpoint), dtype=bool)
+    if view.box_min is not None:
+        visible &= (midpoint >= (view.box_min.x, view.box_min.y, view.box_min.z)).all(axis=1)
+    if view.box_max is not None:
+        visible &= (midpoint <= (view.box_max.x, view.box_max.y, view.box_max.z)).all(axis=1)
+    if view.planes:
+        planes = np.array(view.planes)
+        visible &= (midpoint @ planes[:, :3].T + planes[:, 3] >= 0).all(axis=1)
+
+    slots = np.flatnonzero(visible)
+    distance = np.linalg.norm(midpoint[slots] - (view.camera.x, view.camera.y, view.camera.z), axis=1)
+    n_full = min(view.max_full, int((distance <= view.near).sum()))
+    n_centers = max(0, min(view.max_centers, int((distance <= view.far).sum()) - n_full))
+    detailed = n_full + n_centers
+    # Only the detailed tiers need ordering; partition them off first so the
+    # sort stays within the budget
+    if detailed < len(slots):
+        order = np.argpartition(distance, detailed)
+        order = np.concatenate([order[:detailed][np.argsort(distance[order[:detailed]], kind="stable")], order[detailed:]])
+    else:
+        order = np.argsort(distance, kind="stable")
+    slots = slots[order]
+    full = slots[:n_full]
+    centers = slots[n_full:detailed]
+    rest = slots[detailed:]
+
+    return json.dumps({
+        "type": "lod",
+        **_state_header(engine),
+        "pairs": engine.pair_count,
+        "visible": len(slots),
+        "full": {
+            "index": arrays["index"][full].tolist(),
+            "vertices": engine.vertex_positions(full).tolist(),
+            "phase": arrays["phase"][full].tolist(),
+            "energy_state": arrays["energy_state"][full].tolist(),
+            "stability_factor": arrays["stability_factor"][full].tolist(),
+        },
+        "centers": {
+            "index": arrays["index"][centers].tolist(),
+            "center": midpoint[centers].tolist(),
+            "stability_factor": arrays["stability_factor"][centers].tolist(),
+        },
+        "clusters": _lod_clusters(
+            midpoint[rest], arrays["stability_factor"][rest], np.abs(arrays["energy_state"][rest]).sum(axis=1),
+            view.cluster_size, view.max_clusters,
+        ),
+    })
@@ -0,0 +1,258 @@
+"""Bounded in-memory history of the system metrics"""
+import asyncio
+import math
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tetracore.config import METRICS_HISTORY_SIZE, METRICS_MAX_POINTS, METRICS_PAIR_HISTORY, METRICS_ROLLUP_SIZE, \
+    PERSIST_INTERVAL
+from tetracore.engine import TetracoreEngine
+
+# Metrics history
+class MetricRing:
+    """Fixed-capacity ring of rows with float columns, appended in ``t`` order"""
+
+    def __init__(self, capacity: int, columns: Tuple[str, ...]):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity) for name in ("t", *columns)}
+        self.start = 0
+        self.size = 0
+
+    def append(self, row: Dict[str, float]):
+        i = (self.start + self.size) % self.capacity
+        for name, column in self.columns.items():
+            column[i] = row[name]
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def clear(self):
+        self.start = self.size = 0
+
+    def last(self, name: str) -> float:
+        return float(self.columns[name][(self.start + self.size - 1) % self.capacity])
+
+    def covers(self, lo: float) -> bool:
+        """Whether no row with ``t >= lo`` has been evicted yet"""
+        return self.size < self.capacity or self.columns["t"][self.start] <= lo
+
+    def _ranges(self, lo: float, hi: float) -> List[slice]:
+        """Slices of the rows with ``lo <= t <= hi``, found by binary search on each contiguous segment"""
+        end = self.start + self.size
+        segments = [(self.start, min(end, self.capacity))]
+        if end > self.capacity:
+            segments.append((0, end - self.capacity))
+        t = self.columns["t"]
+        ranges = []
+        for a, b in segments:
+            ranges.append(slice(a + int(np.searchsorted(t[a:b], lo, "left")), a + int(np.searchsorted(t[a:b], hi, "right"))))
+        return ranges
+
+    def count(self, lo: float, hi: float) -> int:
+        return sum(r.stop - r.start for r in self._ranges(lo, hi))
+
+    def window(self, lo: float, hi: float) -> Dict[str, np.ndarray]:
+        ranges = self._ranges(lo, hi)
+        return {name: np.concatenate([column[r] for r in ranges]) for name, column in self.columns.items()}
+
+class MetricRollup:
+    """min/max/mean of each metric over buckets of ``width`` seconds of simulation time"""
+
+    STATS = ("min", "max", "mean")
+
+    def __init__(self, width: float, capacity: int, metrics: Tuple[str, ...]):
+        self.width = width
+        self.metrics = metrics
+        self.ring = MetricRing(capacity, tuple(f"{m}_{s}" for m in metrics for s in self.STATS))
+        self._bucket: Optional[int] = None
+        self._count = 0
+        self._stats: Dict[str, List[float]] = {}
+
+    def add(self, t: float, values: Dict[str, float]) -> bool:
+        """Fold in one sample; returns True if it closed the previous bucket"""
+        bucket = math.floor(t / self.width)
+        closed = False
+        if bucket != self._bucket:
+            closed = self._close()
+            self._bucket = bucket
+            self._count = 0
+            self._stats = {m: [math.inf, -math.inf, 0.0] for m in self.metrics}
+        self._count += 1
+        for m, stats in self._stats.items():
+            value = values[m]
+            if value < stats[0]:
+                stats[0] = value
+            if value > stats[1]:
+                stats[1] = value
+            stats[2] += value
+        return closed
+
+    def _open_row(self) -> Dict[str, float]:
+        row = {"t": self._bucket * self.width}
+        for m, (low, high, total) in self._stats.items():
+            row.update({f"{m}_min": low, f"{m}_max": high, f"{m}_mean": total / self._count})
+        return row
+
+    def _close(self) -> bool:
+        if not self._count:
+            return False
+        self.ring.append(self._open_row())
+        return True
+
+    def clear(self):
+        self.ring.clear()
+        self._bucket = None
+        self._count = 0
+
+    def count(self, lo: float, hi: float) -> int:
+        return self.ring.count(lo, hi) + 1
+
+    def covers(self, lo: float) -> bool:
+        return self.ring.covers(lo)
+
+    def window(self, lo: float, hi: float) -> Dict[str, np.ndarray]:
+        """Closed buckets in range plus the one still filling"""
+        rows = self.ring.window(lo, hi)
+        if self._count and lo <= self._bucket * self.width <= hi:
+            row = self._open_row()
+            rows = {name: np.append(column, row[name]) for name, column in rows.items()}
+        return rows
+
+class MetricsHistory:
+    """Bounded history of the system metrics, keyed by simulation time.
+
+    Every recorded tick goes into a raw ring and is folded into 1 s and 1 min
+    rollups, so range queries read a few hundred precomputed rows rather than
+    the raw ticks.  Optionally keeps a per-pair stability snapshot each
+    second and writes the 1 s rollups to a MongoDB time-series collection.
+    """
+
+    METRICS = ("total_stability", "system_energy", "pair_count")
+    ROLLUPS = {"1s": 1.0, "1m": 60.0}
+
+    def __init__(self, capacity: int = METRICS_HISTORY_SIZE, rollup_capacity: int = METRICS_ROLLUP_SIZE,
+                 pair_snapshots: int = METRICS_PAIR_HISTORY, max_points: int = METRICS_MAX_POINTS,
+                 collection=None, interval: float = PERSIST_INTERVAL):
+        self.raw = MetricRing(capacity, self.METRICS)
+        self.rollups = {name: MetricRollup(width, rollup_capacity, self.METRICS) for name, width in self.ROLLUPS.items()}
+        # (time, keys sorted ascending, stability in key order)
+        self.pair_history: Deque[Tuple[float, np.ndarray, np.ndarray]] = deque(maxlen=pair_snapshots or None)
+        self.pair_snapshots = pair_snapshots
+        self.max_points = max_points
+        self.collection = collection
+        self.interval = interval
+        self._unsaved: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def clear(self):
+        self.raw.clear()
+        for rollup in self.rollups.values():
+            rollup.clear()
+        self.pair_history.clear()
+
+    def record(self, engine: TetracoreEngine):
+        """Append the engine's current metrics; call after ``calculate_system_metrics``"""
+        state = engine.simulation_state
+        t = state.time_step
+        if self.raw.size and t < self.raw.last("t"):
+            # Simulation time went backwards (reset or restore): start over
+            self.clear()
+        values = {"total_stability": state.total_stability, "system_energy": state.system_energy,
+                  "pair_count": float(engine.pair_count)}
+        self.raw.append({"t": t, **values})
+        for name, rollup in self.rollups.items():
+            if rollup.add(t, values) and name == "1s":
+                self._second_closed(engine, rollup.ring.last("t"))
+
+    def _second_closed(self, engine: TetracoreEngine, t: float):
+        if self.pair_snapshots:
+            arrays = engine.frame_arrays()
+            order = np.argsort(arrays["index"])
+            self.pair_history.append((t, arrays["index"][order], arrays["stability_factor"][order].astype(np.float32)))
+        if self.collection is not None:
+            ring = self.rollups["1s"].ring
+            document = {"ts": datetime.now(), "time_step": t}
+            document.update({name: ring.last(name) for name in ring.columns if name != "t"})
+            self._unsaved.append(document)
+
+    def _resolution(self, lo: float, hi: float) -> str:
+        """Finest resolution that still holds the start of the range and fits ``max_points``"""
+        if self.raw.covers(lo) and self.raw.count(lo, hi) <= self.max_points:
+            return "raw"
+        for name, rollup in self.rollups.items():
+            if rollup.covers(lo) and rollup.count(lo, hi) <= self.max_points:
+                return name
+        return list(self.rollups)[-1]
+
+    def series(self, lo: Optional[float] = None, hi: Optional[float] = None, resolution: str = "auto") -> dict:
+        """Chart-ready columns for ``lo <= t <= hi``; every metric has min/max/mean"""
+        lo = -math.inf if lo is None else lo
+        hi = math.inf if hi is None else hi
+        if resolution == "auto":
+            resolution = self._resolution(lo, hi)
+        series = {"resolution": resolution}
+        if resolution == "raw":
+            rows = self.raw.window(lo, hi)
+            series["t"] = rows["t"].tolist()
+            for m in self.METRICS:
+                values = rows[m].tolist()
+                series[m] = {"min": values, "max": values, "mean": values}
+        else:
+            rows = self.rollups[resolution].window(lo, hi)
+            series["t"] = rows["t"].tolist()
+            for m in self.METRICS:
+                series[m] = {s: rows[f"{m}_{s}"].tolist() for s in MetricRollup.STATS}
+        return series
+
+    def pair_series(self, key: int, lo: Optional[float] = None, hi: Optional[float] = None) -> dict:
+        """One pair's stability from the per-second snapshots"""
+        lo = -math.inf if lo is None else lo
+        hi = math.inf if hi is None else hi
+        t, stability = [], []
+        for when, keys, values in self.pair_history:
+            if lo <= when <= hi:
+                i = int(np.searchsorted(keys, key))
+                if i < len(keys) and keys[i] == key:
+                    t.append(when)
+                    stability.append(float(values[i]))
+        return {"t": t, "stability_factor": stability}
+
+    # Optional MongoDB time-series persistence of the 1 s rollups
+    def start(self):
+        if self.collection is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        try:
+            await self.collection.database.create_collection(
+                self.collection.name, timeseries={"timeField": "ts", "granularity": "seconds"},
+            )
+        except Exception as e:
+            # Usually: it already exists
+            print(f"Database error: {e}")
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        if not self._unsaved:
+            return
+        documents, self._unsaved = self._unsaved, []
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except Exception as e:
+            print(f"Database error: {e}")
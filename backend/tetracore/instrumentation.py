@@ -0,0 +1,184 @@
+"""Process-wide performance metrics of the API server"""
+import bisect
+import math
+import time
+from typing import Dict, List, Tuple
+
+# Instrumentation, exposed in Prometheus text format at /api/metrics
+#
+# Hot-path updates are a bisect plus a couple of float adds on plain Python
+# objects; values are only formatted when the endpoint is scraped.
+def _label_value(value) -> str:
+    """Label value escaped as the text exposition format requires"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_label_value(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+class _Timer:
+    """``with histogram.time():`` observes the block's wall time, also when it raises"""
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+class Histogram:
+    """Prometheus histogram with optional labels; ``labels(...)`` children are cached"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label_names = labels
+        self.children: Dict[Tuple[str, ...], _HistogramChild] = {}
+        if not labels:
+            self.children[()] = _HistogramChild(self.buckets)
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float):
+        self.children[()].observe(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self.children[()])
+
+    def samples(self):
+        for values, child in self.children.items():
+            total = 0
+            for bound, count in zip((*self.buckets, math.inf), child.counts):
+                total += count
+                le = 'le="+Inf"' if bound == math.inf else f'le="{float(bound)!r}"'
+                yield f"{self.name}_bucket{_label_text(self.label_names, values, le)}", total
+            yield f"{self.name}_sum{_label_text(self.label_names, values)}", child.sum
+            yield f"{self.name}_count{_label_text(self.label_names, values)}", total
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class Counter:
+    """Monotonic counter; by convention ``name`` ends in ``_total``"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.children: Dict[Tuple[str, ...], _CounterChild] = {}
+        if not labels:
+            self.children[()] = _CounterChild()
+
+    def labels(self, *values: str) -> _CounterChild:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = _CounterChild()
+        return child
+
+    def inc(self, amount: float = 1.0):
+        self.children[()].inc(amount)
+
+    def samples(self):
+        for values, child in self.children.items():
+            yield f"{self.name}{_label_text(self.label_names, values)}", child.value
+
+class Gauge:
+    """Gauge read at scrape time from ``collect()``, which yields ``(label values, value)``"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, collect, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.collect = collect
+
+    def samples(self):
+        for values, value in self.collect():
+            yield f"{self.name}{_label_text(self.label_names, values)}", value
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[object] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value!r}" if isinstance(value, float) else f"{name} {value}"
+                         for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+SECONDS_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1 KiB .. 256 MiB
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+registry = MetricsRegistry()
+TICK_SECONDS = registry.register(Histogram(
+    "tetracore_tick_seconds", "Wall time of one ticker wakeup, by phase",
+    SECONDS_BUCKETS, ("phase",),
+))
+TICK_BYTES = registry.register(Histogram(
+    "tetracore_tick_bytes", "Bytes queued to WebSocket clients per published tick", BYTES_BUCKETS,
+))
+TICK_STEPS = registry.register(Counter("tetracore_tick_steps_total", "Fixed simulation steps taken by the ticker"))
+WS_SEND_SECONDS = registry.register(Histogram(
+    "tetracore_ws_send_seconds", "Time to hand one message to a WebSocket client, by protocol",
+    SECONDS_BUCKETS, ("protocol",),
+))
+WS_QUEUE_DEPTH = registry.register(Histogram(
+    "tetracore_ws_queue_depth", "Messages still queued for a client when one is sent", DEPTH_BUCKETS,
+))
+WS_SENT_BYTES = registry.register(Counter("tetracore_ws_sent_bytes_total", "Bytes sent to WebSocket clients", ("protocol",)))
+WS_DROPPED_FRAMES = registry.register(Counter(
+    "tetracore_ws_dropped_frames_total", "Tick frames replaced before a slow client received them",
+))
+WS_EVICTIONS = registry.register(Counter("tetracore_ws_evictions_total", "WebSocket clients evicted", ("reason",)))
+BROADCAST_THROTTLES = registry.register(Counter(
+    "tetracore_broadcast_throttles_total", "Times a protocol's broadcast rate was halved for CPU or network load",
+))
+MONGO_OP_SECONDS = registry.register(Histogram(
+    "tetracore_mongo_op_seconds", "MongoDB operation latency, by operation", SECONDS_BUCKETS, ("op",),
+))
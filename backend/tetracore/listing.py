@@ -0,0 +1,102 @@
+"""Keyset cursors and row projection of the paginated pair listings"""
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from tetracore.models import PairQuery, Tetrahedron, TetrahedronPair
+
+# Paginated pair listing
+TETRAHEDRON_SIDES = ("matter_tetrahedron", "antimatter_tetrahedron")
+PAIR_FIELDS = {*TetrahedronPair.model_fields, "center", "index"} | {
+    f"{side}.{field}" for side in TETRAHEDRON_SIDES for field in Tetrahedron.model_fields
+}
+
+def encode_cursor(source: str, sort: str, value, key) -> str:
+    """Opaque keyset cursor: the sort value and tie-breaking key of the last row served"""
+    return base64.urlsafe_b64encode(json.dumps([source, sort, value, key]).encode()).decode()
+
+def decode_cursor(cursor: str, source: str, sort: str) -> tuple:
+    """``(value, key)`` from ``encode_cursor``; ValueError if it is malformed or from another listing"""
+    try:
+        cursor_source, cursor_sort, value, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if (cursor_source, cursor_sort) != (source, sort):
+        raise ValueError("Cursor belongs to a listing with a different source or sort")
+    return value, key
+
+def project_pair(document: dict, key: Optional[int], fields: Optional[List[str]],
+                 particle_type: Optional[str] = None) -> dict:
+    """One listing row: ``document`` cut down to ``fields``, without tetrahedra of another ``particle_type``"""
+    if particle_type is not None:
+        hidden = {side for side in TETRAHEDRON_SIDES if document[side].get("particle_type", "matter") != particle_type}
+    else:
+        hidden = set()
+    if fields is None:
+        return {name: value for name, value in document.items() if name not in hidden}
+    row = {}
+    for field in fields:
+        name, _, sub = field.partition(".")
+        if name == "center":
+            m, a = (document[side]["center"] for side in TETRAHEDRON_SIDES)
+            row["center"] = {axis: (m[axis] + a[axis]) / 2 for axis in ("x", "y", "z")}
+        elif name == "index":
+            row["index"] = key
+        elif name in hidden:
+            continue
+        elif sub:
+            row.setdefault(name, {})[sub] = document[name][sub]
+        else:
+            row[name] = document[name]
+    return row
+
+def stored_pair_query(query: PairQuery) -> Tuple[dict, dict, List[Tuple[str, int]]]:
+    """MongoDB filter, projection and sort for ``query`` on the pairs collection.
+
+    Pages are ordered by ``(stability_factor, id)``, or by ``id`` for
+    ``sort=index``, to match the compound index from ``ensure_pair_indexes``.
+    """
+    conditions = []
+    stability = {}
+    if query.min_stability is not None:
+        stability["$gte"] = query.min_stability
+    if query.max_stability is not None:
+        stability["$lte"] = query.max_stability
+    if stability:
+        conditions.append({"stability_factor": stability})
+    if query.particle_type is not None:
+        conditions.append({"$or": [{f"{side}.particle_type": query.particle_type} for side in TETRAHEDRON_SIDES]})
+    bounds = []
+    for box, op in ((query.box_min, "$gte"), (query.box_max, "$lte")):
+        if box is not None:
+            for axis in ("x", "y", "z"):
+                midpoint = {"$divide": [{"$add": [f"${side}.center.{axis}" for side in TETRAHEDRON_SIDES]}, 2]}
+                bounds.append({op: [midpoint, getattr(box, axis)]})
+    if bounds:
+        conditions.append({"$expr": {"$and": bounds}})
+
+    direction = -1 if query.sort == "-stability" else 1
+    sort = [("id", 1)] if query.sort == "index" else [("stability_factor", direction), ("id", direction)]
+    if query.cursor is not None:
+        value, key = decode_cursor(query.cursor, "database", query.sort)
+        after = "$gt" if direction > 0 else "$lt"
+        if query.sort == "index":
+            conditions.append({"id": {"$gt": key}})
+        else:
+            conditions.append({"$or": [{"stability_factor": {after: value}},
+                                       {"stability_factor": value, "id": {after: key}}]})
+
+    projection = {"_id": 0}
+    if query.fields is not None:
+        paths = {"id", "stability_factor"}
+        for field in query.fields:
+            if field == "center":
+                paths.update(f"{side}.center" for side in TETRAHEDRON_SIDES)
+            elif field != "index":
+                paths.add(field)
+        if query.particle_type is not None:
+            paths.update(f"{side}.particle_type" for side in TETRAHEDRON_SIDES)
+        # MongoDB rejects a path together with one of its sub-paths
+        paths = {p for p in paths if p.partition(".")[0] == p or p.partition(".")[0] not in paths}
+        projection.update(dict.fromkeys(sorted(paths), 1))
+    return {"$and": conditions} if conditions else {}, projection, sort
@@ -0,0 +1,153 @@
+"""Pydantic models of the API and of the requests the engines accept"""
+import uuid
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field, model_validator
+
+from tetracore.config import LOD_MAX_CENTERS, LOD_MAX_CLUSTERS, LOD_MAX_FULL, MAX_BATCH_STEPS, MAX_BULK_PAIRS, \
+    PAIR_PAGE_MAX, PAIR_PAGE_SIZE, TICK_RATE
+
+class Vector3D(BaseModel):
+    x: float
+    y: float
+    z: float
+
+class TetrahedronVertex(BaseModel):
+    position: Vector3D
+    energy: float = 0.0
+    spin: float = 0.0
+    mass_projection: float = 1.0
+
+class Tetrahedron(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    vertices: List[TetrahedronVertex]
+    center: Vector3D
+    energy_state: float = 1.0
+    oscillation_frequency: float = 1.0
+    phase: float = 0.0
+    particle_type: str = "matter"  # "matter" or "antimatter"
+    
+class TetrahedronPair(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    matter_tetrahedron: Tetrahedron
+    antimatter_tetrahedron: Tetrahedron
+    stability_factor: float = 1.0
+    pairing_strength: float = 1.0
+    entanglement_connection: bool = True
+    created_at: datetime = Field(default_factory=datetime.now)
+
+class SimulationState(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    pairs: List[TetrahedronPair] = []
+    total_stability: float = 0.0
+    min_stability: float = 0.0
+    max_stability: float = 0.0
+    system_energy: float = 0.0
+    time_step: float = 0.0
+    running: bool = False
+
+# Bulk request models
+class PairSpec(BaseModel):
+    center: Vector3D
+    separation: float = 2.0
+
+class PairGenerator(BaseModel):
+    kind: Literal["lattice", "random_box", "sphere_shell"]
+    count: int = Field(gt=0, le=MAX_BULK_PAIRS)
+    seed: Optional[int] = None
+    origin: Vector3D = Field(default_factory=lambda: Vector3D(x=0, y=0, z=0))
+    spacing: float = 5.0   # lattice: distance between neighbouring pair centers
+    size: float = 100.0    # random_box: edge length of the box
+    radius: float = 50.0   # sphere_shell: radius of the shell
+    separation: float = 2.0
+
+class BulkCreateRequest(BaseModel):
+    pairs: List[PairSpec] = []
+    generator: Optional[PairGenerator] = None
+
+class PairFilter(BaseModel):
+    """Matches pairs by stability and by the midpoint of their two centers"""
+    min_stability: Optional[float] = None
+    max_stability: Optional[float] = None
+    box_min: Optional[Vector3D] = None
+    box_max: Optional[Vector3D] = None
+
+class PairQuery(PairFilter):
+    """One page of a pair listing.
+
+    ``cursor`` is the ``next_cursor`` of the previous page, which must have
+    used the same ``sort``.  ``fields`` names top-level pair fields,
+    ``matter_tetrahedron.<field>``/``antimatter_tetrahedron.<field>``, or
+    ``center`` (the pair midpoint) and ``index`` (the key in delta frames);
+    None returns whole pairs.  With ``particle_type`` only the tetrahedra of
+    that type are returned, and pairs without one are skipped.
+    """
+    limit: int = Field(default=PAIR_PAGE_SIZE, gt=0, le=PAIR_PAGE_MAX)
+    cursor: Optional[str] = None
+    sort: Literal["index", "stability", "-stability"] = "index"
+    particle_type: Optional[str] = None
+    fields: Optional[List[str]] = None
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = []
+    filter: Optional[PairFilter] = None
+
+class TickRates(BaseModel):
+    """Scheduler targets changed at runtime; omitted fields keep their current value"""
+    tick_rate: Optional[float] = Field(default=None, gt=0, le=1000)
+    broadcast_rate: Optional[float] = Field(default=None, gt=0, le=1000)
+    min_broadcast_rate: Optional[float] = Field(default=None, gt=0, le=1000)
+    max_steps: Optional[int] = Field(default=None, ge=1, le=1000)
+    cpu_budget: Optional[float] = Field(default=None, gt=0, le=1)
+
+class StepRequest(BaseModel):
+    """Headless batch: advance ``steps`` ticks of ``dt`` without waiting on the wall clock"""
+    steps: int = Field(gt=0, le=MAX_BATCH_STEPS)
+    dt: float = Field(default=1.0 / TICK_RATE, gt=0)
+    sample_every: int = Field(default=0, ge=0)  # metrics every n steps; the final step is always sampled
+
+SWEEP_PARAMETERS = ("separation", "oscillation_frequency", "pairing_strength")
+SweepParameter = Literal["separation", "oscillation_frequency", "pairing_strength"]
+
+class SweepSpec(BaseModel):
+    """Configurations for a parameter sweep and how to run each one.
+
+    The sweep runs the cartesian product of ``grid`` plus ``samples``
+    uniform draws from ``ranges``.  Unswept parameters keep their random
+    per-pair values (separation: 2.0).
+    """
+    grid: Dict[SweepParameter, List[float]] = {}
+    ranges: Dict[SweepParameter, Tuple[float, float]] = {}
+    samples: int = Field(default=0, ge=0)
+    engine: Literal["object", "vectorized"] = "vectorized"
+    pairs: int = Field(default=100, gt=0, le=MAX_BULK_PAIRS)
+    spacing: float = 5.0  # lattice spacing between pair centers
+    steps: int = Field(default=1000, gt=0, le=MAX_BATCH_STEPS)
+    dt: float = Field(default=1.0 / TICK_RATE, gt=0)
+    sample_every: int = Field(default=100, gt=0)
+    seed: int = 0
+
+class LodView(BaseModel):
+    """Camera and detail budget sent by a ``format=lod`` WebSocket client.
+
+    Pairs are culled against the viewport box and/or frustum planes
+    ``(a, b, c, d)`` (inside where ``a*x + b*y + c*z + d >= 0``, as in
+    three.js), then ranked by distance from the camera.
+    """
+    camera: Vector3D = Field(default_factory=lambda: Vector3D(x=0, y=0, z=0))
+    box_min: Optional[Vector3D] = None
+    box_max: Optional[Vector3D] = None
+    planes: List[Tuple[float, float, float, float]] = Field(default=[], max_length=6)
+    near: float = 50.0           # full vertex data within this distance
+    far: float = 200.0           # center-only records within this distance
+    cluster_size: float = 25.0   # starting cell size for cluster summaries
+    max_full: int = Field(default=LOD_MAX_FULL, ge=0, le=LOD_MAX_FULL)
+    max_centers: int = Field(default=LOD_MAX_CENTERS, ge=0, le=LOD_MAX_CENTERS)
+    max_clusters: int = Field(default=LOD_MAX_CLUSTERS, ge=1, le=LOD_MAX_CLUSTERS)
+
+    @model_validator(mode="after")
+    def check_ranges(self) -> "LodView":
+        if self.near > self.far:
+            raise ValueError("near cannot exceed far")
+        return self
@@ -0,0 +1,58 @@
+"""Pair operations shared by the main simulation and the sessions"""
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from tetracore.engine import TetracoreEngine
+from tetracore.models import BulkCreateRequest, BulkDeleteRequest, PairGenerator
+
+def bulk_create_arrays(request: BulkCreateRequest) -> Tuple[np.ndarray, np.ndarray, Optional[np.random.Generator]]:
+    """Centers, separations and the generator to pass to ``create_pairs``"""
+    generator = request.generator
+    rng = None
+    centers = [(p.center.x, p.center.y, p.center.z) for p in request.pairs]
+    separations = [p.separation for p in request.pairs]
+    if generator:
+        generator_rng = np.random.default_rng(generator.seed)
+        centers.extend(generate_centers(generator, generator_rng).tolist())
+        separations.extend([generator.separation] * generator.count)
+        # A seeded generator also fixes the pairs' own random properties;
+        # otherwise the engine's RNG is used
+        if generator.seed is not None:
+            rng = generator_rng
+    return np.array(centers, dtype=float).reshape(-1, 3), np.array(separations, dtype=float), rng
+
+def bulk_delete_ids(engine: TetracoreEngine, request: BulkDeleteRequest) -> List[str]:
+    """Requested ids plus the filter's matches, without duplicates"""
+    pair_ids = list(request.ids)
+    if request.filter is not None:
+        pair_ids.extend(engine.select_pairs(request.filter))
+    return list(dict.fromkeys(pair_ids))
+
+def pairs_nearby(engine: TetracoreEngine, center: Tuple[float, float, float], radius: float, limit: int) -> dict:
+    hits = engine.grid.query_radius(center, radius)[:limit]
+    return {
+        "pairs": engine.get_pairs([pair_id for pair_id, _ in hits]),
+        "distances": [distance for _, distance in hits],
+    }
+
+def pairs_in_box(engine: TetracoreEngine, lo: Tuple[float, float, float], hi: Tuple[float, float, float],
+                 limit: int) -> dict:
+    return {"pairs": engine.get_pairs(engine.grid.query_box(lo, hi)[:limit])}
+
+def generate_centers(generator: PairGenerator, rng: np.random.Generator) -> np.ndarray:
+    """Pair centers for a bulk generator spec, shape (count, 3)"""
+    n = generator.count
+    origin = np.array([generator.origin.x, generator.origin.y, generator.origin.z])
+    if generator.kind == "lattice":
+        side = math.ceil(round(n ** (1 / 3), 9))
+        i = np.arange(n)
+        cells = np.stack([i % side, i // side % side, i // (side * side)], axis=1)
+        return origin + (cells - (side - 1) / 2) * generator.spacing
+    if generator.kind == "random_box":
+        return origin + rng.uniform(-generator.size / 2, generator.size / 2, (n, 3))
+    # sphere_shell: normalised Gaussian samples are uniform on the sphere
+    directions = rng.normal(size=(n, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    return origin + directions * generator.radius
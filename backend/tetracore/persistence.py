@@ -0,0 +1,326 @@
+"""MongoDB persistence: write-behind flushing, warm restart and stored-pair queries"""
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from tetracore.checkpoint import read_checkpoint, write_checkpoint
+from tetracore.config import BULK_WRITE_CHUNK, CHECKPOINT_INTERVAL, CHECKPOINT_PATH, PERSIST_INTERVAL, \
+    PERSIST_MAX_PENDING, RESTORE_BATCH_SIZE
+from tetracore.engine import TetracoreEngine, VectorizedTetracoreEngine
+from tetracore.instrumentation import MONGO_OP_SECONDS
+from tetracore.listing import encode_cursor, project_pair, stored_pair_query
+from tetracore.models import PairQuery
+
+# Write-behind persistence of the evolving simulation state
+PERSISTED_FIELDS = (
+    "matter_tetrahedron.phase",
+    "antimatter_tetrahedron.phase",
+    "matter_tetrahedron.energy_state",
+    "antimatter_tetrahedron.energy_state",
+    "stability_factor",
+)
+
+class StatePersister:
+    """Batches per-tick pair updates into periodic MongoDB ``bulk_write`` calls.
+
+    A tick changes every pair, so rather than queueing each update the
+    persister only counts the updates since the last flush and remembers
+    since when the engine is dirty.  Repeated updates to a pair coalesce
+    into the single value read when the flush starts, so the queue depth is
+    bounded by the pair count.  A flush runs every ``interval`` seconds while
+    the engine is dirty, or early once ``max_pending`` updates have piled up;
+    an early flush waits at least as long as the previous flush took, so a
+    scene larger than ``max_pending`` does not flush back to back.
+    """
+
+    def __init__(self, engine: TetracoreEngine, collection, state_collection,
+                 interval: float = PERSIST_INTERVAL, max_pending: int = PERSIST_MAX_PENDING,
+                 batch_size: int = BULK_WRITE_CHUNK):
+        self.engine = engine
+        self.collection = collection
+        self.state_collection = state_collection
+        self.interval = interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._dirty_since: Optional[float] = None
+        self._changes = 0
+        self._flushed_at = 0.0
+        self._flush_now = asyncio.Event()
+        # Keeps a flush from writing back state a ``clear`` just removed
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_pairs = 0
+        self.errors = 0
+        self.last_flush_lag = 0.0
+        self.last_flush_duration = 0.0
+
+    @property
+    def pending(self) -> int:
+        """Queue depth: pairs whose latest state has not been written yet"""
+        return min(self._changes, self.engine.pair_count)
+
+    def flush_lag(self) -> float:
+        """Age in seconds of the oldest unwritten change"""
+        if self._dirty_since is None:
+            return 0.0
+        return asyncio.get_running_loop().time() - self._dirty_since
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.pending,
+            "pending_updates": self._changes,
+            "flush_lag": self.flush_lag(),
+            "last_flush_lag": self.last_flush_lag,
+            "last_flush_duration": self.last_flush_duration,
+            "flushes": self.flushes,
+            "flushed_pairs": self.flushed_pairs,
+            "errors": self.errors,
+        }
+
+    def mark_dirty(self, steps: int = 1):
+        """Record that every pair changed ``steps`` times, e.g. after a tick"""
+        if self._dirty_since is None:
+            self._dirty_since = asyncio.get_running_loop().time()
+        self._changes += steps * self.engine.pair_count
+        if self._changes >= self.max_pending:
+            self._flush_now.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                # Leave the loop and the database at least as much idle time as the last flush took
+                await asyncio.sleep(self._flushed_at + self.last_flush_duration - asyncio.get_running_loop().time())
+            self._flush_now.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            await self._flush()
+
+    async def clear(self):
+        """Delete every stored pair and store the engine's header, e.g. after a reset"""
+        async with self._lock:
+            self._dirty_since = None
+            self._changes = 0
+            header = self.engine.simulation_state.model_dump(exclude={"pairs"})
+            try:
+                with MONGO_OP_SECONDS.labels("delete_many").time():
+                    await self.collection.delete_many({})
+                await self.state_collection.replace_one({"_id": "current"}, header, upsert=True)
+            except Exception as e:
+                self.errors += 1
+                print(f"Database error: {e}")
+
+    async def _flush(self):
+        if self._dirty_since is None:
+            return
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        lag = started - self._dirty_since
+
+        # Copy the values up front so every batch comes from the same tick
+        arrays = self.engine.frame_arrays()
+        ids = self.engine.pair_id_list()
+        phase = arrays["phase"].tolist()
+        energy_state = arrays["energy_state"].tolist()
+        stability = arrays["stability_factor"].tolist()
+        header = self.engine.simulation_state.model_dump(exclude={"pairs"})
+        self._dirty_since = None
+        self._changes = 0
+
+        try:
+            for start in range(0, len(ids), self.batch_size):
+                stop = min(start + self.batch_size, len(ids))
+                operations = await asyncio.to_thread(
+                    self._operations, ids[start:stop], phase[start:stop], energy_state[start:stop], stability[start:stop],
+                )
+                with MONGO_OP_SECONDS.labels("bulk_write").time():
+                    await self.collection.bulk_write(operations, ordered=False)
+            await self.state_collection.replace_one({"_id": "current"}, header, upsert=True)
+        except Exception as e:
+            self.errors += 1
+            print(f"Database error: {e}")
+
+        self.flushes += 1
+        self.flushed_pairs += len(ids)
+        self.last_flush_lag = lag
+        self._flushed_at = loop.time()
+        self.last_flush_duration = self._flushed_at - started
+
+    @staticmethod
+    def _operations(ids: List[str], phase: list, energy_state: list, stability: list) -> List[UpdateOne]:
+        """``bulk_write`` updates for one batch, built off the event loop"""
+        return [
+            UpdateOne({"id": pair_id}, {"$set": dict(zip(PERSISTED_FIELDS, (p[0], p[1], e[0], e[1], s)))})
+            for pair_id, p, e, s in zip(ids, phase, energy_state, stability)
+        ]
+
+# Warm restart
+def _update_columns(documents: List[dict]) -> Tuple[list, list, list, list]:
+    """Split documents projected on the per-tick fields into ``apply_updates`` columns"""
+    ids, phase, energy_state, stability = [], [], [], []
+    for d in documents:
+        matter, antimatter = d["matter_tetrahedron"], d["antimatter_tetrahedron"]
+        ids.append(d["id"])
+        phase.append((matter["phase"], antimatter["phase"]))
+        energy_state.append((matter["energy_state"], antimatter["energy_state"]))
+        stability.append(d["stability_factor"])
+    return ids, phase, energy_state, stability
+
+async def restore_state(engine: TetracoreEngine, collection, state_collection,
+                        checkpoint_path: str = CHECKPOINT_PATH, batch_size: int = RESTORE_BATCH_SIZE) -> dict:
+    """Rebuild the engine from the last checkpoint and the pairs collection.
+
+    The pairs collection is authoritative for which pairs exist.  With a
+    checkpoint, only ids (plus the per-tick fields, if the write-behind
+    persister saved a newer tick than the checkpoint) are streamed from
+    MongoDB and just the pairs missing from the checkpoint are fetched in
+    full.  Without one, every document is streamed into the engine.
+    """
+    started = time.perf_counter()
+    header = await state_collection.find_one({"_id": "current"})
+    stored_time_step = header.get("time_step", 0.0) if header else 0.0
+
+    arrays = None
+    if checkpoint_path and isinstance(engine, VectorizedTetracoreEngine) and os.path.exists(checkpoint_path):
+        try:
+            arrays = await asyncio.to_thread(read_checkpoint, checkpoint_path)
+            engine.restore_checkpoint(arrays)
+        except Exception as e:
+            print(f"Checkpoint error: {e}")
+            arrays = None
+            engine.reset()
+
+    if arrays is not None:
+        fresher = stored_time_step > engine.simulation_state.time_step
+        projection = {"_id": 0, "id": 1}
+        if fresher:
+            projection.update({field: 1 for field in PERSISTED_FIELDS})
+        stored_ids = set()
+        cursor = collection.find({}, projection, batch_size=batch_size)
+        while batch := await cursor.to_list(length=batch_size):
+            stored_ids.update(d["id"] for d in batch)
+            if fresher:
+                engine.apply_updates(*_update_columns(batch))
+        for pair_id in engine.pair_id_list():
+            if pair_id not in stored_ids:
+                engine.remove_pair(pair_id)
+        missing = [pair_id for pair_id in stored_ids if engine.pair_key(pair_id) is None]
+        for start in range(0, len(missing), batch_size):
+            query = {"id": {"$in": missing[start:start + batch_size]}}
+            engine.load_documents(await collection.find(query, {"_id": 0}).to_list(length=None))
+        source = "checkpoint"
+    else:
+        fresher = True
+        cursor = collection.find({}, {"_id": 0}, batch_size=batch_size)
+        while batch := await cursor.to_list(length=batch_size):
+            engine.load_documents(batch)
+        source = "database"
+
+    if fresher:
+        engine.simulation_state.time_step = stored_time_step
+    return {"source": source, "pairs": engine.pair_count, "seconds": time.perf_counter() - started}
+
+class Checkpointer:
+    """Periodically writes a compressed checkpoint of the vectorized engine's arrays"""
+
+    def __init__(self, engine: TetracoreEngine, path: str = CHECKPOINT_PATH, interval: float = CHECKPOINT_INTERVAL):
+        self.engine = engine
+        self.path = path
+        self.interval = interval
+        self.enabled = bool(path) and isinstance(engine, VectorizedTetracoreEngine)
+        self._saved = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.save()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    async def save(self):
+        async with self._lock:
+            await self._save()
+
+    async def clear(self):
+        """Delete the checkpoint so a restart does not bring back the state it holds"""
+        async with self._lock:
+            self._saved = None
+            if self.path and os.path.exists(self.path):
+                try:
+                    os.remove(self.path)
+                except OSError as e:
+                    print(f"Checkpoint error: {e}")
+
+    async def _save(self):
+        if not self.enabled:
+            return
+        fingerprint = (self.engine.simulation_state.time_step, self.engine.pair_count)
+        if fingerprint == self._saved:
+            return
+        # Copy synchronously, compress off the event loop
+        arrays = self.engine.checkpoint_arrays()
+        try:
+            await asyncio.to_thread(write_checkpoint, self.path, arrays)
+            self._saved = fingerprint
+        except Exception as e:
+            print(f"Checkpoint error: {e}")
+
+# Paginated listing of the stored pairs
+async def query_stored_pairs(collection, query: PairQuery, engine: TetracoreEngine) -> dict:
+    """``engine.query_pairs`` against the persisted pairs; ``index`` is None for pairs the engine lacks"""
+    mongo_filter, projection, sort = stored_pair_query(query)
+    with MONGO_OP_SECONDS.labels("find").time():
+        documents = await collection.find(mongo_filter, projection).sort(sort).limit(query.limit + 1).to_list(None)
+    page = documents[:query.limit]
+    rows = [project_pair(d, engine.pair_key(d["id"]), query.fields, query.particle_type) for d in page]
+    next_cursor = None
+    if len(documents) > query.limit:
+        last = page[-1]
+        value = last["id"] if query.sort == "index" else last["stability_factor"]
+        next_cursor = encode_cursor("database", query.sort, value, last["id"])
+    return {"pairs": rows, "next_cursor": next_cursor}
+
+async def ensure_pair_indexes(collection):
+    """Indexes behind the by-id writes and ``query_stored_pairs``"""
+    try:
+        await collection.create_index("id")
+        await collection.create_index([("stability_factor", 1), ("id", 1)])
+    except Exception as e:
+        print(f"Database error: {e}")
@@ -0,0 +1,159 @@
+"""Compact in-engine pair storage and id generation"""
+import math
+import os
+from array import array
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tetracore.models import TetrahedronPair
+
+# Compact pair storage
+#
+# Engines keep pairs as slotted records (object engine) or array columns
+# (vectorized engine) and only build the Pydantic models when a pair is
+# serialized.  Vertices are stored as offsets from their tetrahedron's
+# center, and regular tetrahedra all share one set of offsets.
+class Point(NamedTuple):
+    x: float
+    y: float
+    z: float
+
+# Offsets of a regular tetrahedron's vertices from its center (size 1.0),
+# matching create_regular_tetrahedron
+TETRAHEDRON_OFFSETS = tuple(
+    Point(x / math.sqrt(3), y / math.sqrt(3), z / math.sqrt(3))
+    for x, y, z in ((1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1))
+)
+TETRAHEDRON_VERTICES = np.array(TETRAHEDRON_OFFSETS)
+
+def vertex_offsets(center: Point, positions: List[Point]) -> Tuple[Point, ...]:
+    """``positions`` relative to ``center``, sharing TETRAHEDRON_OFFSETS when they are exactly that shape"""
+    cx, cy, cz = center
+    if len(positions) == len(TETRAHEDRON_OFFSETS) and all(
+        p == (cx + o.x, cy + o.y, cz + o.z) for p, o in zip(positions, TETRAHEDRON_OFFSETS)
+    ):
+        return TETRAHEDRON_OFFSETS
+    return tuple(Point(x - cx, y - cy, z - cz) for x, y, z in positions)
+
+class TetrahedronRecord:
+    """Internal form of a ``Tetrahedron``.
+
+    ``vertex_data`` holds the vertex energies, then spins, then mass
+    projections, each in vertex order.
+    """
+    __slots__ = ("id", "center", "offsets", "vertex_data", "energy_state", "oscillation_frequency", "phase",
+                 "particle_type")
+
+    def __init__(self, id: str, center: Point, offsets: Tuple[Point, ...], vertex_data: array,
+                 energy_state: float, oscillation_frequency: float, phase: float, particle_type: str):
+        self.id = id
+        self.center = center
+        self.offsets = offsets
+        self.vertex_data = vertex_data
+        self.energy_state = energy_state
+        self.oscillation_frequency = oscillation_frequency
+        self.phase = phase
+        self.particle_type = particle_type
+
+    @classmethod
+    def from_document(cls, document: dict) -> "TetrahedronRecord":
+        """Read a ``Tetrahedron.model_dump()`` dict; missing optional fields take the model defaults"""
+        c = document["center"]
+        center = Point(c["x"], c["y"], c["z"])
+        vertices = document["vertices"]
+        positions = [Point(v["position"]["x"], v["position"]["y"], v["position"]["z"]) for v in vertices]
+        vertex_data = array("d", [v.get("energy", 0.0) for v in vertices])
+        vertex_data.extend([v.get("spin", 0.0) for v in vertices])
+        vertex_data.extend([v.get("mass_projection", 1.0) for v in vertices])
+        return cls(document["id"], center, vertex_offsets(center, positions), vertex_data,
+                   document.get("energy_state", 1.0), document.get("oscillation_frequency", 1.0),
+                   document.get("phase", 0.0), document.get("particle_type", "matter"))
+
+    def vertex_positions(self) -> List[Tuple[float, float, float]]:
+        cx, cy, cz = self.center
+        return [(cx + x, cy + y, cz + z) for x, y, z in self.offsets]
+
+    def document(self) -> dict:
+        """This tetrahedron in the shape of ``Tetrahedron.model_dump()``"""
+        data = self.vertex_data
+        n = len(self.offsets)
+        cx, cy, cz = self.center
+        return {
+            "id": self.id,
+            "vertices": [
+                {"position": {"x": x, "y": y, "z": z}, "energy": data[v], "spin": data[n + v],
+                 "mass_projection": data[2 * n + v]}
+                for v, (x, y, z) in enumerate(self.vertex_positions())
+            ],
+            "center": {"x": cx, "y": cy, "z": cz},
+            "energy_state": self.energy_state,
+            "oscillation_frequency": self.oscillation_frequency,
+            "phase": self.phase,
+            "particle_type": self.particle_type,
+        }
+
+class PairRecord:
+    """Internal form of a ``TetrahedronPair``; ``materialize`` builds the API model"""
+    __slots__ = ("id", "matter_tetrahedron", "antimatter_tetrahedron", "stability_factor", "pairing_strength",
+                 "entanglement_connection", "created_at")
+
+    def __init__(self, id: str, matter_tetrahedron: TetrahedronRecord, antimatter_tetrahedron: TetrahedronRecord,
+                 stability_factor: float = 1.0, pairing_strength: float = 1.0,
+                 entanglement_connection: bool = True, created_at: Optional[datetime] = None):
+        self.id = id
+        self.matter_tetrahedron = matter_tetrahedron
+        self.antimatter_tetrahedron = antimatter_tetrahedron
+        self.stability_factor = stability_factor
+        self.pairing_strength = pairing_strength
+        self.entanglement_connection = entanglement_connection
+        self.created_at = created_at or datetime.now()
+
+    @classmethod
+    def from_document(cls, document: dict) -> "PairRecord":
+        """Read a stored ``TetrahedronPair.model_dump()`` dict without Pydantic validation"""
+        return cls(
+            document["id"],
+            TetrahedronRecord.from_document(document["matter_tetrahedron"]),
+            TetrahedronRecord.from_document(document["antimatter_tetrahedron"]),
+            document.get("stability_factor", 1.0),
+            document.get("pairing_strength", 1.0),
+            document.get("entanglement_connection", True),
+            document.get("created_at"),
+        )
+
+    @classmethod
+    def from_model(cls, pair: TetrahedronPair) -> "PairRecord":
+        return cls.from_document(pair.model_dump())
+
+    def document(self) -> dict:
+        """This pair in the shape of ``TetrahedronPair.model_dump()``"""
+        return {
+            "id": self.id,
+            "matter_tetrahedron": self.matter_tetrahedron.document(),
+            "antimatter_tetrahedron": self.antimatter_tetrahedron.document(),
+            "stability_factor": self.stability_factor,
+            "pairing_strength": self.pairing_strength,
+            "entanglement_connection": self.entanglement_connection,
+            "created_at": self.created_at,
+        }
+
+    def materialize(self) -> TetrahedronPair:
+        return TetrahedronPair.model_validate(self.document())
+
+def uuid4_array(n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """``n`` random UUID4 strings as an (n,) ``S36`` array, generated in one batch from ``rng`` or the OS"""
+    data = rng.bytes(16 * n) if rng is not None else os.urandom(16 * n)
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    digits = np.frombuffer(raw.tobytes().hex().encode(), dtype=np.uint8).reshape(n, 32)
+    text = np.full((n, 36), ord("-"), dtype=np.uint8)
+    for start, stop, at in ((0, 8, 0), (8, 12, 9), (12, 16, 14), (16, 20, 19), (20, 32, 24)):
+        text[:, at:at + stop - start] = digits[:, start:stop]
+    return text.view("S36").reshape(n)
+
+def uuid4_strings(n: int, rng: Optional[np.random.Generator] = None) -> List[str]:
+    """``n`` random UUID4 strings, generated in one batch from ``rng`` or the OS"""
+    return uuid4_array(n, rng).astype(str).tolist()
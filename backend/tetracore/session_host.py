@@ -0,0 +1,224 @@
+"""Worker-process side of the multi-simulation sessions.
+
+Imported by every session worker, so it must stay free of import-time side
+effects: no app, database client or global engine.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pydantic_core import to_json
+
+from tetracore.config import MAX_TICK_STEPS, TICK_RATE
+from tetracore.engine import TetracoreEngine, create_engine
+from tetracore.frames import FRAME_ENCODERS, encode_full_frame, encode_pair_added, encode_pair_removed, \
+    encode_snapshot_frame
+from tetracore.models import BulkCreateRequest, BulkDeleteRequest, PairQuery, StepRequest, Vector3D
+from tetracore.pairs import bulk_create_arrays, bulk_delete_ids, pairs_in_box, pairs_nearby
+
+# Multi-simulation sessions
+#
+# Every session owns its own engine.  Engines live in a pool of worker
+# processes so stepping spreads across cores; the API process only routes
+# commands to the owning worker and relays the frames it encodes.
+class BatchRun:
+    """A batch step in progress on one session, advanced between ticks and commands"""
+
+    __slots__ = ("request_id", "steps", "dt", "sample_every", "done", "samples")
+
+    def __init__(self, request_id: int, request: StepRequest):
+        self.request_id = request_id
+        self.steps = request.steps
+        self.dt = request.dt
+        self.sample_every = request.sample_every
+        self.done = 0
+        self.samples: List[dict] = []
+
+class SessionHost:
+    """Worker-process side: the engines of the sessions placed on this worker.
+
+    Commands are ``op_<name>`` methods and run between ticks, so they never
+    interleave with a step.  Batch steps are advanced in slices that use up
+    the time until the next tick, round-robin across sessions, so a long
+    batch neither stalls the other sessions' ticks nor their commands; the
+    reply goes out when the batch completes.
+    """
+
+    def __init__(self, tick_rate: float = TICK_RATE, max_steps: int = MAX_TICK_STEPS):
+        self.engines: Dict[str, TetracoreEngine] = {}
+        self.protocols: Dict[str, List[str]] = {}
+        self.batches: Dict[str, BatchRun] = {}
+        self.dt = 1.0 / tick_rate
+        self.max_steps = max_steps
+
+    def serve(self, conn):
+        next_tick = time.monotonic() + self.dt
+        while True:
+            now = time.monotonic()
+            if now < next_tick:
+                if conn.poll(0 if self.batches else next_tick - now):
+                    message = conn.recv()
+                    if message is None:
+                        return
+                    self._command(conn, *message)
+                elif self.batches:
+                    self._advance_batch(conn, next_tick)
+                continue
+
+            steps = 1 + int((now - next_tick) // self.dt)
+            if steps > self.max_steps:
+                # Drop the backlog after a stall instead of bursting
+                steps, next_tick = self.max_steps, now + self.dt
+            else:
+                next_tick += steps * self.dt
+            for session_id, engine in self.engines.items():
+                if not engine.simulation_state.running or session_id in self.batches:
+                    continue
+                for _ in range(steps):
+                    engine.step(self.dt)
+                self._publish(conn, session_id)
+
+    def _command(self, conn, request_id: int, op: str, session_id: str, kwargs: dict):
+        if op == "delete" and session_id in self.batches:
+            batch = self.batches.pop(session_id)
+            conn.send(("result", batch.request_id, ("error", "RuntimeError: Session deleted")))
+        try:
+            if op == "run":
+                # Answered by ``_advance_batch`` once the batch completes, unless refused here
+                if self._start_batch(request_id, session_id, StepRequest.model_validate(kwargs["request"])):
+                    return
+                reply = ("ok", None)
+            else:
+                reply = ("ok", getattr(self, f"op_{op}")(session_id, **kwargs))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        conn.send(("result", request_id, reply))
+
+    def _start_batch(self, request_id: int, session_id: str, request: StepRequest) -> bool:
+        """Queue a batch step on a stopped session; False if it is running"""
+        self._check_idle(session_id)
+        if self._engine(session_id).simulation_state.running:
+            return False
+        self.batches[session_id] = BatchRun(request_id, request)
+        return True
+
+    def _advance_batch(self, conn, deadline: float):
+        """Step the oldest batch until ``deadline`` (at least once), then requeue or answer it"""
+        session_id, batch = next(iter(self.batches.items()))
+        del self.batches[session_id]
+        engine = self.engines[session_id]
+        while True:
+            engine.step(batch.dt)
+            batch.done += 1
+            if batch.done == batch.steps or (batch.sample_every and batch.done % batch.sample_every == 0):
+                batch.samples.append(engine.sample(batch.done))
+            if batch.done == batch.steps:
+                conn.send(("result", batch.request_id, ("ok", batch.samples)))
+                # Batch steps happen outside the tick, so push the result explicitly
+                self._publish(conn, session_id)
+                return
+            if time.monotonic() >= deadline:
+                self.batches[session_id] = batch
+                return
+
+    def _check_idle(self, session_id: str):
+        if session_id in self.batches:
+            raise RuntimeError("A batch step is in progress")
+
+    def _publish(self, conn, session_id: str):
+        engine = self.engines[session_id]
+        engine.calculate_system_metrics()
+        for protocol in self.protocols.get(session_id, []):
+            conn.send(("frame", session_id, protocol, FRAME_ENCODERS[protocol](engine)))
+
+    def _engine(self, session_id: str) -> TetracoreEngine:
+        engine = self.engines.get(session_id)
+        if engine is None:
+            raise KeyError(f"Unknown session {session_id}")
+        return engine
+
+    def _resync(self, session_id: str) -> Optional[str]:
+        """Snapshot for delta clients after a large change, only if there are any"""
+        if "delta" not in self.protocols.get(session_id, []):
+            return None
+        return self.op_snapshot(session_id)
+
+    def op_create(self, session_id: str, seed: Optional[int] = None):
+        self.engines[session_id] = create_engine(seed=seed)
+
+    def op_delete(self, session_id: str):
+        self.engines.pop(session_id, None)
+        self.protocols.pop(session_id, None)
+
+    def op_subscribe(self, session_id: str, protocols: List[str]):
+        self.protocols[session_id] = protocols
+
+    def op_info(self, session_id: str) -> dict:
+        engine = self._engine(session_id)
+        state = engine.simulation_state
+        return {"pairs": engine.pair_count, "running": state.running, "time_step": state.time_step}
+
+    def op_state(self, session_id: str) -> str:
+        engine = self._engine(session_id)
+        engine.calculate_system_metrics()
+        return encode_full_frame(engine)
+
+    def op_snapshot(self, session_id: str) -> str:
+        engine = self._engine(session_id)
+        engine.calculate_system_metrics()
+        return encode_snapshot_frame(engine)
+
+    def op_set_running(self, session_id: str, running: bool):
+        if running:
+            self._check_idle(session_id)
+        self._engine(session_id).simulation_state.running = running
+
+    def op_reset(self, session_id: str, seed: Optional[int] = None) -> Optional[str]:
+        self._check_idle(session_id)
+        self._engine(session_id).reset(seed)
+        return self._resync(session_id)
+
+    def op_create_pair(self, session_id: str, center: Tuple[float, float, float], separation: float) -> Tuple[str, str]:
+        engine = self._engine(session_id)
+        x, y, z = center
+        record = engine.build_pair(Vector3D(x=x, y=y, z=z), separation)
+        pair = record.materialize()
+        engine.add_pair(record)
+        return pair.id, encode_pair_added(engine, pair)
+
+    def op_create_pairs(self, session_id: str, request: dict) -> Tuple[List[str], Optional[str]]:
+        engine = self._engine(session_id)
+        pair_ids = engine.create_pairs(*bulk_create_arrays(BulkCreateRequest.model_validate(request)))
+        return pair_ids, self._resync(session_id)
+
+    def op_delete_pair(self, session_id: str, pair_id: str) -> Optional[str]:
+        engine = self._engine(session_id)
+        key = engine.pair_key(pair_id)
+        if engine.remove_pair(pair_id):
+            return encode_pair_removed(key, pair_id)
+        return None
+
+    def op_delete_pairs(self, session_id: str, request: dict) -> Tuple[int, Optional[str]]:
+        engine = self._engine(session_id)
+        pair_ids = bulk_delete_ids(engine, BulkDeleteRequest.model_validate(request))
+        deleted = sum(engine.remove_pair(pair_id) for pair_id in pair_ids)
+        return deleted, self._resync(session_id) if deleted else None
+
+    def op_query_pairs(self, session_id: str, query: dict) -> str:
+        return to_json(self._engine(session_id).query_pairs(PairQuery.model_validate(query))).decode()
+
+    def op_pairs_nearby(self, session_id: str, **kwargs) -> dict:
+        return pairs_nearby(self._engine(session_id), **kwargs)
+
+    def op_pairs_in_box(self, session_id: str, **kwargs) -> dict:
+        return pairs_in_box(self._engine(session_id), **kwargs)
+
+    def op_get_pair(self, session_id: str, pair_id: str) -> Optional[str]:
+        pair = self._engine(session_id).get_pair(pair_id)
+        return None if pair is None else pair.model_dump_json()
+
+def run_session_worker(conn, tick_rate: float, max_steps: int):
+    """Entry point of a session worker process"""
+    try:
+        SessionHost(tick_rate, max_steps).serve(conn)
+    except (KeyboardInterrupt, EOFError):
+        pass
@@ -0,0 +1,207 @@
+"""API-process side of the multi-simulation sessions: worker handles and session routing"""
+import asyncio
+import multiprocessing
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from tetracore.config import MAX_TICK_STEPS, SESSION_CALL_TIMEOUT, SESSION_WORKERS, TICK_RATE
+from tetracore.connections import ConnectionManager
+from tetracore.session_host import run_session_worker
+
+class SessionError(Exception):
+    """A command failed inside a session worker"""
+
+class SessionUnavailable(SessionError):
+    """The session's worker exited or did not answer in time"""
+
+class SessionWorker:
+    """API-process handle for one worker process.
+
+    Commands are sent over a pipe and answered asynchronously; a reader
+    thread resolves the waiting futures and hands frames to ``on_frame`` on
+    the event loop.  If the process dies, waiting calls fail and ``on_exit``
+    is called with the worker.
+    """
+
+    def __init__(self, index: int, on_frame, on_exit=None, tick_rate: float = TICK_RATE,
+                 max_steps: int = MAX_TICK_STEPS):
+        self.index = index
+        self.on_frame = on_frame
+        self.on_exit = on_exit
+        self.alive = False
+        self.sessions: set = set()
+        self._conn, child = multiprocessing.Pipe()
+        # spawn: forking a process that already runs the event loop and Motor's threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=run_session_worker, args=(child, tick_rate, max_steps), daemon=True)
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._next_request = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.process.start()
+        self.alive = True
+        threading.Thread(target=self._read, name=f"session-worker-{self.index}", daemon=True).start()
+
+    async def call(self, op: str, session_id: str, timeout: Optional[float] = SESSION_CALL_TIMEOUT, **kwargs):
+        if not self.alive:
+            raise SessionUnavailable("Session worker exited")
+        request_id = self._next_request
+        self._next_request += 1
+        future = self._loop.create_future()
+        self._futures[request_id] = future
+        try:
+            self._conn.send((request_id, op, session_id, kwargs))
+            status, value = await asyncio.wait_for(future, timeout)
+        except OSError:
+            raise SessionUnavailable("Session worker exited")
+        except asyncio.TimeoutError:
+            raise SessionUnavailable(f"Session worker did not answer within {timeout:g}s")
+        finally:
+            self._futures.pop(request_id, None)
+        if status == "unavailable":
+            raise SessionUnavailable(value)
+        if status == "error":
+            raise SessionError(value)
+        return value
+
+    def _read(self):
+        try:
+            while True:
+                message = self._conn.recv()
+                if message[0] == "result":
+                    self._loop.call_soon_threadsafe(self._resolve, message[1], message[2])
+                else:
+                    _, session_id, protocol, frame = message
+                    self._loop.call_soon_threadsafe(self.on_frame, session_id, protocol, frame)
+        except (EOFError, OSError):
+            self._loop.call_soon_threadsafe(self._exited)
+
+    def _resolve(self, request_id: int, reply):
+        future = self._futures.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+    def _exited(self):
+        self.alive = False
+        for future in self._futures.values():
+            if not future.done():
+                future.set_result(("unavailable", "Session worker exited"))
+        self._futures.clear()
+        if self.on_exit is not None:
+            self.on_exit(self)
+
+    def stop(self):
+        self.alive = False
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+class Session:
+    def __init__(self, session_id: str, worker: SessionWorker):
+        self.id = session_id
+        self.worker = worker
+        self.manager = ConnectionManager()
+        self.created_at = datetime.now()
+
+    async def call(self, op: str, **kwargs):
+        """Run ``op`` on the worker: 409 if it fails there, 503 if the worker is gone or stuck"""
+        try:
+            return await self.worker.call(op, self.id, **kwargs)
+        except SessionUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except SessionError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    async def subscribe(self):
+        """Tell the worker which frame formats this session's clients need"""
+        await self.call("subscribe", protocols=self.manager.protocols_in_use())
+
+    def resync(self, snapshot: Optional[str]):
+        if snapshot is not None:
+            self.manager.broadcast(snapshot, "delta")
+
+class SessionRegistry:
+    """Places sessions on the least-loaded worker and relays their frames.
+
+    A worker that dies takes its sessions with it: they are dropped, their
+    clients evicted, and a fresh worker takes its place.
+    """
+
+    def __init__(self, workers: int = SESSION_WORKERS):
+        self.size = max(1, workers)
+        self.workers: List[SessionWorker] = []
+        self.sessions: Dict[str, Session] = {}
+
+    def _start_workers(self):
+        # Started on first use so servers that never create a session spawn nothing
+        if not self.workers:
+            self.workers = [SessionWorker(i, self._relay, self._worker_exited) for i in range(self.size)]
+            for worker in self.workers:
+                worker.start()
+
+    def _worker_exited(self, worker: SessionWorker):
+        if worker not in self.workers:
+            # Stopped by ``shutdown``
+            return
+        print(f"Session worker {worker.index} exited; dropping {len(worker.sessions)} sessions")
+        for session_id in worker.sessions:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                for websocket in session.manager.active_connections:
+                    session.manager.evict(websocket, "worker_exited")
+        replacement = SessionWorker(worker.index, self._relay, self._worker_exited)
+        self.workers[self.workers.index(worker)] = replacement
+        replacement.start()
+
+    def _relay(self, session_id: str, protocol: str, frame):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.manager.broadcast(frame, protocol, conflate=True)
+
+    async def create(self, session_id: Optional[str] = None, seed: Optional[int] = None) -> Session:
+        self._start_workers()
+        session_id = session_id or str(uuid.uuid4())
+        if session_id in self.sessions:
+            raise HTTPException(status_code=409, detail="Session already exists")
+        worker = min(self.workers, key=lambda w: len(w.sessions))
+        session = Session(session_id, worker)
+        self.sessions[session_id] = session
+        worker.sessions.add(session_id)
+        try:
+            await session.call("create", seed=seed)
+        except HTTPException:
+            self.sessions.pop(session_id, None)
+            worker.sessions.discard(session_id)
+            raise
+        return session
+
+    def get(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session
+
+    async def delete(self, session_id: str):
+        session = self.get(session_id)
+        del self.sessions[session_id]
+        session.worker.sessions.discard(session_id)
+        for websocket in session.manager.active_connections:
+            session.manager.evict(websocket, "session_deleted")
+        if session.worker.alive:
+            await session.call("delete")
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.sessions.clear()
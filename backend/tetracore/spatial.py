@@ -0,0 +1,235 @@
+"""Uniform grid index over pair midpoints"""
+import itertools
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from tetracore.config import SPATIAL_CELL_SIZE
+
+# Spatial index
+class SpatialGrid:
+    """Uniform grid over pair midpoints for neighbourhood queries.
+
+    Each occupied cell holds a list of the ids of the pairs whose midpoint
+    falls in it, keyed by the cell coordinates packed into one integer.
+    Midpoints live in a dense array with swap-remove, like the vectorized
+    engine's columns.  Inserting an id that is already indexed moves it.
+    """
+
+    CELL_BITS = 21
+    CELL_BIAS = 1 << (CELL_BITS - 1)
+    # Candidate pairs distance-tested at a time by _neighbor_chunks
+    NEIGHBOR_CHUNK = 1 << 20
+
+    def __init__(self, cell_size: float = SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: Dict[int, List[str]] = {}
+        self.rows: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.keys: List[int] = []  # packed cell of each row
+        self.xyz = np.zeros((1024, 3))
+        # Bumped on every change so derived data (neighbour lists) can be cached
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        # Far-away points are clamped into the outermost cells; queries still
+        # check exact positions, so that only costs some extra candidates
+        cells = np.floor(np.asarray(points, dtype=float) / self.cell_size)
+        return np.clip(cells + self.CELL_BIAS, 0, (1 << self.CELL_BITS) - 1).astype(np.int64)
+
+    def _pack(self, cells: np.ndarray) -> np.ndarray:
+        return (cells[..., 0] << (2 * self.CELL_BITS)) | (cells[..., 1] << self.CELL_BITS) | cells[..., 2]
+
+    def _reserve(self, extra: int):
+        needed = len(self.ids) + extra
+        if needed > len(self.xyz):
+            xyz = np.zeros((max(needed, 2 * len(self.xyz)), 3))
+            xyz[:len(self.ids)] = self.xyz[:len(self.ids)]
+            self.xyz = xyz
+
+    def _key(self, point: Tuple[float, float, float]) -> int:
+        """Scalar ``_pack(_cells(point))`` without the array round trip"""
+        top = (1 << self.CELL_BITS) - 1
+        x, y, z = (min(max(math.floor(c / self.cell_size) + self.CELL_BIAS, 0), top) for c in point)
+        return (x << (2 * self.CELL_BITS)) | (y << self.CELL_BITS) | z
+
+    def insert(self, pair_id: str, point: Tuple[float, float, float]):
+        self.remove(pair_id)
+        self._reserve(1)
+        key = self._key(point)
+        self.xyz[len(self.ids)] = point
+        self.rows[pair_id] = len(self.ids)
+        self.ids.append(pair_id)
+        self.keys.append(key)
+        self.cells.setdefault(key, []).append(pair_id)
+        self.version += 1
+
+    def insert_many(self, pair_ids: List[str], points: np.ndarray):
+        """Index ``pair_ids`` at ``points``, one row per id"""
+        if not self.rows.keys().isdisjoint(pair_ids):
+            for pair_id in pair_ids:
+                self.remove(pair_id)
+        self._reserve(len(pair_ids))
+        start = len(self.ids)
+        self.xyz[start:start + len(pair_ids)] = points
+        self.rows.update(zip(pair_ids, range(start, start + len(pair_ids))))
+        self.ids.extend(pair_ids)
+        keys = self._pack(self._cells(points)).tolist()
+        self.keys.extend(keys)
+        cells = self.cells
+        for pair_id, key in zip(pair_ids, keys):
+            members = cells.get(key)
+            if members is None:
+                cells[key] = [pair_id]
+            else:
+                members.append(pair_id)
+        self.version += 1
+
+    def remove(self, pair_id: str):
+        i = self.rows.pop(pair_id, None)
+        if i is None:
+            return
+        key = self.keys[i]
+        members = self.cells[key]
+        members.remove(pair_id)
+        if not members:
+            del self.cells[key]
+        last = len(self.ids) - 1
+        if i != last:
+            self.xyz[i] = self.xyz[last]
+            self.ids[i] = self.ids[last]
+            self.keys[i] = self.keys[last]
+            self.rows[self.ids[i]] = i
+        self.ids.pop()
+        self.keys.pop()
+        self.version += 1
+
+    def clear(self):
+        self.cells.clear()
+        self.rows.clear()
+        self.ids.clear()
+        self.keys.clear()
+        self.version += 1
+
+    def _candidates(self, lo, hi) -> np.ndarray:
+        """Rows of the points in the cells overlapping the box ``lo``..``hi``"""
+        c0, c1 = self._cells(lo).tolist(), self._cells(hi).tolist()
+        volume = (c1[0] - c0[0] + 1) * (c1[1] - c0[1] + 1) * (c1[2] - c0[2] + 1)
+        if volume > len(self.cells):
+            # Query larger than the occupied space: test every point instead
+            return np.arange(len(self.ids))
+        rows = self.rows
+        candidates = []
+        for x in range(c0[0], c1[0] + 1):
+            for y in range(c0[1], c1[1] + 1):
+                base = (x << (2 * self.CELL_BITS)) | (y << self.CELL_BITS)
+                for z in range(c0[2], c1[2] + 1):
+                    candidates.extend(rows[pair_id] for pair_id in self.cells.get(base | z, ()))
+        return np.array(candidates, dtype=np.int64)
+
+    def query_box(self, lo: Tuple[float, float, float], hi: Tuple[float, float, float]) -> List[str]:
+        """Ids of the pairs with ``lo <= midpoint <= hi`` on every axis"""
+        rows = self._candidates(lo, hi)
+        xyz = self.xyz[rows]
+        rows = rows[((xyz >= lo) & (xyz <= hi)).all(axis=1)]
+        return [self.ids[i] for i in rows.tolist()]
+
+    def query_radius(self, center: Tuple[float, float, float], radius: float) -> List[Tuple[str, float]]:
+        """``(id, distance)`` of the pairs within ``radius`` of ``center``, nearest first"""
+        rows = self._candidates([c - radius for c in center], [c + radius for c in center])
+        distance = np.linalg.norm(self.xyz[rows] - center, axis=1)
+        order = np.argsort(distance, kind="stable")
+        order = order[distance[order] <= radius]
+        return [(self.ids[i], d) for i, d in zip(rows[order].tolist(), distance[order].tolist())]
+
+    def neighbor_pairs(self, radius: float) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """All unordered pairs of indexed points closer than ``radius``.
+
+        Returns ``(ids, a, b, distance)`` where ``a``/``b`` index into ``ids``.
+        """
+        parts = list(self._neighbor_chunks(radius))
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return list(self.ids), empty, empty, np.zeros(0)
+        a, b, distance = (np.concatenate(column) for column in zip(*parts))
+        return list(self.ids), a, b, distance
+
+    def crowding(self, radius: float) -> Tuple[List[str], np.ndarray]:
+        """``(ids, c)`` where ``c[i]`` sums ``1 - d / radius`` over the neighbours of ``ids[i]``.
+
+        Same pairs as ``neighbor_pairs``, but summed chunk by chunk, so a
+        dense cluster never holds all of its pairs in memory at once.
+        """
+        n = len(self.ids)
+        total = np.zeros(n)
+        for a, b, distance in self._neighbor_chunks(radius):
+            weight = 1.0 - distance / radius
+            total += np.bincount(a, weight, n) + np.bincount(b, weight, n)
+        return list(self.ids), total
+
+    def _neighbor_chunks(self, radius: float):
+        """Yield ``(a, b, distance)`` batches of the pairs of rows closer than ``radius``.
+
+        Points are bucketed into cells of edge ``radius`` (not the index's
+        cell size), so each candidate lies within about two radii, and each
+        occupied cell is matched against the occupied cells in the half of its
+        neighbourhood ahead of it.  Candidates are expanded and tested at most
+        about ``NEIGHBOR_CHUNK`` at a time.
+        """
+        n = len(self.ids)
+        if n < 2 or radius <= 0:
+            return
+        points = self.xyz[:n]
+        lo = points.min(axis=0)
+        # At most 2**20 cells per axis so the packed key below fits an int64
+        cell = max(radius, float((points.max(axis=0) - lo).max()) / (1 << 20))
+        # Dense packing of this point set's cells, padded so neighbour offsets never wrap
+        cells = np.floor((points - lo) / cell).astype(np.int64) + 1
+        span = cells.max(axis=0) + 2
+        key = (cells[:, 0] * span[1] + cells[:, 1]) * span[2] + cells[:, 2]
+        order = np.argsort(key, kind="stable")
+        cell_keys, starts, counts = np.unique(key[order], return_index=True, return_counts=True)
+
+        for dx, dy, dz in itertools.product((-1, 0, 1), repeat=3):
+            if (dx, dy, dz) < (0, 0, 0):
+                continue
+            target = cell_keys + (dx * span[1] + dy) * span[2] + dz
+            pos = np.minimum(np.searchsorted(cell_keys, target), len(cell_keys) - 1)
+            src = np.flatnonzero(cell_keys[pos] == target)
+            if not len(src):
+                continue
+            dst = pos[src]
+            for ia, ib in self._cell_candidates(starts[src], counts[src], starts[dst], counts[dst]):
+                if (dx, dy, dz) == (0, 0, 0):
+                    keep = ia < ib
+                    ia, ib = ia[keep], ib[keep]
+                a, b = order[ia], order[ib]
+                distance = np.linalg.norm(points[a] - points[b], axis=1)
+                close = distance < radius
+                if close.any():
+                    yield a[close], b[close], distance[close]
+
+    def _cell_candidates(self, src_start: np.ndarray, src_count: np.ndarray,
+                         dst_start: np.ndarray, dst_count: np.ndarray):
+        """Yield ``(ia, ib)``: every member of each source cell against every member of its target.
+
+        Rows are positions in the cell-sorted order.  Cell pairs are grouped
+        into runs of about ``NEIGHBOR_CHUNK`` candidates, and the source
+        members of a run are sliced so that one crowded cell is split too.
+        """
+        size = src_count * dst_count
+        edges = np.flatnonzero(np.diff(np.cumsum(size) // self.NEIGHBOR_CHUNK)) + 1
+        for run in np.split(np.arange(len(size)), edges):
+            s0, c0, s1, c1 = src_start[run], src_count[run], dst_start[run], dst_count[run]
+            per = max(1, self.NEIGHBOR_CHUNK // int(c1.max()))
+            for offset in range(0, int(c0.max()), per):
+                take = np.clip(c0 - offset, 0, per)
+                size = take * c1
+                pair_cell = np.repeat(np.arange(len(run)), size)
+                local = np.arange(int(size.sum())) - np.repeat(np.cumsum(size) - size, size)
+                width = c1[pair_cell]
+                yield s0[pair_cell] + offset + local // width, s1[pair_cell] + local % width
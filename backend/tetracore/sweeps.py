@@ -0,0 +1,198 @@
+"""Parameter sweeps: seeded headless runs of many configurations on a process pool"""
+import asyncio
+import concurrent.futures
+import itertools
+import math
+import multiprocessing
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tetracore.checkpoint import write_checkpoint
+from tetracore.config import MAX_SWEEP_CONFIGS, SWEEP_HISTORY, SWEEP_WORKERS
+from tetracore.engine import create_engine
+from tetracore.models import BulkCreateRequest, PairGenerator, SWEEP_PARAMETERS, SweepSpec
+from tetracore.pairs import bulk_create_arrays
+
+# Parameter sweeps
+#
+# Each configuration is an independent seeded headless run, executed in a
+# process pool.  Every configuration shares the sweep's seed, so runs differ
+# only in the swept parameters.
+def sweep_configs(spec: SweepSpec) -> List[dict]:
+    """The grid's cartesian product followed by the random samples, numbered by ``config_id``"""
+    configs = []
+    if spec.grid:
+        names = list(spec.grid)
+        configs.extend(dict(zip(names, values)) for values in itertools.product(*spec.grid.values()))
+    if spec.samples:
+        rng = np.random.default_rng(spec.seed)
+        draws = {name: rng.uniform(lo, hi, spec.samples).tolist() for name, (lo, hi) in spec.ranges.items()}
+        configs.extend({name: values[i] for name, values in draws.items()} for i in range(spec.samples))
+    return [{"config_id": i, **config} for i, config in enumerate(configs)]
+
+def check_sweep(spec: SweepSpec):
+    """ValueError if ``spec`` describes no configurations, too many, or an inverted range"""
+    if spec.samples and not spec.ranges:
+        raise ValueError("samples needs ranges to draw from")
+    if any(lo > hi for lo, hi in spec.ranges.values()):
+        raise ValueError("range low must not exceed high")
+    total = math.prod(len(values) for values in spec.grid.values()) if spec.grid else 0
+    total += spec.samples
+    if not total:
+        raise ValueError("No grid or samples given")
+    if total > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"At most {MAX_SWEEP_CONFIGS} configurations per sweep")
+
+def run_sweep_config(spec: dict, config: dict) -> dict:
+    """One sweep configuration; runs in a pool worker, so takes and returns plain data"""
+    spec = SweepSpec.model_validate(spec)
+    started = time.perf_counter()
+    engine = create_engine(spec.engine, seed=spec.seed)
+    generator = PairGenerator(kind="lattice", count=spec.pairs, spacing=spec.spacing,
+                              separation=config.get("separation", 2.0))
+    engine.create_pairs(*bulk_create_arrays(BulkCreateRequest(generator=generator)))
+    engine.apply_parameters(config.get("oscillation_frequency"), config.get("pairing_strength"))
+    samples = engine.run(spec.steps, spec.dt, spec.sample_every)
+    return {
+        **config,
+        **{name: [sample[name] for sample in samples] for name in ("step", "time_step", "total_stability", "system_energy")},
+        "seconds": time.perf_counter() - started,
+    }
+
+class NpzSweepSink:
+    """Columnar ``.npz`` sweep results: one row per (configuration, sample).
+
+    The file is rewritten atomically every ``flush_every`` results, so a
+    long sweep can be inspected (``np.load``) while it runs.
+    """
+
+    COLUMNS = ("config_id", *SWEEP_PARAMETERS, "step", "time_step", "total_stability", "system_energy")
+
+    def __init__(self, path: str, flush_every: int = 100):
+        self.path = path
+        self.flush_every = flush_every
+        self.columns: Dict[str, list] = {name: [] for name in self.COLUMNS}
+        self._unflushed = 0
+
+    async def write(self, result: dict):
+        rows = len(result["step"])
+        for name in self.COLUMNS:
+            value = result.get(name, math.nan)
+            self.columns[name].extend(value if isinstance(value, list) else [value] * rows)
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            await self.flush()
+
+    async def flush(self):
+        self._unflushed = 0
+        arrays = {name: np.array(values) for name, values in self.columns.items()}
+        await asyncio.to_thread(write_checkpoint, self.path, arrays)
+
+    async def close(self):
+        await self.flush()
+
+class MongoSweepSink:
+    """One document per configuration, holding its metric time series"""
+
+    def __init__(self, collection, sweep_id: str):
+        self.collection = collection
+        self.sweep_id = sweep_id
+
+    async def write(self, result: dict):
+        try:
+            await self.collection.insert_one({"sweep_id": self.sweep_id, **result})
+        except Exception as e:
+            print(f"Database error: {e}")
+
+    async def close(self):
+        pass
+
+class SweepRun:
+    """One sweep executing on a process pool, with progress for the API and CLI"""
+
+    def __init__(self, spec: SweepSpec, sweep_id: Optional[str] = None):
+        self.id = sweep_id or str(uuid.uuid4())
+        self.spec = spec
+        self.configs = sweep_configs(spec)
+        self.status = "pending"
+        self.done = 0
+        self.failed = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "running")
+
+    def cancel(self):
+        """Stop the sweep; configurations already running in a worker still finish there"""
+        if self.task is not None:
+            self.task.cancel()
+        # A task cancelled before it started never reaches ``run``
+        if self.status == "pending":
+            self.status, self.finished = "cancelled", time.monotonic()
+
+    def progress(self) -> dict:
+        end = self.finished or time.monotonic()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            "sweep_id": self.id,
+            "status": self.status,
+            "total": len(self.configs),
+            "done": self.done,
+            "failed": self.failed,
+            "elapsed": elapsed,
+            "configs_per_second": self.done / elapsed if elapsed else 0.0,
+        }
+
+    async def run(self, sinks: list, workers: int = SWEEP_WORKERS, report=None):
+        """Run every configuration and stream each result to ``sinks`` as it completes.
+
+        ``report(progress)`` is called after each result.
+        """
+        loop = asyncio.get_running_loop()
+        spec = self.spec.model_dump()
+        # spawn: forking a process that already runs the event loop and Motor's threads is unsafe
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(1, min(workers, len(self.configs))), mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.status, self.started = "running", time.monotonic()
+        futures = []
+        try:
+            futures = [loop.run_in_executor(pool, run_sweep_config, spec, config) for config in self.configs]
+            for future in asyncio.as_completed(futures):
+                try:
+                    result = await future
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Sweep error: {e}")
+                    continue
+                for sink in sinks:
+                    await sink.write(result)
+                self.done += 1
+                if report is not None:
+                    report(self.progress())
+            self.status = "finished"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            # Don't block the event loop on queued configurations; drop those not started yet
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.finished = time.monotonic()
+            for sink in sinks:
+                await sink.close()
+
+def prune_sweeps(sweeps: Dict[str, SweepRun], keep: int = SWEEP_HISTORY):
+    """Forget all but the ``keep`` most recently ended runs; their stored results are kept"""
+    ended = sorted((sweep for sweep in sweeps.values() if not sweep.active), key=lambda sweep: sweep.finished or 0.0)
+    for sweep in ended[:max(0, len(ended) - keep)]:
+        del sweeps[sweep.id]
@@ -0,0 +1,322 @@
+"""The server-owned simulation clock and the per-tick frame cache"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from tetracore.config import BROADCAST_RATE, MAX_TICK_STEPS, MIN_BROADCAST_RATE, TICK_CPU_BUDGET, TICK_RATE
+from tetracore.connections import ClientChannel, ConnectionManager
+from tetracore.engine import TetracoreEngine
+from tetracore.frames import FRAME_ENCODERS, LOD_PROTOCOL, encode_lod_frame, encode_snapshot_frame
+from tetracore.history import MetricsHistory
+from tetracore.instrumentation import BROADCAST_THROTTLES, TICK_BYTES, TICK_SECONDS, TICK_STEPS
+from tetracore.models import LodView
+from tetracore.persistence import StatePersister
+
+# Encoded frames for the current simulation state
+class SnapshotCache:
+    """Per-version cache of encoded frames shared by every consumer.
+
+    Each format is encoded at most once per state version, whether it is
+    requested by the WebSocket fan-out or by REST pollers.  Anything that
+    mutates the simulation calls ``invalidate`` to start a new version.
+    """
+
+    def __init__(self, engine: TetracoreEngine):
+        self.engine = engine
+        self.version = 0
+        self._frames: Dict[str, object] = {}
+        self._metrics_fresh = False
+
+    def invalidate(self):
+        self.version += 1
+        self._frames.clear()
+        self._metrics_fresh = False
+
+    def refresh_metrics(self):
+        if not self._metrics_fresh:
+            self.engine.calculate_system_metrics()
+            self._metrics_fresh = True
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.engine.simulation_state.id}-{self.version}-{self.engine.simulation_state.time_step:.6f}"'
+
+    def frame(self, fmt: str):
+        """Encoded frame for one of FRAME_ENCODERS or ``"snapshot"``"""
+        frame = self._frames.get(fmt)
+        if frame is None:
+            self.refresh_metrics()
+            encode = encode_snapshot_frame if fmt == "snapshot" else FRAME_ENCODERS[fmt]
+            frame = self._frames[fmt] = encode(self.engine)
+        return frame
+
+    def lod_frame(self, view: LodView) -> str:
+        """Frame for one ``lod`` client; not cached since each client has its own view"""
+        self.refresh_metrics()
+        return encode_lod_frame(self.engine, view)
+
+    def body(self) -> bytes:
+        """Full state as UTF-8 JSON for the REST API"""
+        body = self._frames.get("body")
+        if body is None:
+            body = self._frames["body"] = self.frame("full").encode()
+        return body
+
+# Server-owned simulation clock
+class SimulationTicker:
+    """Single tick task shared by every WebSocket subscriber.
+
+    Wall-clock time is fed into an accumulator which is drained in fixed
+    steps of ``1 / tick_rate`` seconds, so simulated time tracks real time
+    independently of how many clients are connected; after a stall at most
+    ``max_steps`` steps are taken at once and the rest of the backlog is
+    dropped.  Frames go out separately at ``broadcast_rate``.
+
+    Broadcast rates adapt per protocol: every ``ADAPT_INTERVAL`` seconds a
+    protocol is slowed down (halved, down to ``min_broadcast_rate``) if the
+    loop spends more than ``cpu_budget`` of wall time on stepping and
+    publishing, which charges the most expensive protocol, or if its clients
+    had frames conflated because the network could not keep up.  Otherwise
+    it creeps back towards ``broadcast_rate``.
+    """
+
+    ADAPT_INTERVAL = 1.0
+    # Weight of the newest sample in the cost averages
+    SMOOTHING = 0.2
+
+    def __init__(self, engine: "TetracoreEngine", manager: ConnectionManager, cache: SnapshotCache,
+                 persister: Optional[StatePersister] = None, history: Optional[MetricsHistory] = None,
+                 tick_rate: float = TICK_RATE, max_steps: int = MAX_TICK_STEPS,
+                 broadcast_rate: float = BROADCAST_RATE, min_broadcast_rate: float = MIN_BROADCAST_RATE,
+                 cpu_budget: float = TICK_CPU_BUDGET):
+        self.engine = engine
+        self.manager = manager
+        self.cache = cache
+        self.persister = persister
+        self.history = history
+        self.tick_rate = tick_rate
+        self.max_steps = max_steps
+        self.broadcast_rate = min(broadcast_rate, tick_rate)
+        self.min_broadcast_rate = min_broadcast_rate
+        self.cpu_budget = cpu_budget
+        # Moving averages of seconds per step and per publish of each protocol
+        self.step_cost = 0.0
+        self.publish_cost: Dict[str, float] = {}
+        # Current broadcast rate, next due time and last sent state version per protocol
+        self.rates: Dict[str, float] = {}
+        self._next_publish: Dict[str, float] = {}
+        self._published: Dict[str, int] = {}
+        self._dropped_frames: Dict[str, int] = {}
+        self.dropped_seconds = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._view_task: Optional[asyncio.Task] = None
+
+    @property
+    def dt(self) -> float:
+        return 1.0 / self.tick_rate
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._view_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._view_task = None
+
+    def resume(self):
+        """Wake the tick task after the simulation was started or retuned"""
+        self._wakeup.set()
+
+    def view_changed(self, channel: ClientChannel):
+        """A ``lod`` client moved its camera; answer at its protocol's next broadcast slot.
+
+        Camera updates arriving faster than that are conflated into the
+        latest view, so a client streaming them costs at most one encode per
+        broadcast, also while the simulation is stopped.
+        """
+        channel.view_changed = True
+        if self._view_task is None or self._view_task.done():
+            self._view_task = asyncio.create_task(self._publish_views())
+
+    async def _publish_views(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(self._next_publish.get(LOD_PROTOCOL, 0.0) - loop.time())
+        # Clients the tick task served in the meantime have already been cleared
+        moved = [channel for channel in self.manager.channels.values() if channel.view_changed]
+        if not moved:
+            return
+        self._next_publish[LOD_PROTOCOL] = loop.time() + 1.0 / self.rates.get(LOD_PROTOCOL, self.broadcast_rate)
+        for channel in moved:
+            channel.view_changed = False
+            self.manager.send(channel.websocket, self.cache.lod_frame(channel.view), conflate=True)
+
+    def configure(self, tick_rate: Optional[float] = None, broadcast_rate: Optional[float] = None,
+                  min_broadcast_rate: Optional[float] = None, max_steps: Optional[int] = None,
+                  cpu_budget: Optional[float] = None):
+        """Change rate targets at runtime; adapted per-protocol rates restart from the new target"""
+        if tick_rate is not None:
+            self.tick_rate = tick_rate
+        if broadcast_rate is not None:
+            self.broadcast_rate = broadcast_rate
+        if min_broadcast_rate is not None:
+            self.min_broadcast_rate = min_broadcast_rate
+        if max_steps is not None:
+            self.max_steps = max_steps
+        if cpu_budget is not None:
+            self.cpu_budget = cpu_budget
+        self.broadcast_rate = min(self.broadcast_rate, self.tick_rate)
+        self.min_broadcast_rate = min(self.min_broadcast_rate, self.broadcast_rate)
+        self.rates.clear()
+        self._next_publish.clear()
+        self.resume()
+
+    def load(self) -> float:
+        """Estimated fraction of wall time spent stepping and publishing at the current rates"""
+        return self.step_cost * self.tick_rate + sum(
+            cost * self.rates.get(protocol, self.broadcast_rate) for protocol, cost in self.publish_cost.items()
+        )
+
+    def stats(self) -> dict:
+        return {
+            "tick_rate": self.tick_rate,
+            "broadcast_rate": self.broadcast_rate,
+            "min_broadcast_rate": self.min_broadcast_rate,
+            "max_steps": self.max_steps,
+            "cpu_budget": self.cpu_budget,
+            "load": self.load(),
+            "step_ms": self.step_cost * 1e3,
+            "publish_ms": {protocol: cost * 1e3 for protocol, cost in self.publish_cost.items()},
+            "broadcast_rates": {protocol: self.rates.get(protocol, self.broadcast_rate)
+                                for protocol in self.manager.protocols_in_use()},
+            "dropped_seconds": self.dropped_seconds,
+        }
+
+    def _smooth(self, average: float, sample: float) -> float:
+        return sample if not average else average + self.SMOOTHING * (sample - average)
+
+    def tick(self, steps: int = 1):
+        """Advance the engine by ``steps`` fixed steps"""
+        start = time.perf_counter()
+        for _ in range(steps):
+            self.engine.step(self.dt)
+        self.cache.invalidate()
+        if self.persister is not None:
+            self.persister.mark_dirty(steps)
+        updated = time.perf_counter()
+        self.cache.refresh_metrics()
+        if self.history is not None:
+            self.history.record(self.engine)
+        self.step_cost = self._smooth(self.step_cost, (time.perf_counter() - start) / steps)
+        TICK_SECONDS.labels("update").observe(updated - start)
+        TICK_SECONDS.labels("metrics").observe(time.perf_counter() - updated)
+        TICK_STEPS.inc(steps)
+
+    def publish(self, protocols: Optional[List[str]] = None):
+        """Broadcast the current frame to ``protocols`` (default: all in use), encoded once per protocol"""
+        serialize = broadcast = 0.0
+        queued = 0
+        for protocol in protocols if protocols is not None else self.manager.protocols_in_use():
+            start = time.perf_counter()
+            if protocol == LOD_PROTOCOL:
+                frames = {channel: self.cache.lod_frame(channel.view)
+                          for channel in self.manager.channels.values() if channel.protocol == protocol}
+                for channel in frames:
+                    channel.view_changed = False
+                encode = frames.__getitem__
+            else:
+                frame = self.cache.frame(protocol)
+                encode = lambda channel: frame
+            encoded = time.perf_counter()
+            queued += self.manager.broadcast_each(encode, protocol, conflate=True)
+            done = time.perf_counter()
+            serialize += encoded - start
+            broadcast += done - encoded
+            self.publish_cost[protocol] = self._smooth(self.publish_cost.get(protocol, 0.0), done - start)
+            self._published[protocol] = self.cache.version
+        TICK_SECONDS.labels("serialize").observe(serialize)
+        TICK_SECONDS.labels("broadcast").observe(broadcast)
+        TICK_BYTES.observe(queued)
+
+    def _due(self, now: float) -> List[str]:
+        """Protocols whose next broadcast is due and that have a newer state to send"""
+        due = []
+        for protocol in self.manager.protocols_in_use():
+            if now >= self._next_publish.get(protocol, 0.0) and self._published.get(protocol) != self.cache.version:
+                due.append(protocol)
+                self._next_publish[protocol] = now + 1.0 / self.rates.get(protocol, self.broadcast_rate)
+        return due
+
+    def adapt(self):
+        """Slow down protocols over the CPU or network budget, speed the others back up"""
+        protocols = self.manager.protocols_in_use()
+        for protocol in list(self.rates):
+            if protocol not in protocols:
+                del self.rates[protocol]
+        dropped = {protocol: 0 for protocol in protocols}
+        for channel in self.manager.channels.values():
+            dropped[channel.protocol] += channel.dropped_frames
+        congested = {p for p in protocols if dropped[p] > self._dropped_frames.get(p, dropped[p])}
+        self._dropped_frames = dropped
+        if self.load() > self.cpu_budget and protocols:
+            congested.add(max(protocols, key=lambda p: self.publish_cost.get(p, 0.0) * self.rates.get(p, self.broadcast_rate)))
+
+        for protocol in protocols:
+            rate = self.rates.get(protocol, self.broadcast_rate)
+            if protocol in congested:
+                rate = max(self.min_broadcast_rate, rate / 2)
+            else:
+                rate = min(self.broadcast_rate, rate + self.broadcast_rate / 10)
+            self.rates[protocol] = rate
+        BROADCAST_THROTTLES.inc(len(congested))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.engine.simulation_state.running:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            accumulator = 0.0
+            last = next_adapt = loop.time()
+            self._wakeup.clear()
+            while self.engine.simulation_state.running:
+                now = loop.time()
+                backlog = accumulator + now - last
+                # Clamp so a long stall does not turn into a burst of catch-up steps
+                accumulator = min(backlog, self.max_steps * self.dt)
+                self.dropped_seconds += backlog - accumulator
+                last = now
+
+                start = time.perf_counter()
+                steps = int(accumulator / self.dt)
+                if steps:
+                    accumulator -= steps * self.dt
+                    self.tick(steps)
+                due = self._due(now)
+                if due:
+                    self.publish(due)
+                if steps or due:
+                    TICK_SECONDS.labels("total").observe(time.perf_counter() - start)
+                if now >= next_adapt:
+                    self.adapt()
+                    next_adapt = now + self.ADAPT_INTERVAL
+
+                # Sleep until the next step or broadcast, whichever comes first;
+                # ``configure`` wakes us early
+                delay = self.dt - accumulator
+                upcoming = [t for t in self._next_publish.values() if t > now]
+                if upcoming:
+                    delay = min(delay, min(upcoming) - loop.time())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(0.0, delay))
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The backend runs from its own directory (``import server``, ``import tetracore``)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+# Read by tetracore.config at import: no restore from, or checkpoints to, the working tree
+os.environ.setdefault("RESTORE_ON_STARTUP", "false")
+os.environ.setdefault("CHECKPOINT_PATH", "")
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """``server`` with an in-memory database and an empty engine; startup tasks are not run"""
+    from mongomock_motor import AsyncMongoMockClient
+    import server
+
+    db = AsyncMongoMockClient()["tetracore_test"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.persister, "collection", db.tetrahedron_pairs)
+    monkeypatch.setattr(server.persister, "state_collection", db.simulation_state)
+    server.engine.reset()
+    server.snapshot_cache.invalidate()
+    return server
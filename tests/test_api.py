@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi.testclient import TestClient
+
+from tetracore.engine import VectorizedTetracoreEngine
+from tetracore.persistence import restore_state
+
+GENERATOR = {"kind": "random_box", "count": 5, "seed": 1}
+
+
+def request(server, method: str, url: str, hold=None, **kwargs) -> httpx.Response:
+    """Send one request to the app in-process, optionally while holding the lock ``hold``"""
+    async def send():
+        async with hold if hold is not None else contextlib.nullcontext():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+def test_mutations_rejected_during_batch_step(api):
+    assert request(api, "POST", "/api/pairs/bulk", json={"generator": GENERATOR}).status_code == 200
+
+    assert request(api, "POST", "/api/simulation/reset", hold=api.batch_lock).status_code == 409
+    assert request(api, "POST", "/api/pairs/bulk", hold=api.batch_lock, json={"generator": GENERATOR}).status_code == 409
+    assert request(api, "POST", "/api/simulation/start", hold=api.batch_lock).status_code == 409
+    assert api.engine.pair_count == 5
+
+    assert request(api, "POST", "/api/simulation/reset").status_code == 200
+    assert api.engine.pair_count == 0
+
+
+def test_pair_listing_pages_match_for_engine_and_database(api):
+    generator = {"kind": "random_box", "count": 45, "seed": 3}
+    assert request(api, "POST", "/api/pairs/bulk", json={"generator": generator}).status_code == 200
+
+    for source in ("engine", "database"):
+        for sort in ("index", "-stability"):
+            ids, cursor = [], None
+            while True:
+                params = {"source": source, "sort": sort, "limit": 10, "fields": "id,index"}
+                if cursor is not None:
+                    params["cursor"] = cursor
+                page = request(api, "GET", "/api/pairs", params=params).json()
+                ids.extend(pair["id"] for pair in page["pairs"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert len(ids) == len(set(ids)) == 45, (source, sort)
+            if sort == "index":
+                # The engine pages in storage order, the database by id
+                assert ids == (api.engine.pair_id_list() if source == "engine" else sorted(ids))
+
+    assert request(api, "GET", "/api/pairs", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_lod_views_are_validated_and_conflated(api, monkeypatch):
+    assert request(api, "POST", "/api/pairs/bulk", json={"generator": GENERATOR}).status_code == 200
+    encoded = []
+    lod_frame = api.snapshot_cache.lod_frame
+    monkeypatch.setattr(api.snapshot_cache, "lod_frame", lambda view: encoded.append(view) or lod_frame(view))
+    monkeypatch.setattr(api.ticker, "_view_task", None)
+
+    with TestClient(api.app).websocket_connect("/api/ws?format=lod") as websocket:
+        assert json.loads(websocket.receive_text())["type"] == "lod"
+        websocket.send_text(json.dumps({"near": 100, "far": 10}))
+        assert json.loads(websocket.receive_text())["type"] == "error"
+
+        for x in range(1, 31):
+            websocket.send_text(json.dumps({"camera": {"x": x, "y": 0, "z": 0}}))
+        time.sleep(3 / api.ticker.broadcast_rate)
+        assert json.loads(websocket.receive_text())["type"] == "lod"
+    # The connect frame, then one per broadcast slot rather than one per message
+    assert 2 <= len(encoded) <= 4
+    assert encoded[-1].camera.x == 30
+
+
+def test_spatial_queries_bound_limit(api):
+    assert request(api, "POST", "/api/pairs/bulk", json={"generator": GENERATOR}).status_code == 200
+    box = {"min_x": -100, "min_y": -100, "min_z": -100, "max_x": 100, "max_y": 100, "max_z": 100}
+    for url, params in (("/api/pairs/nearby", {"radius": 200}), ("/api/pairs/box", box)):
+        assert len(request(api, "GET", url, params={**params, "limit": 3}).json()["pairs"]) == 3
+        for limit in (0, -1, api.PAIR_PAGE_MAX + 1):
+            assert request(api, "GET", url, params={**params, "limit": limit}).status_code == 422, (url, limit)
+        assert request(api, "GET", "/api/sessions/missing" + url[4:], params={**params, "limit": 0}).status_code == 422
+
+
+def test_reset_survives_a_restart(api, monkeypatch, tmp_path):
+    path = str(tmp_path / "checkpoint.npz")
+    monkeypatch.setattr(api.checkpointer, "path", path)
+    monkeypatch.setattr(api.checkpointer, "enabled", True)
+    assert request(api, "POST", "/api/pairs/bulk", json={"generator": GENERATOR}).status_code == 200
+    request(api, "POST", "/api/simulation/step", json={"steps": 5})
+    asyncio.run(api.persister.flush())
+    asyncio.run(api.checkpointer.save())
+
+    assert request(api, "POST", "/api/simulation/reset").status_code == 200
+
+    async def restart():
+        restarted = VectorizedTetracoreEngine()
+        restored = await restore_state(restarted, api.db.tetrahedron_pairs, api.db.simulation_state, checkpoint_path=path)
+        return restarted, restored
+
+    restarted, restored = asyncio.run(restart())
+    assert restored["pairs"] == restarted.pair_count == 0
+    assert restarted.simulation_state.time_step == 0.0
+
+
+def test_bulk_create_persists_pairs_when_some_are_deleted_meanwhile(api, monkeypatch):
+    monkeypatch.setattr(api, "BULK_WRITE_CHUNK", 10)
+    collection = api.db.tetrahedron_pairs
+    deleted = []
+
+    async def insert_and_delete(documents, **kwargs):
+        # Another request deletes a pair of a later chunk while this one is written
+        if not deleted:
+            deleted.append(api.engine.pair_id_list()[-1])
+            api.engine.remove_pair(deleted[0])
+        return await collection.insert_many(documents, **kwargs)
+
+    monkeypatch.setattr(api, "db", SimpleNamespace(tetrahedron_pairs=SimpleNamespace(insert_many=insert_and_delete)))
+    generator = {"kind": "random_box", "count": 25, "seed": 5}
+    assert request(api, "POST", "/api/pairs/bulk", json={"generator": generator}).status_code == 200
+
+    stored = asyncio.run(collection.count_documents({}))
+    assert stored == api.engine.pair_count == 24
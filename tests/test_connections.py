@@ -0,0 +1,63 @@
+import asyncio
+
+from tetracore.connections import ConnectionManager
+
+
+class FakeSocket:
+    """Just enough of a WebSocket for ConnectionManager; ``stall`` blocks every send"""
+
+    def __init__(self, stall: bool = False):
+        self.stall = asyncio.Event() if stall else None
+        self.sent = []
+        self.closed = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message):
+        if self.stall is not None:
+            await self.stall.wait()
+        self.sent.append(message)
+
+    send_bytes = send_text
+
+    async def close(self, code=1000, reason=""):
+        self.closed = reason
+
+
+def test_stalled_client_does_not_delay_others_and_is_evicted():
+    async def scenario():
+        manager = ConnectionManager(max_queue=4, slow_client_timeout=0.05)
+        fast, stalled = FakeSocket(), FakeSocket(stall=True)
+        await manager.connect(fast)
+        await manager.connect(stalled)
+
+        for i in range(3):
+            manager.broadcast(f"tick {i}", conflate=True)
+            await asyncio.sleep(0.03)
+        # The stalled client keeps only its latest tick frame queued behind the one in flight
+        channel = manager.channels[stalled]
+        assert [message for message, _ in channel.pending] == ["tick 2"]
+        assert channel.dropped_frames == 1
+        assert fast.sent == ["tick 0", "tick 1", "tick 2"]
+
+        await asyncio.sleep(0.05)
+        manager.broadcast("tick 3", conflate=True)
+        assert stalled not in manager.channels and fast in manager.channels
+        await asyncio.sleep(0.01)
+        assert stalled.closed == "too_slow"
+        manager.disconnect(fast)
+
+    asyncio.run(scenario())
+
+
+def test_event_overflow_evicts_the_client():
+    async def scenario():
+        manager = ConnectionManager(max_queue=2)
+        stalled = FakeSocket(stall=True)
+        await manager.connect(stalled)
+        for i in range(4):
+            manager.broadcast(f"event {i}")
+        assert stalled not in manager.channels and manager.evicted == 1
+
+    asyncio.run(scenario())
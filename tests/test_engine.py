@@ -0,0 +1,141 @@
+import math
+import threading
+
+import numpy as np
+import pytest
+
+from tetracore.engine import TetracoreEngine, VectorizedTetracoreEngine
+from tetracore.models import PairQuery, Vector3D
+
+
+def twin_engines(n: int = 50):
+    """An object and a vectorized engine holding the same pairs"""
+    seeded, vectorized = TetracoreEngine(seed=1), VectorizedTetracoreEngine(seed=1, capacity=2)
+    for i in range(n):
+        pair = seeded.create_tetrahedron_pair(Vector3D(x=i, y=0, z=1), 2.0 + i * 0.01)
+        seeded.add_pair(pair)
+        vectorized.add_pair(pair.model_copy(deep=True))
+    return seeded, vectorized
+
+
+def assert_same_state(a: TetracoreEngine, b: TetracoreEngine):
+    a.calculate_system_metrics()
+    b.calculate_system_metrics()
+    for name in ("total_stability", "min_stability", "max_stability", "system_energy"):
+        assert math.isclose(getattr(a.simulation_state, name), getattr(b.simulation_state, name), rel_tol=1e-9, abs_tol=1e-9), name
+    assert a.pair_id_list() == b.pair_id_list()
+    arrays_a, arrays_b = a.frame_arrays(), b.frame_arrays()
+    for name in ("index", "phase", "energy_state", "stability_factor", "center"):
+        np.testing.assert_allclose(arrays_a[name], arrays_b[name], rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_object_and_vectorized_stability_match():
+    seeded, vectorized = twin_engines()
+    for pair in seeded.records:
+        slot = vectorized.slots[pair.id]
+        assert math.isclose(seeded.calculate_pair_stability(pair), vectorized.stability[slot], rel_tol=1e-9, abs_tol=1e-12)
+    for _ in range(100):
+        seeded.step(0.1)
+        vectorized.step(0.1)
+    assert_same_state(seeded, vectorized)
+
+
+def test_swap_remove_keeps_storage_and_aggregates_consistent():
+    seeded, vectorized = twin_engines()
+    stability = vectorized.stability[:vectorized.count]
+    # The extremes, the last slot (no swap) and a few from the middle
+    doomed = {vectorized.pair_ids[i] for i in (int(stability.argmin()), int(stability.argmax()), vectorized.count - 1, 0, 7, 20)}
+    for pair_id in doomed:
+        assert seeded.remove_pair(pair_id) and vectorized.remove_pair(pair_id)
+    assert not vectorized.remove_pair(next(iter(doomed)))
+
+    assert vectorized.pair_count == 50 - len(doomed)
+    assert {pair_id: i for i, pair_id in enumerate(vectorized.pair_ids)} == vectorized.slots
+    assert all(vectorized.pair_keys[pair_id] == vectorized.key[i] for i, pair_id in enumerate(vectorized.pair_ids))
+    assert all(vectorized.get_pair(pair_id) is None for pair_id in doomed)
+    assert_same_state(seeded, vectorized)
+
+    # The running aggregates agree with a recount from scratch
+    state = vectorized.simulation_state
+    incremental = (state.total_stability, state.min_stability, state.max_stability, state.system_energy)
+    vectorized.recount()
+    vectorized.calculate_system_metrics()
+    recounted = (state.total_stability, state.min_stability, state.max_stability, state.system_energy)
+    assert incremental == pytest.approx(recounted, rel=1e-12)
+
+
+@pytest.mark.parametrize("engine_class", [TetracoreEngine, VectorizedTetracoreEngine])
+@pytest.mark.parametrize("sort", ["index", "stability", "-stability"])
+def test_keyset_pagination_visits_every_pair_once(engine_class, sort):
+    engine = engine_class(seed=2)
+    engine.create_pairs(np.random.default_rng(2).uniform(-50, 50, (95, 3)), np.full(95, 2.0))
+    expected = engine.query_pairs(PairQuery(sort=sort, limit=1000, fields=["id"]))["pairs"]
+
+    seen, cursor, removed = [], None, None
+    while True:
+        page = engine.query_pairs(PairQuery(sort=sort, limit=10, cursor=cursor, fields=["id"]))
+        assert len(page["pairs"]) <= 10
+        seen.extend(page["pairs"])
+        if removed is None:
+            # Deleting a pair already returned must not shift later pages
+            removed = page["pairs"][0]["id"]
+            engine.remove_pair(removed)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_bulk_create_during_step_is_deferred():
+    engine = VectorizedTetracoreEngine(seed=1)
+    engine.create_pairs(np.zeros((10, 3)), np.full(10, 2.0))
+    stepping = threading.Event()
+    release = threading.Event()
+    update_oscillations = engine.update_oscillations
+
+    def slow_update(dt):
+        stepping.set()
+        release.wait(5)
+        update_oscillations(dt)
+
+    engine.update_oscillations = slow_update
+    stepper = threading.Thread(target=engine.step, args=(0.1,), daemon=True)
+    stepper.start()
+    assert stepping.wait(5)
+
+    result = {}
+    creator = threading.Thread(target=lambda: result.update(ids=engine.create_pairs(np.ones((5, 3)), np.full(5, 2.0))), daemon=True)
+    creator.start()
+    creator.join(5)
+    assert not creator.is_alive(), "create_pairs deadlocked while a step was running"
+    assert engine.pair_count == 10
+
+    release.set()
+    stepper.join(5)
+    assert engine.pair_count == 15
+    assert all(pair_id in engine.slots for pair_id in result["ids"])
+
+
+@pytest.mark.parametrize("engine_class", [TetracoreEngine, VectorizedTetracoreEngine])
+def test_interaction_factor_applies_outside_step(engine_class, monkeypatch):
+    engine = engine_class(seed=2)
+    engine.interaction_strength = 0.5
+    # Fresh pairs are in antiphase, i.e. stability 0; use the pairing strength as the raw stability
+    monkeypatch.setattr(engine, "calculate_pair_stability", lambda pair: pair.pairing_strength)
+    if engine_class is VectorizedTetracoreEngine:
+        monkeypatch.setattr(engine, "_stability", lambda sl: engine.pairing_strength[sl].copy())
+
+    def stability():
+        return engine.frame_arrays()["stability_factor"]
+
+    engine.create_pairs(np.random.default_rng(2).uniform(-3, 3, (40, 3)), np.full(40, 2.0))
+    np.testing.assert_allclose(stability(), [p.pairing_strength * f for p, f in zip(engine.list_pairs(), engine.interaction_factor())])
+    engine.apply_parameters(pairing_strength=0.9)
+    assert engine.interaction_factor().max() < 1
+    np.testing.assert_allclose(stability(), 0.9 * engine.interaction_factor())
+
+    pair = engine.build_pair(Vector3D(x=0.5, y=0, z=0))
+    engine.add_pair(pair)
+    assert stability()[-1] == pytest.approx(pair.pairing_strength * engine.interaction_factor()[-1])
+    engine.calculate_system_metrics()
+    assert engine.simulation_state.max_stability == pytest.approx(stability().max())
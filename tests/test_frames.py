@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pytest
+
+from tetracore.engine import TetracoreEngine, VectorizedTetracoreEngine
+from tetracore.frames import (
+    decode_binary_frame, encode_binary_frame, encode_delta_frame, encode_pair_added, encode_pair_removed,
+    encode_snapshot_frame,
+)
+from tetracore.models import Vector3D
+
+
+def seeded_engine(engine_class=VectorizedTetracoreEngine, n: int = 20) -> TetracoreEngine:
+    engine = engine_class(seed=4)
+    engine.create_pairs(np.random.default_rng(4).uniform(-20, 20, (n, 3)), np.full(n, 2.0))
+    engine.step(0.1)
+    engine.calculate_system_metrics()
+    return engine
+
+
+def test_binary_frame_round_trip():
+    engine = seeded_engine()
+    engine.simulation_state.running = True
+    decoded = decode_binary_frame(encode_binary_frame(engine))
+    state = engine.simulation_state
+    assert decoded["time_step"] == state.time_step
+    assert decoded["running"] is True
+    assert np.isclose(decoded["total_stability"], state.total_stability, rtol=1e-6)
+    assert np.isclose(decoded["system_energy"], state.system_energy, rtol=1e-6)
+    arrays = engine.frame_arrays()
+    np.testing.assert_array_equal(decoded["index"], arrays["index"])
+    for name in ("phase", "energy_state", "stability_factor", "center"):
+        np.testing.assert_allclose(decoded[name], arrays[name], rtol=1e-6, atol=1e-5, err_msg=name)
+
+
+def test_binary_frame_rejects_other_versions():
+    frame = bytearray(encode_binary_frame(seeded_engine()))
+    frame[4] = 99
+    with pytest.raises(ValueError):
+        decode_binary_frame(bytes(frame))
+
+
+class DeltaClient:
+    """Keeps pair state the way a ``format=delta`` WebSocket client does"""
+
+    def __init__(self):
+        self.pairs = {}
+
+    def receive(self, frame: str):
+        message = json.loads(frame)
+        if message["type"] == "snapshot":
+            self.pairs = {pair["index"]: pair for pair in message["pairs"]}
+        elif message["type"] == "add":
+            self.pairs[message["pair"]["index"]] = message["pair"]
+        elif message["type"] == "remove":
+            del self.pairs[message["index"]]
+        else:
+            assert sorted(message["index"]) == sorted(self.pairs), "delta indexes differ from the client's pairs"
+            for index, phase, stability in zip(message["index"], message["phase"], message["stability_factor"]):
+                pair = self.pairs[index]
+                pair["matter_tetrahedron"]["phase"], pair["antimatter_tetrahedron"]["phase"] = phase
+                pair["stability_factor"] = stability
+
+
+def test_delta_stream_follows_adds_and_removes():
+    for engine_class in (TetracoreEngine, VectorizedTetracoreEngine):
+        engine = seeded_engine(engine_class)
+        client = DeltaClient()
+        client.receive(encode_snapshot_frame(engine))
+        client.receive(encode_delta_frame(engine))
+
+        record = engine.build_pair(Vector3D(x=1, y=2, z=3))
+        pair = record.materialize()
+        engine.add_pair(record)
+        client.receive(encode_pair_added(engine, pair))
+        for pair_id in (engine.pair_id_list()[0], pair.id):
+            key = engine.pair_key(pair_id)
+            engine.remove_pair(pair_id)
+            client.receive(encode_pair_removed(key, pair_id))
+        engine.step(0.1)
+        client.receive(encode_delta_frame(engine))
+
+        assert len(client.pairs) == engine.pair_count == 19
+        for pair_id in engine.pair_id_list():
+            stored = engine.get_pair(pair_id)
+            seen = client.pairs[engine.pair_key(pair_id)]
+            assert seen["id"] == pair_id
+            assert np.isclose(seen["matter_tetrahedron"]["phase"], stored.matter_tetrahedron.phase)
@@ -0,0 +1,30 @@
+import json
+import os
+from argparse import Namespace
+
+import headless
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "golden_run.json")
+
+
+def run_args(**overrides) -> Namespace:
+    args = dict(engine="vectorized", seed=3, generator="random_box", pairs=50, spacing=5.0, steps=20,
+                dt=0.1, sample_every=5)
+    args.update(overrides)
+    return Namespace(**args)
+
+
+def test_seeded_run_matches_golden():
+    # Recorded with: python headless.py --engine vectorized --seed 7 --generator random_box
+    #                --pairs 200 --steps 100 --sample-every 25 --out tests/data/golden_run.json
+    with open(GOLDEN) as f:
+        golden = json.load(f)
+    result = headless.run(Namespace(**golden["config"]))
+    assert headless.compare(result, golden, rtol=1e-9) == []
+
+
+def test_seed_alone_determines_the_run():
+    for engine in ("object", "vectorized"):
+        first, again = headless.run(run_args(engine=engine)), headless.run(run_args(engine=engine))
+        assert headless.compare(again, first, rtol=0) == []
+        assert headless.compare(headless.run(run_args(engine=engine, seed=4)), first, rtol=1e-9) != []
@@ -0,0 +1,30 @@
+from tetracore.engine import VectorizedTetracoreEngine
+from tetracore.history import MetricsHistory
+
+
+def record_ticks(history: MetricsHistory, ticks: int, dt: float = 0.1):
+    engine = VectorizedTetracoreEngine(seed=1)
+    for _ in range(ticks):
+        engine.simulation_state.time_step += dt
+        engine.calculate_system_metrics()
+        history.record(engine)
+
+
+def test_auto_resolution_skips_evicted_raw_rows():
+    history = MetricsHistory(capacity=1000)
+    record_ticks(history, 5000)
+
+    early = history.series(0, 50)
+    assert early["resolution"] == "1s"
+    assert len(early["t"]) == len(history.series(0, 50, resolution="1s")["t"]) > 0
+
+    recent = history.series(450, 500)
+    assert recent["resolution"] == "raw"
+    assert len(recent["t"]) > 0
+
+
+def test_auto_resolution_uses_raw_before_eviction():
+    history = MetricsHistory(capacity=1000)
+    record_ticks(history, 500)
+    assert history.series()["resolution"] == "raw"
+    assert len(history.series()["t"]) == 500
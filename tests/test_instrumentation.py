@@ -0,0 +1,8 @@
+from tetracore.instrumentation import Counter, MetricsRegistry
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("test_total", "Escaping", ("reason",)))
+    counter.labels('a "quoted"\\path\nnext').inc()
+    assert r'test_total{reason="a \"quoted\"\\path\nnext"}' in registry.render()
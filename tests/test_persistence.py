@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+from mongomock_motor import AsyncMongoMockClient
+
+from tetracore.checkpoint import read_checkpoint, write_checkpoint
+from tetracore.engine import VectorizedTetracoreEngine
+from tetracore.persistence import StatePersister, restore_state
+
+
+def test_checkpoint_restore_reconciles_with_database(tmp_path):
+    db = AsyncMongoMockClient()["tetracore_test"]
+    engine = VectorizedTetracoreEngine(seed=5)
+    engine.create_pairs(np.random.default_rng(5).uniform(-20, 20, (30, 3)), np.full(30, 2.0))
+    engine.run(10, 0.1)
+    path = str(tmp_path / "checkpoint.npz")
+    write_checkpoint(path, engine.checkpoint_arrays())
+    arrays = read_checkpoint(path)
+    assert arrays["pair_ids"].tolist() == [pair_id.encode() for pair_id in engine.pair_ids]
+
+    # After the checkpoint one pair was deleted and two were created
+    deleted = engine.pair_ids[3]
+    other = VectorizedTetracoreEngine(seed=6)
+    added = other.create_pairs(np.zeros((2, 3)), np.full(2, 2.0))
+    documents = engine.pair_documents([pair_id for pair_id in engine.pair_ids if pair_id != deleted])
+    documents += other.pair_documents(added)
+
+    async def restore():
+        await db.tetrahedron_pairs.insert_many(documents)
+        await db.simulation_state.insert_one({"_id": "current", "time_step": engine.simulation_state.time_step})
+        restored = VectorizedTetracoreEngine(seed=5)
+        return restored, await restore_state(restored, db.tetrahedron_pairs, db.simulation_state, checkpoint_path=path)
+
+    restored, summary = asyncio.run(restore())
+    assert summary["source"] == "checkpoint"
+    assert summary["pairs"] == 31
+    assert set(restored.pair_ids) == {d["id"] for d in documents}
+    assert restored.slots == {pair_id: i for i, pair_id in enumerate(restored.pair_ids)}
+    assert restored.simulation_state.time_step == engine.simulation_state.time_step
+
+    kept = [pair_id for pair_id in engine.pair_ids if pair_id != deleted]
+    for pair_id in kept:
+        a, b = engine.slots[pair_id], restored.slots[pair_id]
+        np.testing.assert_array_equal(engine.phase[a], restored.phase[b])
+        assert engine.pair_key(pair_id) == restored.pair_key(pair_id)
+    for pair_id in added:
+        np.testing.assert_allclose(other.center[other.slots[pair_id]], restored.center[restored.slots[pair_id]])
+
+
+def test_persister_counts_updates_since_the_last_flush():
+    db = AsyncMongoMockClient()["tetracore_test"]
+    engine = VectorizedTetracoreEngine(seed=7)
+    engine.create_pairs(np.random.default_rng(7).uniform(-20, 20, (100, 3)), np.full(100, 2.0))
+
+    async def run():
+        await db.tetrahedron_pairs.insert_many(engine.pair_documents(engine.pair_ids))
+        persister = StatePersister(engine, db.tetrahedron_pairs, db.simulation_state, max_pending=250, batch_size=30)
+        assert persister.pending == 0
+        engine.step(0.1)
+        persister.mark_dirty()
+        assert persister.pending == 100 and not persister._flush_now.is_set()
+        engine.step(0.1)
+        persister.mark_dirty()
+        assert not persister._flush_now.is_set()
+        persister.mark_dirty()
+        assert persister._flush_now.is_set()
+
+        await persister.flush()
+        assert persister.pending == 0 and persister.stats()["pending_updates"] == 0
+        assert persister.flushed_pairs == 100
+        return await db.tetrahedron_pairs.find_one({"id": engine.pair_ids[0]}, {"_id": 0})
+
+    stored = asyncio.run(run())
+    assert stored["matter_tetrahedron"]["phase"] == engine.phase[0, 0]
+    assert stored["stability_factor"] == engine.stability[0]
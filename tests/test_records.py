@@ -0,0 +1,26 @@
+import re
+
+import numpy as np
+
+from tetracore.engine import TetracoreEngine
+from tetracore.models import Vector3D
+from tetracore.records import PairRecord, uuid4_strings
+
+UUID4 = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$")
+
+
+def test_pair_record_round_trips_through_the_model():
+    engine = TetracoreEngine(seed=8)
+    record = engine.build_pair(Vector3D(x=1, y=-2, z=3), 2.5)
+    pair = record.materialize()
+    assert pair.matter_tetrahedron.center == Vector3D(x=-0.25, y=-2, z=3)
+    assert [v.position for v in pair.matter_tetrahedron.vertices] == [
+        Vector3D(x=x, y=y, z=z) for x, y, z in record.matter_tetrahedron.vertex_positions()
+    ]
+    assert PairRecord.from_model(pair).document() == record.document() == pair.model_dump()
+
+
+def test_uuid4_strings_are_valid_and_seedable():
+    ids = uuid4_strings(100)
+    assert len(set(ids)) == 100 and all(UUID4.match(pair_id) for pair_id in ids)
+    assert uuid4_strings(5, np.random.default_rng(1)) == uuid4_strings(5, np.random.default_rng(1))
@@ -0,0 +1,98 @@
+import multiprocessing
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from tetracore.session_host import SessionHost
+
+
+class HostClient:
+    """Drives a SessionHost serving one end of a pipe on a thread"""
+
+    def __init__(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.host = SessionHost(tick_rate=20)
+        self.thread = threading.Thread(target=self.host.serve, args=(child,), daemon=True)
+        self.thread.start()
+        self.next_request = 0
+        self.results = {}
+
+    def send(self, op: str, session_id: str, **kwargs) -> int:
+        self.next_request += 1
+        self.conn.send((self.next_request, op, session_id, kwargs))
+        return self.next_request
+
+    def reply(self, request_id: int, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while request_id not in self.results and self.conn.poll(max(0.0, deadline - time.monotonic())):
+            message = self.conn.recv()
+            if message[0] == "result":
+                self.results[message[1]] = message[2]
+        if request_id in self.results:
+            return self.results.pop(request_id)
+        raise TimeoutError(f"no reply to request {request_id}")
+
+    def call(self, op: str, session_id: str, **kwargs):
+        return self.reply(self.send(op, session_id, **kwargs))
+
+    def close(self):
+        self.conn.send(None)
+        self.thread.join(5)
+
+
+def test_batch_step_does_not_stall_other_sessions():
+    client = HostClient()
+    try:
+        for session_id in ("busy", "live"):
+            assert client.call("create", session_id, seed=1) == ("ok", None)
+            assert client.call("create_pairs", session_id, request={"generator": {"kind": "lattice", "count": 200}})[0] == "ok"
+        assert client.call("set_running", "live", running=True) == ("ok", None)
+
+        batch = client.send("run", "busy", request={"steps": 1_000_000, "dt": 0.1})
+        started = client.call("info", "live")[1]["time_step"]
+        time.sleep(0.5)
+
+        answered = time.monotonic()
+        status, info = client.call("info", "live")
+        assert status == "ok" and time.monotonic() - answered < 0.5
+        assert info["time_step"] > started, "the running session stopped ticking during the batch"
+        assert client.call("reset", "busy") == ("error", "RuntimeError: A batch step is in progress")
+        assert client.call("set_running", "busy", running=True)[0] == "error"
+
+        # Deleting the session ends its batch with an error reply
+        assert client.call("delete", "busy") == ("ok", None)
+        assert client.reply(batch) == ("error", "RuntimeError: Session deleted")
+    finally:
+        client.close()
+
+
+def test_batch_step_replies_with_samples():
+    client = HostClient()
+    try:
+        client.call("create", "s", seed=1)
+        client.call("create_pairs", "s", request={"generator": {"kind": "lattice", "count": 8}})
+        status, samples = client.call("run", "s", request={"steps": 300, "dt": 0.1, "sample_every": 100})
+        assert status == "ok" and [sample["step"] for sample in samples] == [100, 200, 300]
+        assert client.call("info", "s")[1]["time_step"] == samples[-1]["time_step"]
+    finally:
+        client.close()
+
+
+def test_session_errors_map_to_http_status(api, monkeypatch):
+    monkeypatch.setattr(api.sessions, "size", 1)
+    with TestClient(api.app) as http:
+        assert http.post("/api/sessions", params={"session_id": "a"}).status_code == 200
+        http.post("/api/sessions/a/pairs/bulk", json={"generator": {"kind": "lattice", "count": 50}})
+        http.post("/api/sessions/a/simulation/start")
+        assert http.post("/api/sessions/a/simulation/step", json={"steps": 10}).status_code == 409
+
+        worker = api.sessions.workers[0]
+        worker.process.kill()
+        deadline = time.monotonic() + 10
+        while "a" in api.sessions.sessions and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert http.get("/api/sessions/a").status_code == 404
+        assert api.sessions.workers[0] is not worker and api.sessions.workers[0].alive
+        assert http.post("/api/sessions", params={"session_id": "b"}).status_code == 200
+        assert http.get("/api/sessions/b/simulation/state").status_code == 200
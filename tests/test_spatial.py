@@ -0,0 +1,41 @@
+import numpy as np
+
+from tetracore.spatial import SpatialGrid
+
+
+def brute_force_neighbours(points: np.ndarray, radius: float) -> dict:
+    distance = np.linalg.norm(points[:, None] - points[None], axis=2)
+    a, b = np.nonzero(np.triu(distance < radius, 1))
+    return {(i, j): distance[i, j] for i, j in zip(a.tolist(), b.tolist())}
+
+
+def test_neighbor_pairs_matches_brute_force_in_small_chunks(monkeypatch):
+    rng = np.random.default_rng(4)
+    # A crowded cluster inside one index cell plus a sparse spread around it
+    points = np.concatenate([rng.normal(0, 0.3, (300, 3)), rng.uniform(-20, 20, (200, 3))])
+    grid = SpatialGrid(cell_size=50)
+    grid.insert_many([f"p{i}" for i in range(len(points))], points)
+    monkeypatch.setattr(SpatialGrid, "NEIGHBOR_CHUNK", 97)
+
+    ids, a, b, distance = grid.neighbor_pairs(1.5)
+    found = {}
+    for i, j, d in zip(a.tolist(), b.tolist(), distance.tolist()):
+        i, j = sorted((int(ids[i][1:]), int(ids[j][1:])))
+        assert (i, j) not in found
+        found[(i, j)] = d
+    expected = brute_force_neighbours(points, 1.5)
+    assert found.keys() == expected.keys()
+    assert np.allclose([found[k] for k in expected], list(expected.values()))
+
+
+def test_crowding_sums_neighbour_weights(monkeypatch):
+    points = np.random.default_rng(5).normal(0, 1, (200, 3))
+    grid = SpatialGrid()
+    grid.insert_many([f"p{i}" for i in range(len(points))], points)
+    monkeypatch.setattr(SpatialGrid, "NEIGHBOR_CHUNK", 50)
+
+    ids, crowding = grid.crowding(1.0)
+    expected = np.zeros(len(points))
+    for (i, j), d in brute_force_neighbours(points, 1.0).items():
+        expected[[i, j]] += 1.0 - d
+    np.testing.assert_allclose(crowding, expected[[int(pair_id[1:]) for pair_id in ids]])
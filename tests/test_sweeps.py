@@ -0,0 +1,57 @@
+import asyncio
+import concurrent.futures
+import time
+
+from tetracore import sweeps as sweeps_module
+from tetracore.models import SweepSpec
+from tetracore.sweeps import SweepRun, prune_sweeps
+
+
+class ThreadPool(concurrent.futures.ThreadPoolExecutor):
+    """The sweep's process pool, in threads, remembering every submitted future"""
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers)
+        self.futures = []
+        pools.append(self)
+
+    def submit(self, fn, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+
+pools = []
+
+
+def test_cancel_drops_queued_configurations(monkeypatch):
+    monkeypatch.setattr(sweeps_module.concurrent.futures, "ProcessPoolExecutor", ThreadPool)
+    sweep = SweepRun(SweepSpec(grid={"pairing_strength": [0.1 * i for i in range(1, 11)]}, pairs=50, steps=200))
+
+    async def scenario():
+        sweep.task = asyncio.create_task(sweep.run([], workers=1, report=lambda progress: sweep.cancel()))
+        try:
+            await sweep.task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    assert sweep.status == "cancelled" and sweep.done == 1
+    queued = pools[-1].futures[2:]
+    assert queued and all(future.cancelled() for future in queued)
+
+
+def test_prune_keeps_active_and_most_recent_sweeps():
+    runs = {}
+    for i in range(6):
+        sweep = SweepRun(SweepSpec(grid={"separation": [2.0]}), sweep_id=f"s{i}")
+        runs[sweep.id] = sweep
+    for i, status in enumerate(["finished", "running", "failed", "pending", "cancelled", "finished"]):
+        runs[f"s{i}"].status = status
+        if status not in ("running", "pending"):
+            runs[f"s{i}"].finished = time.monotonic() + i
+    prune_sweeps(runs, keep=2)
+    assert sorted(runs) == ["s1", "s3", "s4", "s5"]
+
+    runs["s3"].cancel()
+    assert runs["s3"].status == "cancelled" and not runs["s3"].active
@@ -0,0 +1,83 @@
+import asyncio
+import math
+
+import numpy as np
+
+from tetracore import ticker as ticker_module
+from tetracore.connections import ConnectionManager
+from tetracore.engine import VectorizedTetracoreEngine
+from tetracore.ticker import SimulationTicker, SnapshotCache
+
+from tests.test_connections import FakeSocket
+
+
+def ticking_setup(**kwargs):
+    engine = VectorizedTetracoreEngine(seed=6)
+    engine.create_pairs(np.random.default_rng(6).uniform(-10, 10, (10, 3)), np.full(10, 2.0))
+    manager = ConnectionManager()
+    cache = SnapshotCache(engine)
+    return engine, manager, cache, SimulationTicker(engine, manager, cache, **kwargs)
+
+
+def test_ticker_advances_in_fixed_steps_without_clients():
+    async def scenario():
+        engine, _, _, ticker = ticking_setup(tick_rate=100)
+        engine.simulation_state.running = True
+        ticker.start()
+        await asyncio.sleep(0.3)
+        await ticker.stop()
+        return engine.simulation_state.time_step / ticker.dt
+
+    steps = asyncio.run(scenario())
+    assert math.isclose(steps, round(steps), abs_tol=1e-6)
+    assert 10 <= steps <= 40
+
+
+def test_publish_encodes_once_per_protocol_and_version(monkeypatch):
+    encodes = []
+    encode_full = ticker_module.FRAME_ENCODERS["full"]
+
+    def counting(engine):
+        encodes.append(engine.simulation_state.time_step)
+        return encode_full(engine)
+
+    monkeypatch.setitem(ticker_module.FRAME_ENCODERS, "full", counting)
+
+    async def scenario():
+        _, manager, cache, ticker = ticking_setup()
+        sockets = [FakeSocket() for _ in range(3)]
+        for socket in sockets:
+            await manager.connect(socket)
+        ticker.publish()
+        cache.body()
+        await asyncio.sleep(0.01)
+        ticker.tick()
+        ticker.publish()
+        await asyncio.sleep(0.01)
+        for socket in sockets:
+            manager.disconnect(socket)
+        return sockets
+
+    sockets = asyncio.run(scenario())
+    assert len(encodes) == 2
+    assert all(socket.sent == sockets[0].sent and len(socket.sent) == 2 for socket in sockets)
+
+
+def test_adapt_halves_congested_protocols_and_recovers():
+    async def scenario():
+        _, manager, _, ticker = ticking_setup(tick_rate=20, broadcast_rate=20, min_broadcast_rate=2)
+        socket = FakeSocket()
+        await manager.connect(socket)
+        channel = manager.channels[socket]
+        ticker.adapt()
+        rates = [ticker.rates["full"]]
+        for _ in range(4):
+            channel.dropped_frames += 1
+            ticker.adapt()
+            rates.append(ticker.rates["full"])
+        ticker.adapt()
+        rates.append(ticker.rates["full"])
+        manager.disconnect(socket)
+        return rates
+
+    assert asyncio.run(scenario()) == [20, 10, 5, 2.5, 2, 4]